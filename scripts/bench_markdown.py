@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for per-page Markdown rendering.
+
+Compares the old path (module-level ``markdown.markdown`` per call, which
+builds a new ``Markdown`` object and reloads extensions every time) with
+the pooled per-thread renderer used by the wiki.
+
+Pages are taken from data/pages when available; otherwise a synthetic
+manual page is used.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import markdown as md  # noqa: E402
+
+from src.wiki_app.models.page import Page  # noqa: E402
+from src.wiki_app.services.markdown_renderer import (  # noqa: E402
+    get_markdown_extensions,
+    render_markdown,
+)
+
+SAMPLE_BODY = """\
+## 夜勤の引継ぎ手順
+
+1. **設備点検表** を確認する
+2. 異常があれば [連絡先一覧](/pages/連絡先) に記載の担当へ連絡
+    - 日中: 内線 1234
+    - 夜間: 携帯 090-0000-0000
+
+| 項目 | 確認内容 | 担当 |
+|------|----------|------|
+| 受付 | 鍵の返却 | A |
+| 巡回 | 3F 非常口 | B |
+
+```
+shutdown /r /t 0
+```
+
+> 注意: 停電時は手順書 B を参照すること。
+"""
+
+
+def load_bodies(limit: int) -> list[str]:
+    pages_dir = REPO_ROOT / "data" / "pages"
+    bodies: list[str] = []
+    for md_file in sorted(pages_dir.rglob("*.md")):
+        text = md_file.read_text(encoding="utf-8")
+        bodies.append(Page.from_markdown(md_file.stem, text).body)
+        if len(bodies) >= limit:
+            break
+    return bodies or [SAMPLE_BODY * 4]
+
+
+def bench(label: str, func, bodies: list[str], rounds: int) -> float:
+    for body in bodies:
+        func(body)  # warm-up
+    samples: list[float] = []
+    for _ in range(rounds):
+        for body in bodies:
+            start = time.perf_counter()
+            func(body)
+            samples.append(time.perf_counter() - start)
+    median_ms = statistics.median(samples) * 1000
+    mean_ms = statistics.fmean(samples) * 1000
+    print(f"{label:<28} median {median_ms:8.3f} ms/page   mean {mean_ms:8.3f} ms/page")
+    return median_ms
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=50, help="Rounds over the page set.")
+    parser.add_argument("--pages", type=int, default=50, help="Max pages taken from data/pages.")
+    args = parser.parse_args()
+
+    bodies = load_bodies(args.pages)
+    extensions = get_markdown_extensions()
+    print(f"pages={len(bodies)} rounds={args.rounds} extensions={extensions}")
+
+    before = bench(
+        "md.markdown() per call",
+        lambda body: md.markdown(body, extensions=extensions),
+        bodies,
+        args.rounds,
+    )
+    after = bench("pooled render_markdown()", render_markdown, bodies, args.rounds)
+    if after > 0:
+        print(f"speedup: x{before / after:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,6 +3,9 @@ import threading
 
 from flask import Flask, jsonify, request
 
+from src.common.activity import init_request_activity
+from src.common.compression import init_compression
+from src.common.config import load_config
 from src.common.paths import get_web_dir, get_data_dir, get_history_repo_dir
 from src.common.heartbeat import (
     register_session,
@@ -11,6 +14,7 @@ from src.common.heartbeat import (
     get_active_session_count,
 )
 from src.common.shutdown import cleanup_and_exit
+from src.common.static_assets import NO_STORE_HEADERS, init_static_assets
 from src.wiki_app.services.repo_service import RepoService
 from src.wiki_app.services.page_service import PageService
 from src.wiki_app.services.comment_service import CommentService
@@ -46,12 +50,17 @@ def create_admin_app() -> Flask:
             "application/javascript",
             "application/json",
         }
-        if request.path.startswith("/static/") or response.mimetype in cache_targets:
-            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
+        # /static/ は init_static_assets 側で制御する
+        if request.path.startswith("/static/"):
+            return response
+        if response.mimetype in cache_targets:
+            response.headers.update(NO_STORE_HEADERS)
         return response
 
+    init_request_activity(app)
+    init_static_assets(app, load_config("admin"))
+    init_compression(app, load_config("admin"))
+
     repo_service = RepoService(get_data_dir(), get_history_repo_dir())
     page_service = PageService(repo_service)
     comment_service = CommentService()
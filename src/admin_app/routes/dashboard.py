@@ -3,9 +3,10 @@ import os
 
 from flask import Blueprint, render_template, jsonify
 
-from src.common.paths import get_data_dir, get_state_dir
+from src.common.paths import get_data_dir
 from src.common.config import load_config
 from src.common.logger import get_logger
+from src.watcher.index_store import get_index_store
 from src.wiki_app.services.repo_service import RepoService
 from src.wiki_app.services.page_service import PageService
 from src.wiki_app.services.comment_service import CommentService
@@ -45,8 +46,7 @@ def stats():
     config_names: set[str] = set()
 
     try:
-        pages = _page_service.list_pages()
-        page_count = len(pages)
+        page_count = _page_service.count_pages()
     except Exception as e:
         logger.warning("ページ数の取得に失敗: %s", e)
 
@@ -96,10 +96,9 @@ def stats():
         config_names = set()
 
     try:
-        index_path = get_state_dir() / "watcher" / "index.json"
-        if index_path.exists():
-            with open(index_path, "r", encoding="utf-8") as f:
-                watcher_index = json.load(f)
+        store = get_index_store()
+        if store.exists():
+            watcher_index = store.snapshot()
             targets = watcher_index.get("targets", {})
             if config_names:
                 targets = {
@@ -4,6 +4,7 @@ from flask import Blueprint, jsonify
 
 from src.common.paths import get_state_dir
 from src.common.logger import get_logger
+from src.watcher.event_journal import get_event_journal
 
 state_bp = Blueprint("state_cleanup", __name__)
 logger = get_logger("admin")
@@ -26,13 +27,16 @@ def _dir_stats(directory):
 
 @state_bp.route("/api/state/watcher")
 def watcher_state():
-    watcher_dir = get_state_dir() / "watcher"
-    snapshots_dir = watcher_dir / "snapshots"
-    events_dir = watcher_dir / "events"
+    snapshots_dir = get_state_dir() / "watcher" / "snapshots"
+    journal_stats = get_event_journal().stats()
 
     return jsonify({
         "snapshots": _dir_stats(snapshots_dir),
-        "events": _dir_stats(events_dir),
+        "events": {
+            "event_count": journal_stats["total_events"],
+            "file_count": journal_stats["segment_count"],
+            "total_size_bytes": journal_stats["total_size_bytes"],
+        },
     })
 
 
@@ -51,12 +55,6 @@ def delete_snapshots():
 
 @state_bp.route("/api/state/watcher/events", methods=["DELETE"])
 def delete_events():
-    events_dir = get_state_dir() / "watcher" / "events"
-    deleted = 0
-    if events_dir.exists():
-        for f in events_dir.iterdir():
-            if f.is_file():
-                f.unlink()
-                deleted += 1
+    deleted = get_event_journal().clear()
     logger.info("イベント削除: %d 件", deleted)
     return jsonify({"deleted": deleted})
@@ -1,10 +1,14 @@
 import json
 from datetime import datetime
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, jsonify, stream_with_context
 
-from src.common.paths import get_state_dir, get_config_dir
+from src.common.paths import get_config_dir
 from src.common.logger import get_logger
+from src.common.pubsub import get_channel
+from src.watcher.event_journal import get_event_journal
+from src.watcher.event_writer import EVENT_CHANNEL
+from src.watcher.index_store import get_index_store
 
 watcher_mgmt_bp = Blueprint("watcher_mgmt", __name__)
 logger = get_logger("admin")
@@ -13,7 +17,6 @@ logger = get_logger("admin")
 @watcher_mgmt_bp.route("/api/watcher/overview")
 def watcher_overview():
     """Watcher全体のステータスを返す"""
-    index_path = get_state_dir() / "watcher" / "index.json"
     config_path = get_config_dir() / "watcher.json"
 
     result = {
@@ -34,9 +37,9 @@ def watcher_overview():
 
     index_data = {}
     try:
-        if index_path.exists():
-            with open(index_path, "r", encoding="utf-8") as f:
-                index_data = json.load(f)
+        store = get_index_store()
+        if store.exists():
+            index_data = store.snapshot()
             result["running"] = True
             result["last_run"] = index_data.get("last_run", "")
     except Exception as e:
@@ -62,6 +65,7 @@ def watcher_overview():
             "status": state.get("status", "unknown") if state else "未実行",
             "last_checked": state.get("last_checked", "") if state else "",
             "last_changed": state.get("last_changed", "") if state else "",
+            "last_lag_seconds": state.get("last_lag_seconds") if state else None,
         }
 
         if ct.get("site_url"):
@@ -83,42 +87,38 @@ def watcher_overview():
 @watcher_mgmt_bp.route("/api/watcher/events")
 def watcher_events():
     """最新のイベント一覧を返す（最新20件）"""
-    events_dir = get_state_dir() / "watcher" / "events"
-    events = []
+    return jsonify(get_event_journal().recent(20))
 
-    if events_dir.exists():
-        event_files = sorted(events_dir.glob("*.json"), reverse=True)
-        for ef in event_files[:20]:
-            try:
-                with open(ef, "r", encoding="utf-8") as f:
-                    event = json.load(f)
-                event["filename"] = ef.name
-                events.append(event)
-            except Exception:
-                pass
 
-    return jsonify(events)
+@watcher_mgmt_bp.route("/api/watcher/events/stream")
+def watcher_events_stream():
+    """新しいイベントを Server-Sent Events で配信する"""
+
+    def _stream():
+        with get_channel(EVENT_CHANNEL).subscribe() as subscription:
+            while True:
+                message = subscription.get(timeout=15)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                payload = json.dumps(message["event"], ensure_ascii=False)
+                yield f"data: {payload}\n\n"
+
+    return Response(
+        stream_with_context(_stream()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 
 @watcher_mgmt_bp.route("/api/watcher/events/history")
 def watcher_events_history():
-    """全イベントの件数と日別サマリーを返す"""
-    events_dir = get_state_dir() / "watcher" / "events"
-    total = 0
-    by_target: dict[str, int] = {}
-
-    if events_dir.exists():
-        for ef in events_dir.glob("*.json"):
-            total += 1
-            try:
-                with open(ef, "r", encoding="utf-8") as f:
-                    event = json.load(f)
-                name = event.get("target_name", "unknown")
-                by_target[name] = by_target.get(name, 0) + 1
-            except Exception:
-                pass
-
+    """保持中の全イベントの件数とターゲット別件数を返す"""
+    stats = get_event_journal().stats()
     return jsonify({
-        "total_events": total,
-        "by_target": by_target,
+        "total_events": stats["total_events"],
+        "by_target": stats["by_target"],
     })
@@ -0,0 +1,79 @@
+"""処理中のHTTPリクエスト数の把握
+
+wiki / admin の両アプリで共有し、バックアップなどの裏方の処理が
+画面操作と重ならないように待つために使う。
+"""
+import threading
+import time
+
+from flask import Flask, g
+
+
+class RequestActivity:
+    """処理中のリクエスト数（ビューが応答を返すまで）を数える"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._last_finished = 0.0
+
+    def begin(self) -> None:
+        with self._cond:
+            self._in_flight += 1
+
+    def end(self) -> None:
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._last_finished = time.monotonic()
+            if self._in_flight == 0:
+                self._cond.notify_all()
+
+    def in_flight(self) -> int:
+        with self._cond:
+            return self._in_flight
+
+    def wait_idle(self, timeout: float) -> bool:
+        """処理中のリクエストがなくなるまで最大 timeout 秒待つ。空けば True"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._in_flight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+
+_shared_activity: RequestActivity | None = None
+_shared_lock = threading.Lock()
+
+
+def get_request_activity() -> RequestActivity:
+    """プロセス共通のリクエスト数カウンタを返す（wiki/admin で共有）。"""
+    global _shared_activity
+    with _shared_lock:
+        if _shared_activity is None:
+            _shared_activity = RequestActivity()
+        return _shared_activity
+
+
+def init_request_activity(app: Flask) -> None:
+    """app のリクエストを数えるフックを登録する"""
+    activity = get_request_activity()
+
+    @app.before_request
+    def _begin_activity():
+        activity.begin()
+        g._activity_open = True
+
+    # ストリーミング応答は本文を送り終えるまで待たず、ビューが返った時点で終わりとみなす
+    @app.after_request
+    def _end_activity(response):
+        if g.pop("_activity_open", False):
+            activity.end()
+        return response
+
+    @app.teardown_request
+    def _end_activity_on_error(_exc):
+        if g.pop("_activity_open", False):
+            activity.end()
@@ -0,0 +1,155 @@
+"""HTML / JSON / SSE 応答の圧縮
+
+Accept-Encoding を見て brotli（モジュールがあれば）または gzip で圧縮する。
+一定サイズ未満の応答は圧縮しない。ストリーミング応答（SSE など）は
+チャンクごとに同期フラッシュし、届いた分がすぐにブラウザで読めるようにする。
+/static/ のファイルは ETag ごとに圧縮結果をメモリに持ち、毎回は圧縮しない。
+"""
+import threading
+import zlib
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/event-stream",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+}
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def init_compression(app: Flask, config: dict) -> None:
+    """config（app.json / admin.json）の "compression" に従って応答を圧縮する"""
+    settings = config.get("compression", {})
+    if not settings.get("enabled", True):
+        return
+    min_size = int(settings.get("min_size", DEFAULT_MIN_SIZE))
+    gzip_level = int(settings.get("gzip_level", DEFAULT_GZIP_LEVEL))
+    brotli_quality = int(settings.get("brotli_quality", DEFAULT_BROTLI_QUALITY))
+    compress_streams = settings.get("stream", True)
+    # (ETag, encoding) -> 圧縮済みの静的ファイル
+    static_cache: dict[tuple[str, str], bytes] = {}
+    static_cache_lock = threading.Lock()
+
+    def _new_encoder(encoding: str):
+        if encoding == "br":
+            return _BrotliEncoder(brotli_quality)
+        return _GzipEncoder(gzip_level)
+
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add("Accept-Encoding")
+        if (
+            response.status_code != 200
+            or "Content-Encoding" in response.headers
+            or "Range" in request.headers
+        ):
+            return response
+        encoding = _negotiate_encoding()
+        if encoding is None:
+            return response
+
+        if response.direct_passthrough:
+            etag, _weak = response.get_etag()
+            if not etag or not request.path.startswith(app.static_url_path + "/"):
+                return response
+            if (response.content_length or 0) < min_size:
+                return response
+            key = (etag, encoding)
+            with static_cache_lock:
+                compressed = static_cache.get(key)
+            response.direct_passthrough = False
+            if compressed is None:
+                encoder = _new_encoder(encoding)
+                compressed = encoder.compress(response.get_data()) + encoder.finish()
+                with static_cache_lock:
+                    static_cache[key] = compressed
+            # send_file のファイルを閉じてから圧縮済みの内容に差し替える
+            response.close()
+            response.set_data(compressed)
+        elif response.is_streamed:
+            if not compress_streams:
+                return response
+            response.response = _compress_stream(
+                response.response, _new_encoder(encoding)
+            )
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            encoder = _new_encoder(encoding)
+            response.set_data(encoder.compress(data) + encoder.finish())
+
+        response.headers["Content-Encoding"] = encoding
+        # 表現が変わるので ETag は弱い比較にする
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def _negotiate_encoding() -> str | None:
+    accept = request.accept_encodings
+    if brotli is not None and accept.quality("br") > 0:
+        return "br"
+    if accept.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def _compress_stream(chunks, encoder):
+    """チャンクごとに圧縮してフラッシュする（元のイテレータは閉じるときに閉じる）"""
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            data = encoder.compress(chunk) + encoder.flush()
+            if data:
+                yield data
+        yield encoder.finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
@@ -1,14 +1,44 @@
+import copy
 import json
+import threading
+import time
 from pathlib import Path
+from typing import Callable
 
+from src.common.logger import get_logger
 from src.common.paths import get_config_dir
 
+logger = get_logger("app")
+
+WATCH_INTERVAL_SECONDS = 1.0
+
+_lock = threading.Lock()
+# name -> (st_mtime_ns, st_size, data)
+_cache: dict[str, tuple[int, int, dict]] = {}
+_subscribers: dict[str, list[Callable[[dict], None]]] = {}
+# name -> 最後に購読者へ通知した（または購読開始時の）(st_mtime_ns, st_size)
+# 読み込みキャッシュは他の load_config でも更新されるため、変更判定は別に持つ
+_notified: dict[str, tuple[int, int]] = {}
+_watch_thread: threading.Thread | None = None
+
 
 def load_config(name: str) -> dict:
-    """config/{name}.json を読み込んで dict を返す"""
+    """config/{name}.json を読み込んで dict を返す
+
+    ファイルの mtime/size が前回と同じならメモリ上の内容を返す。
+    呼び出し側で書き換えても影響しないようコピーを返す。
+    """
     config_path = get_config_dir() / f"{name}.json"
+    stat = config_path.stat()
+    with _lock:
+        cached = _cache.get(name)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return copy.deepcopy(cached[2])
     with open(config_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+        data = json.load(f)
+    with _lock:
+        _cache[name] = (stat.st_mtime_ns, stat.st_size, data)
+    return copy.deepcopy(data)
 
 
 def save_config(name: str, data: dict) -> None:
@@ -17,3 +47,68 @@ def save_config(name: str, data: dict) -> None:
     with open(config_path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
         f.write("\n")
+    with _lock:
+        _cache.pop(name, None)
+    _check_and_notify(name)
+
+
+def subscribe_config(name: str, callback: Callable[[dict], None]) -> Callable[[], None]:
+    """config/{name}.json の変更時に callback(新しい設定) を呼ぶ。
+
+    監視スレッドが mtime/size を定期確認し、変化したときだけ通知する。
+    戻り値を呼ぶと購読を解除する。
+    """
+    global _watch_thread
+    with _lock:
+        _subscribers.setdefault(name, []).append(callback)
+        if _watch_thread is None or not _watch_thread.is_alive():
+            _watch_thread = threading.Thread(
+                target=_watch_loop, daemon=True, name="config-watch"
+            )
+            _watch_thread.start()
+    # 購読開始時点の内容を基準にする
+    try:
+        load_config(name)
+        with _lock:
+            _notified.setdefault(name, _cache[name][:2])
+    except Exception:
+        pass
+
+    def _unsubscribe() -> None:
+        with _lock:
+            callbacks = _subscribers.get(name, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    return _unsubscribe
+
+
+def _watch_loop() -> None:
+    while True:
+        time.sleep(WATCH_INTERVAL_SECONDS)
+        with _lock:
+            names = [n for n, callbacks in _subscribers.items() if callbacks]
+        for name in names:
+            _check_and_notify(name)
+
+
+def _check_and_notify(name: str) -> None:
+    with _lock:
+        callbacks = list(_subscribers.get(name, []))
+    if not callbacks:
+        return
+    try:
+        data = load_config(name)
+    except Exception:
+        # 書き込み途中などで読めない場合は次回に再試行する
+        return
+    with _lock:
+        stamp = _cache[name][:2]
+        if _notified.get(name) == stamp:
+            return
+        _notified[name] = stamp
+    for callback in callbacks:
+        try:
+            callback(copy.deepcopy(data))
+        except Exception:
+            logger.exception("設定変更通知の処理に失敗: %s", name)
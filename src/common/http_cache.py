@@ -0,0 +1,74 @@
+"""ETag による条件付き応答
+
+応答の元になるデータの版から ETag を作り、If-None-Match が一致すれば
+本文を組み立てずに 304 を返す。ブラウザには毎回再検証させる（no-cache）。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable
+from uuid import uuid4
+
+from flask import Response, current_app, make_response, request
+
+# 世代番号はプロセス内でしか一意でないため、再起動で必ず変わる値を混ぜる
+_PROCESS_ID = uuid4().hex
+
+# directory_stamp の結果を保持する秒数（ページ表示ごとにツリーを走査しない）
+DIRECTORY_STAMP_TTL_SECONDS = 5.0
+
+_stamp_lock = threading.Lock()
+# パス -> (取得時刻, 一覧)
+_stamp_cache: dict[str, tuple[float, list]] = {}
+
+
+def make_etag(*parts) -> str:
+    """版を表す値（JSON化できるもの）から強い ETag 値を作る"""
+    raw = json.dumps(
+        [_PROCESS_ID, *parts], ensure_ascii=False, sort_keys=True, default=str
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def conditional_response(etag: str, build: Callable[[], object]) -> Response:
+    """If-None-Match が etag と一致すれば 304、そうでなければ build() の応答を返す"""
+    # 圧縮時は弱い ETag で返すため、弱い比較で照合する
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(build())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def directory_stamp(path: str) -> list:
+    """ディレクトリ配下のファイルの (相対パス, 更新日時, サイズ) 一覧を返す
+
+    結果は DIRECTORY_STAMP_TTL_SECONDS の間使い回す。
+    """
+    now = time.monotonic()
+    with _stamp_lock:
+        cached = _stamp_cache.get(path)
+    if cached is not None and now - cached[0] < DIRECTORY_STAMP_TTL_SECONDS:
+        return cached[1]
+    stamp = _scan_directory(path)
+    with _stamp_lock:
+        _stamp_cache[path] = (now, stamp)
+    return stamp
+
+
+def _scan_directory(path: str) -> list:
+    stamp = []
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            full = os.path.join(root, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            stamp.append((os.path.relpath(full, path), st.st_mtime_ns, st.st_size))
+    stamp.sort()
+    return stamp
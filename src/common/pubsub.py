@@ -0,0 +1,104 @@
+import queue
+import threading
+
+DEFAULT_QUEUE_SIZE = 256
+
+
+class Subscription:
+    """1つ以上の Channel の購読。受信したメッセージを自分のキューに溜める"""
+
+    def __init__(self, channels: list["Channel"], maxsize: int):
+        self._channels = channels
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def get(self, timeout: float | None = None):
+        """次のメッセージを返す。timeout までに届かなければ None を返す"""
+        item = self.get_with_channel(timeout)
+        return item[1] if item else None
+
+    def get_with_channel(self, timeout: float | None = None) -> tuple[str, object] | None:
+        """次のメッセージを (チャネル名, メッセージ) で返す。届かなければ None"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        for channel in self._channels:
+            channel._remove(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _offer(self, channel_name: str, message) -> None:
+        # 読み手が追いつかない場合は古いものから捨てる（取りこぼしは dropped で分かる）
+        while True:
+            try:
+                self._queue.put_nowait((channel_name, message))
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class Channel:
+    """プロセス内の publish/subscribe チャネル。publish は購読者全員へ即座に配る"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._subscriptions: list[Subscription] = []
+
+    def subscribe(self, maxsize: int = DEFAULT_QUEUE_SIZE) -> Subscription:
+        subscription = Subscription([self], maxsize)
+        self._add(subscription)
+        return subscription
+
+    def publish(self, message) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription._offer(self.name, message)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def _add(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.append(subscription)
+
+    def _remove(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+
+_channels: dict[str, Channel] = {}
+_channels_lock = threading.Lock()
+
+
+def get_channel(name: str) -> Channel:
+    """名前付きチャネルを返す（なければ作る）"""
+    with _channels_lock:
+        channel = _channels.get(name)
+        if channel is None:
+            channel = Channel(name)
+            _channels[name] = channel
+        return channel
+
+
+def subscribe(*names: str, maxsize: int = DEFAULT_QUEUE_SIZE) -> Subscription:
+    """複数のチャネルを1つのキューでまとめて購読する"""
+    channels = [get_channel(name) for name in names]
+    subscription = Subscription(channels, maxsize)
+    for channel in channels:
+        channel._add(subscription)
+    return subscription
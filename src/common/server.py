@@ -0,0 +1,392 @@
+"""Wiki / Admin アプリの HTTP サーバ
+
+config の "server.mode" で Flask の開発サーバ（development）と、
+プロセス内に組み込むスレッドプール型の WSGI サーバ（production）を切り替える。
+production では同時処理数・待ち行列の長さ・keep-alive の待ち時間を上限付きにし、
+終了時は受付を止めて処理中のリクエストを待ってから閉じる。
+"""
+import queue
+import selectors
+import socket
+import threading
+import time
+
+from flask import Flask
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from src.common.logger import get_logger
+
+logger = get_logger("app")
+
+DEFAULT_WORKERS = 16
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_KEEPALIVE_SECONDS = 5.0
+DEFAULT_SHUTDOWN_TIMEOUT_SECONDS = 5.0
+DEFAULT_MAX_STREAMS = 32
+
+_BUSY_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Length: 0\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n\r\n"
+)
+
+
+class _KeepAliveRequestHandler(WSGIRequestHandler):
+    """HTTP/1.1 で接続を使い回す。待ち時間はサーバごとに設定する"""
+
+    protocol_version = "HTTP/1.1"
+
+
+class _PooledRequestHandler(_KeepAliveRequestHandler):
+    """リクエスト1件ごとにワーカーへ割り当てる接続ハンドラ"""
+
+    def __init__(self, request, client_address, server):
+        # BaseRequestHandler.__init__ は接続が閉じるまで処理を続けるため、準備だけ行う
+        self.request = request
+        self.client_address = client_address
+        self.server = server
+        self.stream_requested = False
+        self.setup()
+
+    def serve_one(self) -> bool:
+        """リクエストを1件処理する。同じ接続で次のリクエストを受けられるなら True"""
+        self.close_connection = True
+        try:
+            self.handle_one_request()
+        except (ConnectionError, socket.timeout) as e:
+            self.connection_dropped(e)
+            return False
+        return not self.close_connection
+
+    def has_buffered_request(self) -> bool:
+        """次のリクエストが既に届いていれば True（待たずに確認する）"""
+        try:
+            self.connection.settimeout(0)
+            try:
+                return bool(self.rfile.peek(1))
+            finally:
+                self.connection.settimeout(self.timeout)
+        except (OSError, ValueError):
+            return False
+
+    def run_wsgi(self) -> None:
+        # SSE は長時間続くので、ワーカーではなく専用スレッドで応答する
+        if not self.stream_requested and self.server.accepts_stream(self):
+            self.stream_requested = True
+            self.close_connection = True
+            return
+        super().run_wsgi()
+
+    def close(self) -> None:
+        try:
+            self.finish()
+        except OSError:
+            pass
+        self.server.shutdown_request(self.request)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """固定数のワーカースレッドでリクエストを処理する WSGI サーバ。
+
+    リクエストを待っている接続（受け付け直後・keep-alive の待機中）はワーカーを使わず、
+    監視スレッドがまとめて待つ。届いたリクエストは上限付きのキューに積んでワーカーが
+    1件ずつ処理し、溢れた分は 503 で断る。SSE（Accept: text/event-stream）は
+    max_streams 本まで専用スレッドで応答し、ワーカーを占有しない。
+    """
+
+    multithread = True
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        app: Flask,
+        name: str,
+        workers: int = DEFAULT_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        keepalive_seconds: float = DEFAULT_KEEPALIVE_SECONDS,
+        shutdown_timeout: float = DEFAULT_SHUTDOWN_TIMEOUT_SECONDS,
+        max_streams: int = DEFAULT_MAX_STREAMS,
+    ):
+        handler = type(
+            "RequestHandler",
+            (_PooledRequestHandler,),
+            {"timeout": keepalive_seconds},
+        )
+        super().__init__(host, port, app, handler=handler)
+        self.name = name
+        self.keepalive_seconds = keepalive_seconds
+        self.shutdown_timeout = shutdown_timeout
+        self.max_streams = max(0, max_streams)
+        self._requests: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._serving = threading.Event()
+        self._stopping = threading.Event()
+        self._streams_lock = threading.Lock()
+        self._streams: set[_PooledRequestHandler] = set()
+        # 待機中の接続: ソケット -> (クライアントアドレス, ハンドラ, 期限)
+        self._idle: dict = {}
+        self._idle_pending: list = []
+        self._idle_lock = threading.Lock()
+        self._idle_closed = False
+        self._idle_wakeup_r, self._idle_wakeup_w = socket.socketpair()
+        self._idle_wakeup_r.setblocking(False)
+        self._idle_thread = threading.Thread(
+            target=self._idle_loop, daemon=True, name=f"{name}-http-idle"
+        )
+        self._idle_thread.start()
+        self._workers = [
+            threading.Thread(
+                target=self._worker_loop,
+                daemon=True,
+                name=f"{name}-http-{i}",
+            )
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        self._serving.set()
+        try:
+            super().serve_forever(poll_interval=poll_interval)
+        finally:
+            self._serving.clear()
+
+    def process_request(self, request, client_address) -> None:
+        self._park(request, client_address, None)
+
+    def accepts_stream(self, handler: _PooledRequestHandler) -> bool:
+        """SSE のリクエストで、専用スレッドに空きがあれば True"""
+        if "text/event-stream" not in handler.headers.get("Accept", ""):
+            return False
+        with self._streams_lock:
+            if len(self._streams) >= self.max_streams or self._stopping.is_set():
+                return False
+            self._streams.add(handler)
+        return True
+
+    def stop(self) -> None:
+        """受付を止め、キュー済み・処理中のリクエストを shutdown_timeout 秒まで待つ"""
+        if self._serving.is_set():
+            self.shutdown()
+        self._stopping.set()
+        self._wake_idle_loop()
+        # SSE は終わらないので、接続を切って応答中のスレッドを抜けさせる
+        with self._streams_lock:
+            streams = list(self._streams)
+        for handler in streams:
+            try:
+                handler.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        deadline = time.monotonic() + self.shutdown_timeout
+        current = threading.current_thread()
+        for worker in self._workers:
+            if worker is current:
+                continue
+            worker.join(max(0.0, deadline - time.monotonic()))
+        busy = sum(1 for w in self._workers if w.is_alive() and w is not current)
+        if busy:
+            logger.info("%s サーバ停止: 処理中の接続 %d 件を打ち切り", self.name, busy)
+
+    def _worker_loop(self) -> None:
+        # 停止後もキューに残った接続は処理してから抜ける
+        while True:
+            try:
+                request, client_address, handler = self._requests.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            try:
+                if handler is None:
+                    handler = self.RequestHandlerClass(request, client_address, self)
+                self._serve(handler)
+            except Exception:
+                self.handle_error(request, client_address)
+                if handler is not None:
+                    handler.close()
+                else:
+                    self.shutdown_request(request)
+
+    def _serve(self, handler: _PooledRequestHandler) -> None:
+        """届いているリクエストを処理し、接続を監視スレッド・SSE スレッドへ渡すか閉じる"""
+        while True:
+            keep = handler.serve_one()
+            if handler.stream_requested:
+                threading.Thread(
+                    target=self._serve_stream,
+                    args=(handler,),
+                    daemon=True,
+                    name=f"{self.name}-http-stream",
+                ).start()
+                return
+            if not keep or self._stopping.is_set():
+                handler.close()
+                return
+            if not handler.has_buffered_request():
+                self._park(handler.request, handler.client_address, handler)
+                return
+
+    def _serve_stream(self, handler: _PooledRequestHandler) -> None:
+        try:
+            _KeepAliveRequestHandler.run_wsgi(handler)
+            handler.wfile.flush()
+        except (ConnectionError, socket.timeout) as e:
+            handler.connection_dropped(e)
+        except Exception:
+            self.handle_error(handler.request, handler.client_address)
+        finally:
+            with self._streams_lock:
+                self._streams.discard(handler)
+            handler.close()
+
+    def _dispatch(self, request, client_address, handler) -> None:
+        """リクエストが届いた接続をワーカーのキューに積む。満杯なら 503 で閉じる"""
+        try:
+            self._requests.put_nowait((request, client_address, handler))
+            return
+        except queue.Full:
+            pass
+        logger.warning("%s サーバ混雑のため接続を拒否: %s", self.name, client_address)
+        try:
+            request.sendall(_BUSY_RESPONSE)
+        except OSError:
+            pass
+        if handler is not None:
+            handler.close()
+        else:
+            self.shutdown_request(request)
+
+    def _park(self, request, client_address, handler) -> None:
+        """次のリクエストが届くまで、接続を監視スレッドに預ける"""
+        deadline = time.monotonic() + self.keepalive_seconds
+        with self._idle_lock:
+            closed = self._idle_closed
+            if not closed:
+                self._idle_pending.append((request, client_address, handler, deadline))
+        if closed:
+            self._close_idle(request, handler)
+            return
+        self._wake_idle_loop()
+
+    def _wake_idle_loop(self) -> None:
+        try:
+            self._idle_wakeup_w.send(b"\0")
+        except OSError:
+            pass
+
+    def _idle_loop(self) -> None:
+        selector = selectors.DefaultSelector()
+        selector.register(self._idle_wakeup_r, selectors.EVENT_READ)
+        try:
+            while True:
+                with self._idle_lock:
+                    pending, self._idle_pending = self._idle_pending, []
+                for request, client_address, handler, deadline in pending:
+                    try:
+                        selector.register(request, selectors.EVENT_READ)
+                    except (OSError, ValueError):
+                        self._close_idle(request, handler)
+                        continue
+                    self._idle[request] = (client_address, handler, deadline)
+                if self._stopping.is_set():
+                    break
+
+                now = time.monotonic()
+                timeout = min(
+                    [0.5] + [max(0.0, entry[2] - now) for entry in self._idle.values()]
+                )
+                for key, _events in selector.select(timeout):
+                    if key.fileobj is self._idle_wakeup_r:
+                        try:
+                            while self._idle_wakeup_r.recv(4096):
+                                pass
+                        except OSError:
+                            pass
+                        continue
+                    request = key.fileobj
+                    selector.unregister(request)
+                    client_address, handler, _deadline = self._idle.pop(request)
+                    self._dispatch(request, client_address, handler)
+
+                now = time.monotonic()
+                for request in [r for r, e in self._idle.items() if e[2] <= now]:
+                    selector.unregister(request)
+                    _client_address, handler, _deadline = self._idle.pop(request)
+                    self._close_idle(request, handler)
+        finally:
+            for request, (_client_address, handler, _deadline) in list(self._idle.items()):
+                self._close_idle(request, handler)
+            self._idle.clear()
+            with self._idle_lock:
+                self._idle_closed = True
+                pending, self._idle_pending = self._idle_pending, []
+            for request, _client_address, handler, _deadline in pending:
+                self._close_idle(request, handler)
+            selector.close()
+            self._idle_wakeup_r.close()
+            self._idle_wakeup_w.close()
+
+    def _close_idle(self, request, handler) -> None:
+        if handler is not None:
+            handler.close()
+        else:
+            self.shutdown_request(request)
+
+
+_servers: list[PooledWSGIServer] = []
+_servers_lock = threading.Lock()
+
+
+def serve(app: Flask, host: str, port: int, config: dict, name: str) -> None:
+    """config（app.json / admin.json）の設定でアプリを配信する。停止するまで戻らない"""
+    settings = config.get("server", {})
+    mode = settings.get("mode", "development")
+    if mode != "production":
+        app.run(
+            host=host,
+            port=port,
+            debug=config.get("debug", False),
+            use_reloader=False,
+            threaded=True,
+        )
+        return
+
+    server = PooledWSGIServer(
+        host,
+        port,
+        app,
+        name,
+        workers=int(settings.get("workers", DEFAULT_WORKERS)),
+        queue_size=int(settings.get("queue_size", DEFAULT_QUEUE_SIZE)),
+        keepalive_seconds=float(
+            settings.get("keepalive_seconds", DEFAULT_KEEPALIVE_SECONDS)
+        ),
+        shutdown_timeout=float(
+            settings.get("shutdown_timeout_seconds", DEFAULT_SHUTDOWN_TIMEOUT_SECONDS)
+        ),
+        max_streams=int(settings.get("max_streams", DEFAULT_MAX_STREAMS)),
+    )
+    with _servers_lock:
+        _servers.append(server)
+    logger.info(
+        "%s サーバ（production）: workers=%d, queue=%d",
+        name,
+        len(server._workers),
+        server._requests.maxsize,
+    )
+    server.serve_forever()
+
+
+def stop_servers() -> None:
+    """production モードで起動したサーバをすべて停止する"""
+    with _servers_lock:
+        servers = list(_servers)
+        _servers.clear()
+    for server in servers:
+        try:
+            server.stop()
+        except Exception as e:
+            logger.warning("%s サーバ停止失敗: %s", server.name, e)
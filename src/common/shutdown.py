@@ -1,12 +1,16 @@
 import atexit
 import hashlib
-import json
 import os
 from typing import Iterable
 
 from src.common.config import load_config
 from src.common.logger import get_logger
 from src.common.paths import get_state_dir
+from src.common.server import stop_servers
+from src.watcher.event_journal import get_event_journal
+from src.watcher.index_store import get_index_store
+from src.wiki_app.services.backup_scheduler import get_backup_scheduler
+from src.wiki_app.services.export_engine import shutdown_render_pool
 
 logger = get_logger("app")
 
@@ -19,16 +23,23 @@ def register_exit_cleanup() -> None:
 
 
 def cleanup_and_exit(reason: str) -> None:
-    """クリーンアップ後に強制終了する（os._exit）"""
+    """HTTP サーバを止めてクリーンアップした後に強制終了する（os._exit）"""
     try:
         logger.info(reason)
+        stop_servers()
         _cleanup_on_exit()
+        shutdown_render_pool()
     finally:
         os._exit(0)
 
 
 def _cleanup_on_exit() -> None:
-    """停電・電車・気象情報の状態を終了時に削除する"""
+    """予約中のバックアップを反映し、停電・電車・気象情報の状態を終了時に削除する"""
+    try:
+        if not get_backup_scheduler().flush():
+            logger.warning("終了時のバックアップ更新が時間内に終わりませんでした")
+    except Exception as e:
+        logger.warning("終了時バックアップ更新失敗: %s", e)
     try:
         cleanup_watcher_targets(_CLEANUP_TYPES)
     except Exception as e:
@@ -49,8 +60,6 @@ def cleanup_watcher_targets(target_types: Iterable[str]) -> None:
 
     state_dir = get_state_dir() / "watcher"
     snapshots_dir = state_dir / "snapshots"
-    events_dir = state_dir / "events"
-    index_path = state_dir / "index.json"
 
     # snapshots
     removed_snapshots = 0
@@ -63,33 +72,17 @@ def cleanup_watcher_targets(target_types: Iterable[str]) -> None:
 
     # events
     removed_events = 0
-    if events_dir.exists():
-        for ef in events_dir.glob("*.json"):
-            try:
-                with open(ef, "r", encoding="utf-8") as f:
-                    event = json.load(f)
-                if event.get("target_name") in names:
-                    ef.unlink()
-                    removed_events += 1
-            except Exception:
-                pass
-
-    # index.json
+    try:
+        removed_events = get_event_journal().purge_targets(names)
+    except Exception:
+        pass
+
+    # index
     removed_index = 0
-    if index_path.exists():
-        try:
-            with open(index_path, "r", encoding="utf-8") as f:
-                index = json.load(f)
-            targets_map = index.get("targets", {})
-            filtered = {
-                h: t for h, t in targets_map.items() if t.get("name") not in names
-            }
-            removed_index = len(targets_map) - len(filtered)
-            index["targets"] = filtered
-            with open(index_path, "w", encoding="utf-8") as f:
-                json.dump(index, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+    try:
+        removed_index = get_index_store().remove_targets(names)
+    except Exception:
+        pass
 
     logger.info(
         "終了時クリーンアップ: snapshots=%d, events=%d, index=%d",
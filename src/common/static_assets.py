@@ -0,0 +1,84 @@
+"""静的ファイルの URL とキャッシュ制御
+
+テンプレートでは static_url("js/app.js") を使い、内容のハッシュを ?v= に付けた URL を出す。
+ファイルが変わると URL も変わるため、?v= 付きの応答は長期間の immutable キャッシュにできる。
+config の "static_cache" を "no-store" にすると、従来どおり毎回読み直させる（開発用）。
+"""
+import hashlib
+import os
+import threading
+
+from flask import Flask, Response, request, url_for
+
+IMMUTABLE_MAX_AGE_SECONDS = 365 * 24 * 3600
+NO_STORE_HEADERS = {
+    "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
+    "Pragma": "no-cache",
+    "Expires": "0",
+}
+
+
+class StaticFingerprints:
+    """静的ファイルの内容ハッシュ。更新日時とサイズが変わったときだけ計算し直す"""
+
+    def __init__(self, static_folder: str):
+        self._static_folder = static_folder
+        self._lock = threading.Lock()
+        self._cache: dict[str, tuple[int, int, str]] = {}
+
+    def get(self, filename: str) -> str:
+        """ハッシュ（先頭12桁）を返す。ファイルがなければ空文字"""
+        path = os.path.join(self._static_folder, filename)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return ""
+        with self._lock:
+            cached = self._cache.get(filename)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        digest = hashlib.sha256()
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    digest.update(chunk)
+        except OSError:
+            return ""
+        fingerprint = digest.hexdigest()[:12]
+        with self._lock:
+            self._cache[filename] = (st.st_mtime_ns, st.st_size, fingerprint)
+        return fingerprint
+
+
+def init_static_assets(app: Flask, config: dict) -> None:
+    """static_url をテンプレートに登録し、/static/ の応答にキャッシュヘッダを付ける"""
+    fingerprints = StaticFingerprints(app.static_folder)
+    immutable = config.get("static_cache", "immutable") != "no-store"
+
+    def static_url(filename: str) -> str:
+        if not immutable:
+            return url_for("static", filename=filename)
+        fingerprint = fingerprints.get(filename)
+        if not fingerprint:
+            return url_for("static", filename=filename)
+        return url_for("static", filename=filename, v=fingerprint)
+
+    app.add_template_global(static_url, "static_url")
+
+    @app.after_request
+    def static_cache_headers(response: Response) -> Response:
+        if not request.path.startswith(app.static_url_path + "/"):
+            return response
+        if not immutable:
+            response.headers.update(NO_STORE_HEADERS)
+            return response
+        filename = request.path[len(app.static_url_path) + 1:]
+        version = request.args.get("v")
+        if response.status_code == 200 and version and version == fingerprints.get(filename):
+            response.headers["Cache-Control"] = (
+                f"public, max-age={IMMUTABLE_MAX_AGE_SECONDS}, immutable"
+            )
+        else:
+            # 指紋なし・古い指紋の URL は毎回 ETag で再検証させる
+            response.headers["Cache-Control"] = "no-cache"
+        return response
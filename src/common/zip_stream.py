@@ -0,0 +1,85 @@
+"""ZIP をメモリに溜めずにチャンクで送り出す
+
+zipfile は書き込み先がシーク不可だとデータディスクリプタ形式で書くため、
+書き込まれたバイト列をそのまま応答に流せる。1エントリずつ圧縮しながら、
+溜まった分をその都度 yield する。
+"""
+import time
+import zipfile
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+DEFAULT_COMPRESS_LEVEL = 6
+_READ_SIZE = 64 * 1024
+
+# (アーカイブ内の名前, 内容) 内容は ファイルパス / bytes / str / 文字列を返す関数
+ZipEntry = tuple[str, Path | bytes | str | Callable[[], str | bytes]]
+
+
+class _ChunkSink:
+    """zipfile の書き込み先。書かれたバイト列を取り出すまで保持する"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(
+    entries: Iterable[ZipEntry],
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+) -> Iterator[bytes]:
+    """entries を順に圧縮し、ZIP のバイト列をチャンクで返す"""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(
+        sink, "w", zipfile.ZIP_DEFLATED, compresslevel=compress_level
+    ) as zf:
+        for arcname, source in entries:
+            if isinstance(source, Path):
+                info = _deflated(zipfile.ZipInfo.from_file(source, arcname), compress_level)
+                with open(source, "rb") as src, zf.open(info, "w") as dest:
+                    for block in iter(lambda: src.read(_READ_SIZE), b""):
+                        dest.write(block)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            else:
+                if callable(source):
+                    source = source()
+                if isinstance(source, str):
+                    source = source.encode("utf-8")
+                info = _deflated(
+                    zipfile.ZipInfo(arcname, date_time=time.localtime()[:6]),
+                    compress_level,
+                )
+                with zf.open(info, "w") as dest:
+                    for start in range(0, len(source), _READ_SIZE):
+                        dest.write(source[start:start + _READ_SIZE])
+                        data = sink.drain()
+                        if data:
+                            yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # 中央ディレクトリ
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def _deflated(info: zipfile.ZipInfo, compress_level: int) -> zipfile.ZipInfo:
+    info.compress_type = zipfile.ZIP_DEFLATED
+    # ZipInfo を渡して open すると ZipFile の compresslevel は引き継がれない
+    info._compresslevel = compress_level
+    return info
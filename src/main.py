@@ -12,17 +12,24 @@ if not getattr(sys, "frozen", False):
     if _project_root not in sys.path:
         sys.path.insert(0, _project_root)
 
-from src.common.paths import ensure_dirs, get_state_dir, get_base_dir, get_alert_ui_dir
+from src.common.paths import ensure_dirs, get_base_dir, get_alert_ui_dir
 from src.common.config import load_config
 from src.common.heartbeat import get_active_session_count, get_last_activity, init_heartbeat
 from src.common.shutdown import cleanup_and_exit, register_exit_cleanup
 from src.common.logger import get_logger
+from src.common.pubsub import get_channel
+from src.common.server import serve
 from src.wiki_app.app import create_app
 from src.admin_app.app import create_admin_app
+from src.watcher.event_journal import get_event_journal
+from src.watcher.event_writer import EVENT_CHANNEL
 from src.watcher.scheduler import start_watcher, stop_watcher
 
 logger = get_logger("app")
 
+ALERT_POLLER_CONSUMER = "alert-poller"
+ALERT_REPLAY_INTERVAL_SECONDS = 60
+
 
 def _start_watcher_thread() -> threading.Thread:
     """Watcher をバックグラウンドスレッドで起動する"""
@@ -41,31 +48,52 @@ def _start_alert_poller_thread() -> threading.Thread:
 
 
 def _alert_poller() -> None:
-    """state/watcher/events/ を定期監視し、新規JSONを検出したらアラートを表示する"""
+    """新規イベントの配信を待ち受けてアラートを表示する。
+
+    起動時・待ち受けの合間・取りこぼし時はイベントジャーナルを前回の位置から読み、
+    配信と重なったイベントは seq で除外する。
+    """
     alert_logger = get_logger("alert")
-    events_dir = get_state_dir() / "watcher" / "events"
+    journal = get_event_journal()
+    subscription = get_channel(EVENT_CHANNEL).subscribe()
+    last_seq = 0
+    need_replay = True
+
+    def _handle(event: dict, position) -> None:
+        nonlocal last_seq
+        if position.seq <= last_seq:
+            return
+        try:
+            _normalize_event(event)
+            alert_logger.info(
+                "アラート表示: %s - %s",
+                event.get("target_name"),
+                event.get("summary"),
+            )
+            _show_alert(event)
+        except Exception as e:
+            alert_logger.error("イベント処理失敗: seq=%s - %s", position.seq, e)
+        journal.commit(ALERT_POLLER_CONSUMER, position)
+        last_seq = position.seq
 
     while True:
         try:
-            if events_dir.exists():
-                for event_file in sorted(events_dir.glob("*.json")):
-                    try:
-                        with open(event_file, "r", encoding="utf-8") as f:
-                            event = json.load(f)
-                        _normalize_event(event)
-                        alert_logger.info(
-                            "アラート表示: %s - %s",
-                            event.get("target_name"),
-                            event.get("summary"),
-                        )
-                        _show_alert(event)
-                        os.remove(event_file)
-                    except Exception as e:
-                        alert_logger.error("イベント処理失敗: %s - %s", event_file.name, e)
+            if need_replay:
+                for event, position in journal.read_new(ALERT_POLLER_CONSUMER):
+                    _handle(event, position)
+                need_replay = False
+            message = subscription.get(timeout=ALERT_REPLAY_INTERVAL_SECONDS)
+            if message is None:
+                need_replay = True
+                continue
+            if subscription.dropped:
+                subscription.dropped = 0
+                need_replay = True
+            _handle(dict(message["event"]), message["position"])
         except Exception as e:
             alert_logger.error("Alert Poller エラー: %s", e)
-
-        time.sleep(5)
+            need_replay = True
+            time.sleep(1)
 
 
 def _show_alert(event: dict) -> None:
@@ -236,12 +264,7 @@ def _start_admin_thread() -> threading.Thread:
     host = admin_config.get("host", "127.0.0.1")
     port = admin_config.get("port", 8081)
     t = threading.Thread(
-        target=lambda: admin_app.run(
-            host=host,
-            port=port,
-            use_reloader=False,
-            threaded=True,
-        ),
+        target=lambda: serve(admin_app, host, port, admin_config, "admin"),
         daemon=True,
         name="admin",
     )
@@ -300,14 +323,10 @@ def main() -> None:
 
     app = create_app()
     logger.info("Flask サーバ起動: %s:%s", host, port)
-    app.run(
-        host=host,
-        port=port,
-        debug=app_config.get("debug", False),
-        use_reloader=False,
-        threaded=True,
-    )
+    serve(app, host, port, app_config, "wiki")
 
 
 if __name__ == "__main__":
+    # exe 実行時に子プロセス（アラート UI・レンダリングプール）として起動された場合の入口
+    multiprocessing.freeze_support()
     main()
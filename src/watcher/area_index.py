@@ -0,0 +1,343 @@
+"""気象庁 area.json の地域階層インデックス
+
+エリアコードごとの 市町村・区域・地域・都道府県 を事前に解決して保持し、
+警報ごとの階層解決を辞書引き1回で済ませる。
+state/watcher/area_index.json に保存し、area.json が変わったときだけ作り直す。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from src.common.logger import get_logger
+from src.common.paths import get_state_dir
+from src.watcher.fetcher import NotModified, fetch_json
+
+logger = get_logger("watcher")
+
+INDEX_VERSION = 1
+# area.json はほとんど変わらないため、再検証はこの間隔ごとにする
+REFRESH_INTERVAL_SECONDS = 3600
+LEVELS = ["class20s", "class15s", "class10s", "offices", "centers"]
+EMPTY_HIERARCHY = {
+    "city": None,
+    "district": None,
+    "region": None,
+    "prefecture": None,
+}
+
+
+class AreaIndex:
+    """エリアコード → 地域階層 の解決表"""
+
+    def __init__(self, entries: dict[str, dict], normalized: dict[str, str]):
+        self._entries = entries
+        # 数値として同じコード（先頭ゼロ違いなど）→ area.json 上のコード
+        self._normalized = normalized
+
+    @classmethod
+    def build(cls, area_data: dict) -> "AreaIndex":
+        normalized = _build_normalized_table(area_data)
+        office_map = _build_descendant_map(area_data, "offices")
+        region_map = _build_descendant_map(area_data, "class10s")
+        parent_map = _build_parent_map(area_data)
+
+        codes: dict[str, None] = {}
+        for level in LEVELS:
+            for code in area_data.get(level, {}):
+                codes[str(code)] = None
+        for mapping in (office_map, region_map, parent_map):
+            for code in mapping:
+                codes[code] = None
+
+        entries = {
+            code: _resolve_hierarchy(
+                area_data, code, normalized, office_map, region_map, parent_map
+            )
+            for code in codes
+        }
+        return cls(entries, _flatten_normalized(normalized))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AreaIndex":
+        return cls(data.get("entries", {}), data.get("normalized", {}))
+
+    def to_dict(self) -> dict:
+        return {"entries": self._entries, "normalized": self._normalized}
+
+    def resolve(self, code: str) -> dict:
+        """エリアコードから地域階層（city/district/region/prefecture）を返す"""
+        key = str(code)
+        entry = self._entries.get(key)
+        if entry is None:
+            norm = _normalize_code(key)
+            if norm is not None and norm in self._normalized:
+                entry = self._entries.get(self._normalized[norm])
+        return dict(entry or EMPTY_HIERARCHY)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_lock = threading.Lock()
+# area_url -> (インデックス, area.json の内容ハッシュ, 最終確認時刻)
+_loaded: dict[str, tuple[AreaIndex, str, float]] = {}
+
+
+def get_area_index(area_url: str, timeout: int) -> AreaIndex:
+    """area_url の地域階層インデックスを返す。
+
+    メモリ → state/watcher/area_index.json の順に探し、一定間隔ごとに
+    area.json を条件付き取得して、内容が変わっていれば作り直す。
+    """
+    with _lock:
+        loaded = _loaded.get(area_url)
+    if loaded is None:
+        loaded = _load_from_disk(area_url)
+
+    if loaded is not None and time.time() - loaded[2] < REFRESH_INTERVAL_SECONDS:
+        _remember(area_url, loaded)
+        return loaded[0]
+
+    try:
+        area_data = fetch_json(
+            area_url,
+            timeout=timeout,
+            conditional=loaded is not None,
+            cache_scope="area_index",
+        )
+    except NotModified:
+        loaded = (loaded[0], loaded[1], time.time())
+        _remember(area_url, loaded)
+        _save_to_disk(area_url, loaded)
+        return loaded[0]
+    except Exception:
+        if loaded is not None:
+            # 取得できなくても手元のインデックスで解決を続ける
+            logger.warning("area.json 再取得失敗のため保存済みインデックスを使用")
+            return loaded[0]
+        raise
+
+    content_hash = hashlib.sha256(
+        json.dumps(area_data, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    if loaded is not None and loaded[1] == content_hash:
+        index = loaded[0]
+    else:
+        index = AreaIndex.build(area_data)
+        logger.info("地域階層インデックスを再構築: %d件", len(index))
+    loaded = (index, content_hash, time.time())
+    _remember(area_url, loaded)
+    _save_to_disk(area_url, loaded)
+    return index
+
+
+def _remember(area_url: str, loaded: tuple[AreaIndex, str, float]) -> None:
+    with _lock:
+        _loaded[area_url] = loaded
+
+
+def _index_path():
+    return get_state_dir() / "watcher" / "area_index.json"
+
+
+def _load_from_disk(area_url: str) -> tuple[AreaIndex, str, float] | None:
+    try:
+        with open(_index_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if data.get("version") != INDEX_VERSION or data.get("url") != area_url:
+        return None
+    return (
+        AreaIndex.from_dict(data),
+        data.get("hash", ""),
+        float(data.get("checked_at", 0)),
+    )
+
+
+def _save_to_disk(area_url: str, loaded: tuple[AreaIndex, str, float]) -> None:
+    index, content_hash, checked_at = loaded
+    data = {
+        "version": INDEX_VERSION,
+        "url": area_url,
+        "hash": content_hash,
+        "checked_at": checked_at,
+        **index.to_dict(),
+    }
+    path = _index_path()
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("地域階層インデックス保存失敗: %s", e)
+
+
+def _normalize_code(code: str) -> str | None:
+    try:
+        return str(int(code))
+    except (ValueError, TypeError):
+        return None
+
+
+def _build_normalized_table(area_data: dict) -> dict[str, dict[str, str]]:
+    """階層ごとに 数値化したコード → 最初に現れた元のコード の表を作る"""
+    table: dict[str, dict[str, str]] = {}
+    for level in LEVELS:
+        level_table: dict[str, str] = {}
+        for key in area_data.get(level, {}):
+            norm = _normalize_code(key)
+            if norm is not None and norm not in level_table:
+                level_table[norm] = key
+        table[level] = level_table
+    return table
+
+
+def _flatten_normalized(normalized: dict[str, dict[str, str]]) -> dict[str, str]:
+    flat: dict[str, str] = {}
+    for level in LEVELS:
+        for norm, key in normalized.get(level, {}).items():
+            flat.setdefault(norm, key)
+    return flat
+
+
+def _find_area(
+    area_data: dict, cur: str, normalized: dict[str, dict[str, str]]
+) -> tuple[dict | None, str | None, str]:
+    """cur に一致するエリアを階層の順に探す（完全一致 → 数値一致）"""
+    norm = _normalize_code(cur)
+    for level in LEVELS:
+        area_dict = area_data.get(level, {})
+        if cur in area_dict:
+            return area_dict[cur], level, cur
+        if norm is not None:
+            key = normalized[level].get(norm)
+            if key is not None:
+                return area_dict[key], level, key
+    return None, None, cur
+
+
+def _resolve_hierarchy(
+    area_data: dict,
+    code: str,
+    normalized: dict[str, dict[str, str]],
+    office_map: dict[str, str],
+    region_map: dict[str, str],
+    parent_map: dict[str, str],
+) -> dict:
+    """エリアコードから地域階層（市町村→都道府県）を辿る"""
+    result = dict(EMPTY_HIERARCHY)
+
+    cur = str(code)
+    for _ in range(10):
+        found, level, cur = _find_area(area_data, cur, normalized)
+        if not found:
+            break
+
+        if level == "class20s":
+            result["city"] = found.get("name")
+        elif level == "class15s":
+            result["district"] = found.get("name")
+        elif level == "class10s":
+            if not result["region"]:
+                result["region"] = found.get("name")
+        elif level == "offices":
+            if not result["prefecture"]:
+                result["prefecture"] = found.get("name")
+
+        parent = found.get("parent")
+        if isinstance(parent, (list, tuple)) and parent:
+            parent = parent[0]
+        elif isinstance(parent, dict):
+            parent = parent.get("code") or parent.get("id")
+        if not parent:
+            parent = parent_map.get(str(cur))
+        if parent:
+            cur = str(parent)
+        else:
+            break
+
+    code_key = str(code)
+    if not result["prefecture"]:
+        resolved = office_map.get(code_key)
+        if resolved:
+            result["prefecture"] = resolved
+    if not result["region"]:
+        resolved = region_map.get(code_key)
+        if resolved:
+            result["region"] = resolved
+    if not result["prefecture"] or not result["region"]:
+        pref_name, region_name = _resolve_by_parent_map(
+            code_key, parent_map, area_data
+        )
+        if not result["prefecture"] and pref_name:
+            result["prefecture"] = pref_name
+        if not result["region"] and region_name:
+            result["region"] = region_name
+
+    return result
+
+
+def _build_descendant_map(area_data: dict, root_level: str) -> dict[str, str]:
+    class10s = area_data.get("class10s", {})
+    class15s = area_data.get("class15s", {})
+    roots = area_data.get(root_level, {})
+
+    def children_of(code: str) -> list[str]:
+        if code in class10s:
+            return [str(c) for c in class10s[code].get("children", [])]
+        if code in class15s:
+            return [str(c) for c in class15s[code].get("children", [])]
+        return []
+
+    mapping: dict[str, str] = {}
+    for root in roots.values():
+        name = root.get("name")
+        if not name:
+            continue
+        queue = deque(str(c) for c in root.get("children", []))
+        while queue:
+            cur = queue.popleft()
+            if cur in mapping:
+                continue
+            mapping[cur] = name
+            queue.extend(children_of(cur))
+    return mapping
+
+
+def _build_parent_map(area_data: dict) -> dict[str, str]:
+    levels = ["centers", "offices", "class10s", "class15s", "class20s"]
+    mapping: dict[str, str] = {}
+    for level in levels:
+        nodes = area_data.get(level, {})
+        for code, node in nodes.items():
+            for child in node.get("children", []):
+                child_code = str(child)
+                if child_code not in mapping:
+                    mapping[child_code] = str(code)
+    return mapping
+
+
+def _resolve_by_parent_map(
+    code: str, parent_map: dict[str, str], area_data: dict
+) -> tuple[str | None, str | None]:
+    offices = area_data.get("offices", {})
+    class10s = area_data.get("class10s", {})
+    pref = None
+    region = None
+    cur = str(code)
+    for _ in range(12):
+        if not pref and cur in offices:
+            pref = offices[cur].get("name")
+        if not region and cur in class10s:
+            region = class10s[cur].get("name")
+        parent = parent_map.get(cur)
+        if not parent:
+            break
+        cur = parent
+    return pref, region
@@ -0,0 +1,121 @@
+"""Web情報ボード（/api/watcher/board）の表示用データと変更配信
+
+index が更新されるたびに、変わったターゲットだけをボード形式に整えて
+BOARD_CHANNEL へ配信する。SSE の各接続はこのチャネルを購読する。
+"""
+import threading
+
+from src.common.config import load_config
+from src.common.logger import get_logger
+from src.common.pubsub import get_channel
+from src.watcher.index_store import IndexStore, get_index_store
+
+logger = get_logger("watcher")
+
+# メッセージは {"type": "targets", ...} または {"type": "reset", ...}
+BOARD_CHANNEL = "watcher.board"
+
+
+def build_board_target(target: dict, entry: dict) -> dict:
+    """設定1件と index のエントリからボード表示用の dict を作る"""
+    return {
+        "name": target.get("name", "unknown"),
+        "type": target.get("type", "generic"),
+        "enabled": target.get("enabled", True),
+        "status": entry.get("status", "unknown"),
+        "alert_active": entry.get("alert_active", False),
+        "info_active": entry.get("info_active", False),
+        "last_checked": entry.get("last_checked", ""),
+        "last_changed": entry.get("last_changed", ""),
+        "last_alert_at": entry.get("last_alert_at", ""),
+        "last_alert_summary": entry.get("last_alert_summary", ""),
+        "last_info_summary": entry.get("last_info_summary", ""),
+        "site_url": target.get("site_url")
+        or target.get("url")
+        or target.get("warning_url")
+        or target.get("base_url")
+        or "",
+        "url": target.get("url")
+        or target.get("warning_url")
+        or target.get("base_url")
+        or "",
+        "selector": target.get("selector", ""),
+        "detect_mode": target.get("detect_mode", "text_change"),
+        "alert_statuses": target.get("alert_statuses", []),
+        "warning_codes": target.get("warning_codes", []),
+        "threshold": target.get("threshold", None),
+        "area_code": target.get("area_code", ""),
+        "timeout": target.get("timeout", None),
+    }
+
+
+def build_board(config: dict, index: dict, running: bool) -> dict:
+    """ボード全体のデータを作る"""
+    index_by_name = _index_by_name(index)
+    return {
+        "running": running,
+        "last_run": index.get("last_run", ""),
+        "night_stop": config.get("night_stop", {}),
+        "targets": [
+            build_board_target(t, index_by_name.get(t.get("name", "unknown"), {}))
+            for t in config.get("targets", [])
+        ],
+    }
+
+
+class BoardHub:
+    """index の変更を受けて、変わったターゲットのボード用データを配信する"""
+
+    def __init__(self, store: IndexStore):
+        self._store = store
+        self._channel = get_channel(BOARD_CHANNEL)
+        store.add_listener(self._on_index_changed)
+
+    def _on_index_changed(self, version: int, names: set[str] | None) -> None:
+        if self._channel.subscriber_count() == 0:
+            return
+        if names is None:
+            self._channel.publish({"type": "reset", "version": version})
+            return
+        try:
+            config = load_config("watcher")
+        except Exception as e:
+            logger.warning("ボード配信用の設定読み込み失敗: %s", e)
+            return
+        index = self._store.snapshot()
+        index_by_name = _index_by_name(index)
+        targets = [
+            build_board_target(t, index_by_name.get(t.get("name"), {}))
+            for t in config.get("targets", [])
+            if t.get("name") in names
+        ]
+        if not targets:
+            return
+        self._channel.publish({
+            "type": "targets",
+            "version": version,
+            "last_run": index.get("last_run", ""),
+            "targets": targets,
+        })
+
+
+def _index_by_name(index: dict) -> dict[str, dict]:
+    index_by_name = {}
+    for entry in index.get("targets", {}).values():
+        name = entry.get("name")
+        if name:
+            index_by_name[name] = entry
+    return index_by_name
+
+
+_shared_hub: BoardHub | None = None
+_shared_lock = threading.Lock()
+
+
+def get_board_hub() -> BoardHub:
+    """プロセス共通のボード配信ハブを返す（初回呼び出しで index の変更通知に登録する）"""
+    global _shared_hub
+    with _shared_lock:
+        if _shared_hub is None:
+            _shared_hub = BoardHub(get_index_store())
+        return _shared_hub
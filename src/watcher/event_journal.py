@@ -0,0 +1,400 @@
+"""Watcher イベントの追記型ジャーナル
+
+イベントは state/watcher/events/ の JSON Lines セグメント（events-000001.jsonl ...）に
+1行ずつ追記する。各イベントには連番 seq を振り、読み手（Alert Poller など）は
+最後に処理した位置をカーソルとして保存して、続きから読み進める。
+件数・ターゲット別件数・最新イベントは journal.json に集計しておき、
+履歴の問い合わせでセグメントを読まずに済ませる。
+"""
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from src.common.logger import get_logger
+from src.common.paths import get_state_dir
+
+logger = get_logger("watcher")
+
+SEGMENT_MAX_BYTES = 1024 * 1024
+MAX_SEGMENTS = 10
+RECENT_LIMIT = 20
+_SEGMENT_RE = re.compile(r"^events-(\d{6})\.jsonl$")
+_LEGACY_RE = re.compile(r"^\d{14}_[0-9a-f]+\.json$")
+
+
+@dataclass(frozen=True)
+class JournalPosition:
+    """ジャーナル上の読み取り位置（このイベントまで処理済み）"""
+
+    segment: int
+    offset: int
+    seq: int
+
+    def to_dict(self) -> dict:
+        return {"segment": self.segment, "offset": self.offset, "seq": self.seq}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "JournalPosition":
+        return cls(
+            int(data.get("segment", 0)),
+            int(data.get("offset", 0)),
+            int(data.get("seq", 0)),
+        )
+
+
+class EventJournal:
+    """イベントの追記・読み出し・集計を行う（プロセス内で1つを共有する）"""
+
+    def __init__(self, events_dir: Path | None = None):
+        self._dir = events_dir or get_state_dir() / "watcher" / "events"
+        self._meta_path = self._dir / "journal.json"
+        self._cursors_path = self._dir / "cursors.json"
+        self._lock = threading.RLock()
+        self._meta: dict | None = None
+        self._cursors: dict[str, dict] | None = None
+
+    def append(self, event: dict) -> JournalPosition:
+        """イベントを追記し、そのイベントの位置（seq を含む）を返す"""
+        with self._lock:
+            meta = self._ensure_loaded()
+            seq = meta["next_seq"]
+            record = {"seq": seq, **event}
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+
+            segment = meta["current_segment"]
+            path = self._segment_path(segment)
+            if path.exists() and path.stat().st_size >= SEGMENT_MAX_BYTES:
+                segment += 1
+                meta["current_segment"] = segment
+                path = self._segment_path(segment)
+            self._dir.mkdir(parents=True, exist_ok=True)
+            with open(path, "ab") as f:
+                f.write(line.encode("utf-8"))
+                end = f.tell()
+
+            meta["next_seq"] = seq + 1
+            self._count(meta, segment, record)
+            self._drop_old_segments(meta)
+            self._save_meta()
+            return JournalPosition(segment, end, seq)
+
+    def read_new(
+        self, consumer: str, limit: int = 100
+    ) -> list[tuple[dict, JournalPosition]]:
+        """consumer のカーソルより後のイベントを (イベント, 処理後の位置) で返す"""
+        with self._lock:
+            self._ensure_loaded()
+            cursor = self._load_cursors().get(consumer)
+            position = JournalPosition.from_dict(cursor) if cursor else None
+            return self._read_after(position, limit)
+
+    def commit(self, consumer: str, position: JournalPosition) -> None:
+        """consumer の処理済み位置を保存する"""
+        with self._lock:
+            cursors = self._load_cursors()
+            cursors[consumer] = position.to_dict()
+            _write_json_atomic(self._cursors_path, cursors)
+
+    def last_seq(self) -> int:
+        with self._lock:
+            return self._ensure_loaded()["next_seq"] - 1
+
+    def recent(self, limit: int = RECENT_LIMIT) -> list[dict]:
+        """新しい順に最大 limit 件のイベントを返す"""
+        with self._lock:
+            recent = self._ensure_loaded()["recent"]
+            return [dict(e) for e in reversed(recent[-limit:])]
+
+    def stats(self) -> dict:
+        """保持中のイベント件数・ターゲット別件数・セグメントのサイズを返す"""
+        with self._lock:
+            meta = self._ensure_loaded()
+            total = 0
+            by_target: dict[str, int] = {}
+            for info in meta["segments"].values():
+                total += info["count"]
+                for name, count in info["by_target"].items():
+                    by_target[name] = by_target.get(name, 0) + count
+            sizes = 0
+            for segment in meta["segments"]:
+                try:
+                    sizes += self._segment_path(int(segment)).stat().st_size
+                except OSError:
+                    pass
+            return {
+                "total_events": total,
+                "by_target": by_target,
+                "segment_count": len(meta["segments"]),
+                "total_size_bytes": sizes,
+            }
+
+    def clear(self) -> int:
+        """すべてのイベントを削除して件数を返す（seq は振り直さない）"""
+        with self._lock:
+            meta = self._ensure_loaded()
+            deleted = sum(info["count"] for info in meta["segments"].values())
+            for segment in list(meta["segments"]):
+                self._unlink_segment(int(segment))
+            meta["segments"] = {}
+            meta["recent"] = []
+            meta["current_segment"] += 1
+            self._save_meta()
+            return deleted
+
+    def purge_targets(self, names: Iterable[str]) -> int:
+        """指定ターゲットのイベントを削除して件数を返す。該当セグメントは書き直す"""
+        names = set(names)
+        with self._lock:
+            meta = self._ensure_loaded()
+            removed = 0
+            for segment, info in list(meta["segments"].items()):
+                hits = sum(info["by_target"].get(name, 0) for name in names)
+                if not hits:
+                    continue
+                kept = [
+                    record
+                    for record in self._iter_segment(int(segment))
+                    if record.get("target_name") not in names
+                ]
+                removed += hits
+                path = self._segment_path(int(segment))
+                if kept:
+                    _write_lines_atomic(path, kept)
+                    meta["segments"][segment] = _summarize(kept)
+                else:
+                    self._unlink_segment(int(segment))
+                    del meta["segments"][segment]
+            if removed:
+                meta["recent"] = [
+                    e for e in meta["recent"] if e.get("target_name") not in names
+                ]
+                self._save_meta()
+            return removed
+
+    def _read_after(
+        self, position: JournalPosition | None, limit: int
+    ) -> list[tuple[dict, JournalPosition]]:
+        meta = self._meta
+        segments = sorted(int(s) for s in meta["segments"])
+        after_seq = position.seq if position else 0
+        results: list[tuple[dict, JournalPosition]] = []
+        for segment in segments:
+            info = meta["segments"][_segment_key(segment)]
+            if info["last_seq"] <= after_seq:
+                continue
+            # 前回位置と同じセグメントならその続きから読む（書き直されていれば先頭から）
+            start = 0
+            if position and position.segment == segment:
+                start = position.offset
+                if not self._seq_before(segment, start, after_seq):
+                    start = 0
+            for record, end in self._iter_segment_from(segment, start):
+                if record.get("seq", 0) <= after_seq:
+                    continue
+                results.append((record, JournalPosition(segment, end, record["seq"])))
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def _seq_before(self, segment: int, offset: int, seq: int) -> bool:
+        """offset の直前の行が seq のイベントか確かめる"""
+        if offset <= 0:
+            return False
+        path = self._segment_path(segment)
+        try:
+            with open(path, "rb") as f:
+                f.seek(max(0, offset - 64 * 1024))
+                chunk = f.read(offset - max(0, offset - 64 * 1024))
+        except OSError:
+            return False
+        lines = chunk.rstrip(b"\n").rsplit(b"\n", 1)
+        try:
+            return json.loads(lines[-1].decode("utf-8")).get("seq") == seq
+        except (ValueError, UnicodeDecodeError):
+            return False
+
+    def _iter_segment(self, segment: int):
+        for record, _ in self._iter_segment_from(segment, 0):
+            yield record
+
+    def _iter_segment_from(self, segment: int, offset: int):
+        path = self._segment_path(segment)
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return
+        with f:
+            f.seek(offset)
+            while True:
+                line = f.readline()
+                if not line or not line.endswith(b"\n"):
+                    # 書き込み途中の行は次回読む
+                    break
+                end = f.tell()
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                except (ValueError, UnicodeDecodeError):
+                    continue
+                if isinstance(record, dict):
+                    yield record, end
+
+    def _ensure_loaded(self) -> dict:
+        """ロック取得中に呼ぶ"""
+        if self._meta is not None:
+            return self._meta
+        meta = None
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            meta = None
+        if not isinstance(meta, dict) or "segments" not in meta:
+            meta = self._rebuild_meta()
+        self._meta = meta
+        self._migrate_legacy_files()
+        return self._meta
+
+    def _rebuild_meta(self) -> dict:
+        """セグメントを読み直して集計を作る"""
+        meta = {"next_seq": 1, "current_segment": 1, "segments": {}, "recent": []}
+        segments = []
+        if self._dir.exists():
+            for path in self._dir.iterdir():
+                match = _SEGMENT_RE.match(path.name)
+                if match:
+                    segments.append(int(match.group(1)))
+        for segment in sorted(segments):
+            records = list(self._iter_segment(segment))
+            meta["current_segment"] = segment
+            if not records:
+                continue
+            meta["segments"][_segment_key(segment)] = _summarize(records)
+            meta["next_seq"] = max(meta["next_seq"], records[-1].get("seq", 0) + 1)
+            meta["recent"] = (meta["recent"] + records)[-RECENT_LIMIT:]
+        # 読み手が処理済みの seq を再利用しない
+        for cursor in self._load_cursors().values():
+            meta["next_seq"] = max(meta["next_seq"], int(cursor.get("seq", 0)) + 1)
+        return meta
+
+    def _migrate_legacy_files(self) -> None:
+        """旧形式（1イベント1ファイル）の未処理イベントをジャーナルへ移す"""
+        if not self._dir.exists():
+            return
+        legacy = sorted(p for p in self._dir.iterdir() if _LEGACY_RE.match(p.name))
+        if not legacy:
+            return
+        migrated = 0
+        for path in legacy:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    event = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if isinstance(event, dict):
+                event.pop("seq", None)
+                self.append(event)
+                migrated += 1
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        logger.info("旧形式のイベントをジャーナルへ移行: %d 件", migrated)
+
+    def _count(self, meta: dict, segment: int, record: dict) -> None:
+        key = _segment_key(segment)
+        info = meta["segments"].get(key)
+        if info is None:
+            info = {
+                "first_seq": record["seq"],
+                "last_seq": record["seq"],
+                "count": 0,
+                "by_target": {},
+            }
+            meta["segments"][key] = info
+        info["last_seq"] = record["seq"]
+        info["count"] += 1
+        name = record.get("target_name", "unknown")
+        info["by_target"][name] = info["by_target"].get(name, 0) + 1
+        meta["recent"] = (meta["recent"] + [record])[-RECENT_LIMIT:]
+
+    def _drop_old_segments(self, meta: dict) -> None:
+        segments = sorted(int(s) for s in meta["segments"])
+        for segment in segments[:-MAX_SEGMENTS]:
+            self._unlink_segment(segment)
+            del meta["segments"][_segment_key(segment)]
+
+    def _unlink_segment(self, segment: int) -> None:
+        try:
+            self._segment_path(segment).unlink()
+        except OSError:
+            pass
+
+    def _segment_path(self, segment: int) -> Path:
+        return self._dir / f"events-{segment:06d}.jsonl"
+
+    def _save_meta(self) -> None:
+        _write_json_atomic(self._meta_path, self._meta)
+
+    def _load_cursors(self) -> dict[str, dict]:
+        """ロック取得中に呼ぶ"""
+        if self._cursors is None:
+            try:
+                with open(self._cursors_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._cursors = data if isinstance(data, dict) else {}
+            except (OSError, json.JSONDecodeError):
+                self._cursors = {}
+        return self._cursors
+
+
+def _segment_key(segment: int) -> str:
+    return f"{segment:06d}"
+
+
+def _summarize(records: list[dict]) -> dict:
+    by_target: dict[str, int] = {}
+    for record in records:
+        name = record.get("target_name", "unknown")
+        by_target[name] = by_target.get(name, 0) + 1
+    return {
+        "first_seq": records[0].get("seq", 0),
+        "last_seq": records[-1].get("seq", 0),
+        "count": len(records),
+        "by_target": by_target,
+    }
+
+
+def _write_json_atomic(path: Path, data) -> None:
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("ジャーナル管理情報の保存失敗: %s - %s", path.name, e)
+
+
+def _write_lines_atomic(path: Path, records: list[dict]) -> None:
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+
+_shared_journal: EventJournal | None = None
+_shared_lock = threading.Lock()
+
+
+def get_event_journal() -> EventJournal:
+    """プロセス共通のイベントジャーナルを返す。"""
+    global _shared_journal
+    with _shared_lock:
+        if _shared_journal is None:
+            _shared_journal = EventJournal()
+        return _shared_journal
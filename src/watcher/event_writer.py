@@ -1,22 +1,22 @@
-import json
 from datetime import datetime
-from pathlib import Path
 
-from src.common.paths import get_state_dir
 from src.common.logger import get_logger
-from src.watcher.detector import get_target_hash
+from src.common.pubsub import get_channel
+from src.watcher.event_journal import get_event_journal
+from src.watcher.index_store import get_index_store
 
 logger = get_logger("watcher")
 
+# 新しいイベントを配信するチャネル（メッセージは {"event": ..., "position": ...}）
+EVENT_CHANNEL = "watcher.events"
 
-def write_event(target: dict, detect_mode: str, summary: str) -> None:
-    """変更イベントを state/watcher/events/ にJSONとして書き出す"""
-    events_dir = get_state_dir() / "watcher" / "events"
-    events_dir.mkdir(parents=True, exist_ok=True)
 
+def write_event(target: dict, detect_mode: str, summary: str) -> int:
+    """変更イベントをイベントジャーナル（state/watcher/events/）に追記し、seq を返す。
+
+    追記後すぐに EVENT_CHANNEL の購読者（Alert Poller・SSE）へ配信する。
+    """
     now = datetime.now()
-    target_hash = get_target_hash(target["name"])
-    filename = f"{now.strftime('%Y%m%d%H%M%S')}_{target_hash}.json"
     url = _resolve_target_url(target)
 
     event = {
@@ -27,11 +27,13 @@ def write_event(target: dict, detect_mode: str, summary: str) -> None:
         "summary": summary,
     }
 
-    event_path = events_dir / filename
-    with open(event_path, "w", encoding="utf-8") as f:
-        json.dump(event, f, ensure_ascii=False, indent=2)
-
-    logger.info("イベント書き出し: %s", filename)
+    position = get_event_journal().append(event)
+    logger.info("イベント書き出し: seq=%d %s", position.seq, target["name"])
+    get_channel(EVENT_CHANNEL).publish({
+        "event": {"seq": position.seq, **event},
+        "position": position,
+    })
+    return position.seq
 
 
 def update_index(
@@ -43,55 +45,57 @@ def update_index(
     alert_summary: str | None = None,
     info_active: bool = False,
     info_summary: str | None = None,
+    lag_seconds: float | None = None,
 ) -> None:
-    """state/watcher/index.json を更新する"""
-    index_path = get_state_dir() / "watcher" / "index.json"
-
-    index = _load_index(index_path)
+    """Watcher の index（state/watcher/index.json）を更新する"""
+    now = datetime.now().isoformat(timespec="seconds")
 
+    def _mutate(index: dict, entry: dict) -> None:
+        index["last_run"] = now
+        entry["last_checked"] = now
+        entry["status"] = status
+        if changed:
+            entry["last_changed"] = now
+        if lag_seconds is not None:
+            entry["last_lag_seconds"] = round(max(0.0, float(lag_seconds)), 1)
+
+        if alert_active:
+            entry["alert_active"] = True
+            if alert_hash:
+                entry["last_alert_hash"] = alert_hash
+                entry["last_alert_at"] = now
+            if alert_summary:
+                entry["last_alert_summary"] = alert_summary
+        else:
+            entry["alert_active"] = False
+            entry.pop("last_alert_hash", None)
+            entry.pop("last_alert_at", None)
+            entry.pop("last_alert_summary", None)
+
+        if info_active:
+            entry["info_active"] = True
+            if info_summary:
+                entry["last_info_summary"] = info_summary
+                entry["last_info_at"] = now
+        else:
+            entry.pop("info_active", None)
+            entry.pop("last_info_summary", None)
+            entry.pop("last_info_at", None)
+
+    get_index_store().update_target(target["name"], _mutate)
+
+
+def touch_index(target: dict, lag_seconds: float | None = None) -> None:
+    """内容が未更新だったチェックを記録する（最終チェック時刻のみ更新）"""
     now = datetime.now().isoformat(timespec="seconds")
-    target_hash = get_target_hash(target["name"])
-
-    if target_hash not in index["targets"]:
-        index["targets"][target_hash] = {
-            "name": target["name"],
-            "last_checked": "",
-            "last_changed": "",
-            "status": "ok",
-        }
-
-    index["last_run"] = now
-    entry = index["targets"][target_hash]
-    entry["last_checked"] = now
-    entry["status"] = status
-    if changed:
-        entry["last_changed"] = now
-
-    if alert_active:
-        entry["alert_active"] = True
-        if alert_hash:
-            entry["last_alert_hash"] = alert_hash
-            entry["last_alert_at"] = now
-        if alert_summary:
-            entry["last_alert_summary"] = alert_summary
-    else:
-        entry["alert_active"] = False
-        entry.pop("last_alert_hash", None)
-        entry.pop("last_alert_at", None)
-        entry.pop("last_alert_summary", None)
-
-    if info_active:
-        entry["info_active"] = True
-        if info_summary:
-            entry["last_info_summary"] = info_summary
-            entry["last_info_at"] = now
-    else:
-        entry.pop("info_active", None)
-        entry.pop("last_info_summary", None)
-        entry.pop("last_info_at", None)
-
-    with open(index_path, "w", encoding="utf-8") as f:
-        json.dump(index, f, ensure_ascii=False, indent=2)
+
+    def _mutate(index: dict, entry: dict) -> None:
+        index["last_run"] = now
+        entry["last_checked"] = now
+        if lag_seconds is not None:
+            entry["last_lag_seconds"] = round(max(0.0, float(lag_seconds)), 1)
+
+    get_index_store().update_target(target["name"], _mutate, create=False)
 
 
 def _resolve_target_url(target: dict) -> str:
@@ -110,19 +114,5 @@ def _resolve_target_url(target: dict) -> str:
 
 
 def get_target_entry(target: dict) -> dict:
-    """index.json からターゲット情報を取得する"""
-    index_path = get_state_dir() / "watcher" / "index.json"
-    index = _load_index(index_path)
-    target_hash = get_target_hash(target.get("name", ""))
-    return index.get("targets", {}).get(target_hash, {})
-
-
-def _load_index(index_path: Path) -> dict:
-    index = {"last_run": "", "targets": {}}
-    if index_path.exists():
-        try:
-            with open(index_path, "r", encoding="utf-8") as f:
-                index = json.load(f)
-        except (json.JSONDecodeError, OSError):
-            index = {"last_run": "", "targets": {}}
-    return index
+    """index からターゲット情報を取得する"""
+    return get_index_store().get_target(target.get("name", ""))
@@ -1,12 +1,38 @@
+import json
+import os
+import threading
 import xml.etree.ElementTree as ET
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from src.common.logger import get_logger
+from src.common.paths import get_state_dir
 
 logger = get_logger("watcher")
 
+DEFAULT_POOL_SIZE = 8
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (502, 503, 504)
+
+_sessions_lock = threading.Lock()
+# (scheme, host) -> Session。同じホストへの接続を使い回す
+_sessions: dict[tuple[str, str], requests.Session] = {}
+# "<取得元の名前>\t<URL>" -> {"etag": ..., "last_modified": ...}（state/watcher/http_cache.json）
+# 同じ URL でも解析するターゲットが違えば 304 の意味が変わるため、取得元ごとに分ける
+_validators_lock = threading.Lock()
+_validators: dict[str, dict[str, str]] | None = None
+_settings = {
+    "pool_size": DEFAULT_POOL_SIZE,
+    "retries": DEFAULT_RETRIES,
+    "backoff_factor": DEFAULT_BACKOFF_FACTOR,
+}
+
 DEFAULT_HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -16,11 +42,20 @@ DEFAULT_HEADERS = {
 }
 
 
-def fetch_content(url: str, selector: str, timeout: int = 30) -> str:
+class NotModified(Exception):
+    """条件付き取得で 304 Not Modified が返った"""
+
+    def __init__(self, url: str):
+        super().__init__(url)
+        self.url = url
+
+
+def fetch_content(url: str, selector: str, timeout: int = 30,
+                  conditional: bool = False,
+                  cache_scope: str = "") -> str:
     """URLからHTMLを取得し、CSSセレクタで抽出したテキストを返す"""
     try:
-        response = requests.get(url, timeout=timeout, headers=DEFAULT_HEADERS)
-        response.raise_for_status()
+        response = _get(url, timeout, conditional=conditional, cache_scope=cache_scope)
     except requests.RequestException as e:
         logger.error("取得失敗: %s - %s", url, e)
         raise
@@ -37,11 +72,12 @@ def fetch_content(url: str, selector: str, timeout: int = 30) -> str:
         return soup.get_text(strip=True)
 
 
-def fetch_html(url: str, timeout: int = 30) -> BeautifulSoup:
+def fetch_html(url: str, timeout: int = 30,
+               conditional: bool = False,
+               cache_scope: str = "") -> BeautifulSoup:
     """URLからHTMLを取得し、BeautifulSoupオブジェクトを返す"""
     try:
-        response = requests.get(url, timeout=timeout, headers=DEFAULT_HEADERS)
-        response.raise_for_status()
+        response = _get(url, timeout, conditional=conditional, cache_scope=cache_scope)
     except requests.RequestException as e:
         logger.error("HTML取得失敗: %s - %s", url, e)
         raise
@@ -49,11 +85,12 @@ def fetch_html(url: str, timeout: int = 30) -> BeautifulSoup:
     return BeautifulSoup(response.text, "html.parser")
 
 
-def fetch_json(url: str, timeout: int = 30) -> dict | list:
+def fetch_json(url: str, timeout: int = 30,
+               conditional: bool = False,
+               cache_scope: str = "") -> dict | list:
     """URLからJSONを取得して返す"""
     try:
-        response = requests.get(url, timeout=timeout, headers=DEFAULT_HEADERS)
-        response.raise_for_status()
+        response = _get(url, timeout, conditional=conditional, cache_scope=cache_scope)
     except requests.RequestException as e:
         logger.error("JSON取得失敗: %s - %s", url, e)
         raise
@@ -63,19 +100,192 @@ def fetch_json(url: str, timeout: int = 30) -> dict | list:
 
 def fetch_xml(url: str, timeout: int = 30,
               headers: dict | None = None,
-              cookies: dict | None = None) -> ET.Element:
+              cookies: dict | None = None,
+              conditional: bool = False,
+              cache_scope: str = "") -> ET.Element:
     """URLからXMLを取得し、ElementTreeのルート要素を返す"""
     try:
-        merged_headers = {**DEFAULT_HEADERS, **(headers or {})}
-        response = requests.get(
+        response = _get(
             url,
-            timeout=timeout,
-            headers=merged_headers,
-            cookies=cookies or {},
+            timeout,
+            headers=headers,
+            cookies=cookies,
+            conditional=conditional,
+            cache_scope=cache_scope,
         )
-        response.raise_for_status()
     except requests.RequestException as e:
         logger.error("XML取得失敗: %s - %s", url, e)
         raise
 
     return ET.fromstring(response.content)
+
+
+def configure_fetcher(settings: dict | None) -> None:
+    """watcher.json の http 設定（pool_size / retries / backoff_factor）を反映する。
+
+    値が変わったときだけ既存のセッションを閉じ、次回の取得で作り直す。
+    """
+    settings = settings or {}
+    new_settings = {
+        "pool_size": _int_setting(settings.get("pool_size"), DEFAULT_POOL_SIZE, 1),
+        "retries": _int_setting(settings.get("retries"), DEFAULT_RETRIES, 0),
+        "backoff_factor": _float_setting(
+            settings.get("backoff_factor"), DEFAULT_BACKOFF_FACTOR
+        ),
+    }
+    with _sessions_lock:
+        if new_settings == _settings:
+            return
+        _settings.update(new_settings)
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+    logger.info("HTTP 接続設定を更新: %s", new_settings)
+
+
+def close_sessions() -> None:
+    """保持しているセッション（接続プール）をすべて閉じる"""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def _get(url: str, timeout: int,
+         headers: dict | None = None,
+         cookies: dict | None = None,
+         conditional: bool = False,
+         cache_scope: str = "") -> requests.Response:
+    """ホスト単位のセッションで GET し、エラーステータスなら例外を送出する。
+
+    cache_scope（ターゲット名など）を渡すと応答の ETag / Last-Modified をその名前で保存し、
+    conditional=True のときは保存済みの値を付けて送って 304 なら NotModified を送出する。
+    """
+    merged_headers = {**DEFAULT_HEADERS, **(headers or {})}
+    validator_key = f"{cache_scope}\t{url}" if cache_scope else ""
+    if conditional and validator_key:
+        validator = _get_validator(validator_key)
+        if validator.get("etag"):
+            merged_headers["If-None-Match"] = validator["etag"]
+        if validator.get("last_modified"):
+            merged_headers["If-Modified-Since"] = validator["last_modified"]
+    session = _get_session(url)
+    response = session.get(
+        url,
+        timeout=timeout,
+        headers=merged_headers,
+        cookies=cookies or {},
+    )
+    if response.status_code == 304:
+        response.close()
+        raise NotModified(url)
+    response.raise_for_status()
+    if validator_key:
+        _store_validator(
+            validator_key,
+            response.headers.get("ETag", ""),
+            response.headers.get("Last-Modified", ""),
+        )
+    return response
+
+
+def _validators_path():
+    return get_state_dir() / "watcher" / "http_cache.json"
+
+
+def _load_validators() -> dict[str, dict[str, str]]:
+    """ロック取得中に呼ぶ"""
+    global _validators
+    if _validators is None:
+        try:
+            with open(_validators_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # URL だけをキーにしていた頃の値は使わない
+            _validators = (
+                {k: v for k, v in data.items() if "\t" in k} if isinstance(data, dict) else {}
+            )
+        except (OSError, json.JSONDecodeError):
+            _validators = {}
+    return _validators
+
+
+def _get_validator(key: str) -> dict[str, str]:
+    with _validators_lock:
+        return dict(_load_validators().get(key, {}))
+
+
+def _store_validator(key: str, etag: str, last_modified: str) -> None:
+    entry = {}
+    if etag:
+        entry["etag"] = etag
+    if last_modified:
+        entry["last_modified"] = last_modified
+    with _validators_lock:
+        validators = _load_validators()
+        if validators.get(key, {}) == entry:
+            return
+        if entry:
+            validators[key] = entry
+        else:
+            validators.pop(key, None)
+        snapshot = dict(validators)
+        path = _validators_path()
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("HTTP検証子の保存失敗: %s", e)
+
+
+def _get_session(url: str) -> requests.Session:
+    parts = urlsplit(url)
+    key = (parts.scheme.lower(), parts.netloc.lower())
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _create_session(dict(_settings))
+            _sessions[key] = session
+        return session
+
+
+def _create_session(settings: dict) -> requests.Session:
+    retry = Retry(
+        total=settings["retries"],
+        connect=settings["retries"],
+        read=settings["retries"],
+        status=settings["retries"],
+        backoff_factor=settings["backoff_factor"],
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings["pool_size"],
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # 応答の Cookie は保持しない（従来どおり毎回リクエストで渡したものだけ送る）
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def _int_setting(value, default: int, minimum: int) -> int:
+    try:
+        return max(minimum, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def _float_setting(value, default: float) -> float:
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
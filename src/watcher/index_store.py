@@ -0,0 +1,203 @@
+import atexit
+import copy
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Iterable
+
+from src.common.logger import get_logger
+from src.common.paths import get_state_dir
+from src.watcher.detector import get_target_hash
+
+logger = get_logger("watcher")
+
+DEFAULT_FLUSH_DELAY_SECONDS = 2.0
+
+
+def _empty_index() -> dict:
+    return {"last_run": "", "targets": {}}
+
+
+class IndexStore:
+    """Watcher の index をメモリに保持し、state/watcher/index.json へまとめて書き出す。
+
+    読み出しはメモリ上の内容のコピーを返し、ファイルは変更から一定時間後に
+    一時ファイル経由の置き換えで書き込む（途中状態の JSON を読ませない）。
+    """
+
+    def __init__(
+        self,
+        index_path: Path | None = None,
+        flush_delay: float = DEFAULT_FLUSH_DELAY_SECONDS,
+    ):
+        self._index_path = index_path or get_state_dir() / "watcher" / "index.json"
+        self._flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._data: dict | None = None
+        self._present = False
+        self._version = 0
+        self._dirty = False
+        self._timer: threading.Timer | None = None
+        self._listeners: list[Callable[[int, set[str] | None], None]] = []
+
+    def add_listener(self, listener: Callable[[int, set[str] | None], None]) -> None:
+        """変更通知を登録する。listener(version, 変更ターゲット名の集合) で呼ばれる（全消去時は None）"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    @property
+    def version(self) -> int:
+        """内容が変わるたびに増える世代番号"""
+        with self._lock:
+            return self._version
+
+    def exists(self) -> bool:
+        """index が作られているか（Watcher が一度でも動いたか）"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._present
+
+    def snapshot(self) -> dict:
+        """index 全体のコピーを返す"""
+        with self._lock:
+            return copy.deepcopy(self._ensure_loaded())
+
+    def get_target(self, name: str) -> dict:
+        """ターゲット1件分のコピーを返す（未登録なら空 dict）"""
+        with self._lock:
+            index = self._ensure_loaded()
+            entry = index["targets"].get(get_target_hash(name), {})
+            return copy.deepcopy(entry)
+
+    def update_target(
+        self,
+        name: str,
+        mutate: Callable[[dict, dict], None],
+        create: bool = True,
+    ) -> bool:
+        """mutate(index, entry) でターゲットを書き換え、書き出しを予約する。
+
+        create=False で未登録なら何もせず False を返す。
+        """
+        with self._lock:
+            index = self._ensure_loaded()
+            target_hash = get_target_hash(name)
+            entry = index["targets"].get(target_hash)
+            if entry is None:
+                if not create:
+                    return False
+                entry = {
+                    "name": name,
+                    "last_checked": "",
+                    "last_changed": "",
+                    "status": "ok",
+                }
+                index["targets"][target_hash] = entry
+            mutate(index, entry)
+            self._mark_changed()
+            version = self._version
+        self._schedule_flush()
+        self._notify(version, {name})
+        return True
+
+    def remove_targets(self, names: Iterable[str]) -> int:
+        """指定名のターゲットを削除してすぐに書き出す。削除件数を返す"""
+        names = set(names)
+        with self._lock:
+            index = self._ensure_loaded()
+            targets = index["targets"]
+            removed = [h for h, t in targets.items() if t.get("name") in names]
+            removed_names = {targets[h].get("name") for h in removed}
+            for target_hash in removed:
+                del targets[target_hash]
+            if removed:
+                self._mark_changed()
+            version = self._version
+        if removed:
+            self.flush()
+            self._notify(version, removed_names)
+        return len(removed)
+
+    def reset(self) -> None:
+        """index を空にしてすぐに書き出す"""
+        with self._lock:
+            self._data = _empty_index()
+            self._mark_changed()
+            version = self._version
+        self.flush()
+        self._notify(version, None)
+
+    def flush(self) -> None:
+        """未書き出しの変更があれば index.json に書き出す"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            data = json.dumps(self._data, ensure_ascii=False, indent=2)
+            self._dirty = False
+            tmp_path = self._index_path.with_name(f"{self._index_path.name}.tmp")
+            try:
+                self._index_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path.write_text(data, encoding="utf-8")
+                os.replace(tmp_path, self._index_path)
+            except OSError as e:
+                self._dirty = True
+                logger.warning("index書き出し失敗: %s", e)
+
+    def _ensure_loaded(self) -> dict:
+        """ロック取得中に呼ぶ"""
+        if self._data is None:
+            self._data = _empty_index()
+            if self._index_path.exists():
+                self._present = True
+                try:
+                    with open(self._index_path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        data.setdefault("last_run", "")
+                        data.setdefault("targets", {})
+                        self._data = data
+                except (json.JSONDecodeError, OSError) as e:
+                    logger.warning("index読み込み失敗: %s", e)
+        return self._data
+
+    def _mark_changed(self) -> None:
+        """ロック取得中に呼ぶ"""
+        self._present = True
+        self._dirty = True
+        self._version += 1
+
+    def _notify(self, version: int, names: set[str] | None) -> None:
+        """ロックの外で呼ぶ（listener から snapshot などを呼べるように）"""
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(version, names)
+            except Exception as e:
+                logger.warning("index変更通知失敗: %s", e)
+
+    def _schedule_flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self._flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+
+_shared_store: IndexStore | None = None
+_shared_lock = threading.Lock()
+
+
+def get_index_store() -> IndexStore:
+    """プロセス共通の Watcher index を返す（watcher/wiki/admin で共有）。"""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = IndexStore()
+            atexit.register(_shared_store.flush)
+        return _shared_store
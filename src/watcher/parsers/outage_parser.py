@@ -3,17 +3,34 @@
 東京電力停電情報APIからXMLデータを取得し、
 指定件数以上の停電が発生しているエリアの情報を返す。
 """
+import copy
+import threading
+import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from src.common.logger import get_logger
 from src.watcher.fetcher import fetch_xml
 
 logger = get_logger("watcher")
 
+DEFAULT_FETCH_CONCURRENCY = 6
 
-def check_outage(target: dict, default_timeout: int) -> tuple[str, str, str]:
+_details_lock = threading.Lock()
+# ターゲット名 -> {"prefs": {都道府県コード: sub_areas}, "cities": {市区町村コード: 詳細}}
+# 期限切れ・取得失敗で取れなかった詳細は前回の内容で補い、部分的な結果で差分を出さない
+_last_details: dict[str, dict] = {}
+
+
+def check_outage(
+    target: dict, default_timeout: int, conditional: bool = False
+) -> tuple[str, str, str]:
     """停電情報をチェックする。
 
+    都道府県・市区町村の XML は段階ごとに並列取得する。
+    期限（deadline_seconds、既定はチェック間隔）を過ぎたら取得できた分だけで結果を作る。
+    conditional=True で全体の XML が未更新なら NotModified を送出する。
+
     Returns:
         (比較用テキスト, サマリー文字列)
     """
@@ -21,6 +38,12 @@ def check_outage(target: dict, default_timeout: int) -> tuple[str, str, str]:
     auth_token = target.get("auth_token", "")
     area_code = target.get("area_code", "00000000000")
     threshold = target.get("threshold", 1000)
+    concurrency = _int_option(
+        target.get("fetch_concurrency"), DEFAULT_FETCH_CONCURRENCY
+    )
+    deadline = time.monotonic() + _float_option(
+        target.get("deadline_seconds"), float(default_timeout)
+    )
     headers = {
         "User-Agent": "Mozilla/5.0",
         "Referer": "https://teideninfo.tepco.co.jp/",
@@ -34,6 +57,8 @@ def check_outage(target: dict, default_timeout: int) -> tuple[str, str, str]:
         timeout=default_timeout,
         headers=headers,
         cookies=cookies,
+        conditional=conditional,
+        cache_scope=target.get("name", ""),
     )
 
     global_notices = _get_notices(root)
@@ -68,20 +93,26 @@ def check_outage(target: dict, default_timeout: int) -> tuple[str, str, str]:
                 pref_code = code_el.text.strip()
             if not pref_code:
                 pref_code = _find_code_attr(area)
-            pref_name = name_el.text or ""
-
-            pref_detail = _fetch_prefecture_detail(
-                base_url, pref_code, default_timeout, headers, cookies
-            )
 
             affected.append({
-                "prefecture": pref_name,
+                "prefecture": name_el.text or "",
                 "count": count,
                 "code": pref_code,
-                "notices": pref_detail.get("notices", []),
-                "sub_areas": pref_detail.get("sub_areas", []),
+                "notices": [],
+                "sub_areas": [],
             })
 
+    if affected:
+        target_name = target.get("name", "")
+        with _details_lock:
+            previous = _last_details.get(target_name, {"prefs": {}, "cities": {}})
+        known = _fill_details(
+            affected, base_url, default_timeout, headers, cookies,
+            concurrency, deadline, previous,
+        )
+        with _details_lock:
+            _last_details[target_name] = known
+
     if not affected and not global_notices:
         return "no_outage", "", "none"
 
@@ -127,31 +158,114 @@ def _get_notices(root: ET.Element) -> list[str]:
     return msgs
 
 
-def _fetch_prefecture_detail(
+def _fill_details(
+    affected: list[dict],
     base_url: str,
-    pref_code: str,
     timeout: int,
     headers: dict,
     cookies: dict,
+    concurrency: int,
+    deadline: float,
+    previous: dict,
 ) -> dict:
-    """都道府県レベルの詳細を取得する"""
-    result: dict = {"notices": [], "sub_areas": []}
-
-    if not pref_code:
-        return result
+    """都道府県→市区町村の順に XML を並列取得し、affected に詳細を書き込む。
 
+    取得できなかった都道府県・市区町村は previous（前回の結果）の詳細を使う。
+    今回の詳細を previous と同じ形で返す。
+    """
+    executor = ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="outage-fetch"
+    )
     try:
-        pref_root = fetch_xml(
-            f"{base_url}/{pref_code}.xml",
-            timeout=timeout,
+        pref_jobs = {
+            i: (base_url, pref["code"], "都道府県詳細取得失敗")
+            for i, pref in enumerate(affected)
+            if pref["code"]
+        }
+        pref_roots = _fetch_all(executor, pref_jobs, timeout, headers, cookies, deadline)
+
+        city_jobs = {}
+        for i, pref in enumerate(affected):
+            pref_root = pref_roots.get(i)
+            if pref_root is None:
+                pref["sub_areas"] = copy.deepcopy(previous["prefs"].get(pref["code"], []))
+                continue
+            pref["sub_areas"] = _parse_prefecture_detail(pref_root, pref["code"])
+            for j, sub in enumerate(pref["sub_areas"]):
+                if sub["code"]:
+                    sub["detail"] = previous["cities"].get(sub["code"], "")
+                    city_jobs[(i, j)] = (base_url, sub["code"], "市区町村詳細取得失敗")
+        city_roots = _fetch_all(executor, city_jobs, timeout, headers, cookies, deadline)
+
+        for (i, j), city_root in city_roots.items():
+            affected[i]["sub_areas"][j]["detail"] = _parse_city_detail(city_root)
+    finally:
+        # 期限切れで残った取得は待たない（各取得のタイムアウトは期限までに抑えてある）
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    known: dict = {"prefs": {}, "cities": {}}
+    for pref in affected:
+        if pref["code"]:
+            known["prefs"][pref["code"]] = copy.deepcopy(pref["sub_areas"])
+        for sub in pref["sub_areas"]:
+            if sub["code"]:
+                known["cities"][sub["code"]] = sub.get("detail", "")
+    return known
+
+
+def _fetch_all(
+    executor: ThreadPoolExecutor,
+    jobs: dict,
+    timeout: int,
+    headers: dict,
+    cookies: dict,
+    deadline: float,
+) -> dict:
+    """jobs（キー -> (base_url, コード, 失敗時メッセージ)）を並列取得し、
+    期限内に取得できた分だけ キー -> XML ルート で返す。"""
+    results: dict = {}
+    if not jobs:
+        return results
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        logger.warning("停電詳細の取得期限切れ: %d件を省略", len(jobs))
+        return results
+
+    request_timeout = max(1.0, min(float(timeout), remaining))
+    futures = {
+        executor.submit(
+            fetch_xml,
+            f"{base_url}/{code}.xml",
+            timeout=request_timeout,
             headers=headers,
             cookies=cookies,
+        ): (key, code, message)
+        for key, (base_url, code, message) in jobs.items()
+    }
+    pending = set(futures)
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            key, code, message = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                logger.warning("%s: %s - %s", message, code, e)
+    if pending:
+        for future in pending:
+            future.cancel()
+        logger.warning(
+            "停電詳細の取得期限切れ: %d/%d件を省略", len(pending), len(futures)
         )
-    except Exception as e:
-        logger.warning("都道府県詳細取得失敗: %s - %s", pref_code, e)
-        return result
+    return results
+
 
-    # result["notices"] = _get_notices(pref_root)
+def _parse_prefecture_detail(pref_root: ET.Element, pref_code: str) -> list[dict]:
+    """都道府県 XML から停電中の市区町村（名前・軒数・コード）を抜き出す"""
+    sub_areas: list[dict] = []
 
     areas = _find_all_by_local_name(pref_root, "エリア")
     if not areas:
@@ -184,46 +298,26 @@ def _fetch_prefecture_detail(
             sub_code = code_el.text.strip()
         if not sub_code:
             sub_code = _find_code_attr(area)
-        detail = _fetch_city_detail(base_url, sub_code, timeout, headers, cookies)
 
-        result["sub_areas"].append({
+        sub_areas.append({
             "name": name_el.text or "",
             "count": count,
-            "detail": detail,
+            "code": sub_code,
+            "detail": "",
         })
 
-    if not result["sub_areas"]:
+    if not sub_areas:
         logger.debug(
             "都道府県XMLの詳細エリアが見つかりません: code=%s tags=%s",
             pref_code,
             _sample_tags(pref_root),
         )
 
-    return result
+    return sub_areas
 
 
-def _fetch_city_detail(
-    base_url: str,
-    city_code: str,
-    timeout: int,
-    headers: dict,
-    cookies: dict,
-) -> str:
-    """市区町村レベルの地域詳細情報を取得する"""
-    if not city_code:
-        return ""
-
-    try:
-        city_root = fetch_xml(
-            f"{base_url}/{city_code}.xml",
-            timeout=timeout,
-            headers=headers,
-            cookies=cookies,
-        )
-    except Exception as e:
-        logger.warning("市区町村詳細取得失敗: %s - %s", city_code, e)
-        return ""
-
+def _parse_city_detail(city_root: ET.Element) -> str:
+    """市区町村 XML から地域詳細情報の文字列を作る"""
     lines: list[str] = []
 
     detail_el = _find_first_by_local_name(city_root, "地域詳細情報")
@@ -254,6 +348,20 @@ def _fetch_city_detail(
     return "\n".join([line for line in lines if line.strip()])
 
 
+def _int_option(value, default: int) -> int:
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def _float_option(value, default: float) -> float:
+    try:
+        return max(1.0, float(value))
+    except (TypeError, ValueError):
+        return max(1.0, default)
+
+
 def _local_name(tag: str) -> str:
     """ネームスペース付きタグからローカル名を抽出する"""
     if "}" in tag:
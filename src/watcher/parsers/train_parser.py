@@ -11,9 +11,13 @@ from src.watcher.fetcher import fetch_html
 logger = get_logger("watcher")
 
 
-def check_train(target: dict, default_timeout: int) -> tuple[bool, str]:
+def check_train(
+    target: dict, default_timeout: int, conditional: bool = False
+) -> tuple[bool, str]:
     """電車運行情報をチェックする。
 
+    conditional=True で一覧ページが未更新なら NotModified を送出する。
+
     Returns:
         (changed: bool を判定するためのテキスト, サマリー文字列)
         テキストが前回と異なれば変更ありと判定される。
@@ -23,7 +27,12 @@ def check_train(target: dict, default_timeout: int) -> tuple[bool, str]:
     selector = target.get("selector", "#mdStatusTroubleLine")
     detail_selector = target.get("detail_selector", "#mdServiceStatus")
     alert_statuses = target.get("alert_statuses", ["運転見合わせ", "運転再開"])
-    soup = fetch_html(url, timeout=default_timeout)
+    soup = fetch_html(
+        url,
+        timeout=default_timeout,
+        conditional=conditional,
+        cache_scope=target.get("name", ""),
+    )
     
     trouble_div = soup.select_one(selector)
     if not trouble_div:
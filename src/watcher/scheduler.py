@@ -2,14 +2,27 @@ import hashlib
 import json
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 
-from src.common.config import load_config
+from src.common.config import load_config, subscribe_config
 from src.common.logger import get_logger
 from src.common.paths import get_state_dir
-from src.watcher.fetcher import fetch_content
+from src.watcher.fetcher import (
+    NotModified,
+    close_sessions,
+    configure_fetcher,
+    fetch_content,
+)
 from src.watcher.detector import detect_change, snapshot_exists
-from src.watcher.event_writer import write_event, update_index, get_target_entry
+from src.watcher.event_journal import get_event_journal
+from src.watcher.index_store import get_index_store
+from src.watcher.event_writer import (
+    get_target_entry,
+    touch_index,
+    update_index,
+    write_event,
+)
 from src.watcher.parsers.train_parser import check_train
 from src.watcher.parsers.weather_parser import check_weather
 from src.watcher.parsers.outage_parser import check_outage
@@ -17,7 +30,17 @@ from src.watcher.parsers.outage_parser import check_outage
 logger = get_logger("watcher")
 
 _stop_event = threading.Event()
+# 停止要求・設定変更でループの待機を解除する
+_wake_event = threading.Event()
+_config_lock = threading.Lock()
+_pending_config: dict | None = None
+# 条件付き取得（304 で省略）を使わず全件取得するターゲット判定用
+_refresh_lock = threading.Lock()
+_force_refresh: set[str] = set()
+_target_signatures: dict[str, str] = {}
 DEFAULT_INTERVAL_SECONDS = 30
+DEFAULT_MAX_WORKERS = 4
+MIN_WAIT_SECONDS = 0.5
 
 
 def start_watcher() -> None:
@@ -27,7 +50,12 @@ def start_watcher() -> None:
     targets = config.get("targets", [])
     targets_by_name = {t.get("name"): t for t in targets if t.get("name")}
     night_stop = config.get("night_stop", {})
-    last_config_check = 0.0
+    configure_fetcher(config.get("http"))
+    scheduler_settings = _read_scheduler_settings(config)
+    executor: ThreadPoolExecutor | None = None
+    # ターゲット名 -> 実行中のチェック（並列モードで同じターゲットを重ねて実行しない）
+    in_flight: dict[str, Future] = {}
+    unsubscribe = subscribe_config("watcher", _on_config_changed)
     was_night_stopped = False
     next_run: dict[str, float] = {}
     now = time.time()
@@ -37,10 +65,18 @@ def start_watcher() -> None:
 
     while not _stop_event.is_set():
         now = time.time()
-        if now - last_config_check > 5:
+        new_config = _take_pending_config()
+        if new_config is not None:
             try:
-                config = load_config("watcher")
+                config = new_config
                 night_stop = config.get("night_stop", {})
+                configure_fetcher(config.get("http"))
+                new_settings = _read_scheduler_settings(config)
+                if new_settings != scheduler_settings and executor is not None:
+                    # 実行中のチェックは旧プールで最後まで走らせる
+                    executor.shutdown(wait=False)
+                    executor = None
+                scheduler_settings = new_settings
                 new_targets = config.get("targets", [])
                 new_by_name = {
                     t.get("name"): t for t in new_targets if t.get("name")
@@ -57,16 +93,17 @@ def start_watcher() -> None:
                         next_run[name] = now
                 targets = new_targets
                 targets_by_name = new_by_name
+                logger.info("Watcher 設定を再読込")
             except Exception:
                 pass
-            last_config_check = now
 
         if _is_night_stopped(night_stop):
             if not was_night_stopped:
+                _wait_in_flight(in_flight)
                 _reset_watcher_state()
                 was_night_stopped = True
             logger.info("夜間停止時間帯のためスキップ")
-            _stop_event.wait(timeout=60)
+            _wait(60)
             continue
         if was_night_stopped:
             now = time.time()
@@ -75,10 +112,20 @@ def start_watcher() -> None:
                 next_run[name] = now
             was_night_stopped = False
 
-        now = time.time()
+        parallel = scheduler_settings["mode"] == "parallel"
+        if parallel and executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=scheduler_settings["max_workers"],
+                thread_name_prefix="watcher-check",
+            )
+        for name, future in list(in_flight.items()):
+            if future.done():
+                in_flight.pop(name, None)
+
         for target in targets:
             if _stop_event.is_set():
                 break
+            now = time.time()
             name = target.get("name", "unknown")
             interval_seconds = _get_target_interval_seconds(
                 target, DEFAULT_INTERVAL_SECONDS
@@ -86,28 +133,113 @@ def start_watcher() -> None:
             due_at = next_run.get(name, now)
             if now < due_at:
                 continue
+            next_run[name] = _next_due_at(due_at, now, interval_seconds)
             if not target.get("enabled", True):
-                next_run[name] = now + interval_seconds
                 continue
-            _check_target(target, interval_seconds)
-            next_run[name] = now + interval_seconds
+            if name in in_flight:
+                logger.warning(
+                    "前回のチェックが実行中のためスキップ: %s (%.1f秒遅延)",
+                    name,
+                    now - due_at,
+                )
+                continue
+            lag_seconds = now - due_at
+            _log_lag(name, lag_seconds, interval_seconds, scheduler_settings)
+            if parallel:
+                in_flight[name] = executor.submit(
+                    _check_target, target, interval_seconds, lag_seconds
+                )
+            else:
+                _check_target(target, interval_seconds, lag_seconds)
 
         if _stop_event.is_set():
             break
         now = time.time()
         if next_run:
             next_due = min(next_run.values())
-            wait_seconds = max(1, next_due - now)
+            wait_seconds = max(MIN_WAIT_SECONDS, next_due - now)
         else:
             wait_seconds = DEFAULT_INTERVAL_SECONDS
-        _stop_event.wait(timeout=wait_seconds)
+        _wait(wait_seconds)
 
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+    unsubscribe()
+    close_sessions()
     logger.info("Watcher 停止")
 
 
 def stop_watcher() -> None:
     """Watcher を停止する"""
     _stop_event.set()
+    _wake_event.set()
+
+
+def _on_config_changed(config: dict) -> None:
+    """config/watcher.json の変更通知を受け取り、ループを起こす"""
+    global _pending_config
+    with _config_lock:
+        _pending_config = config
+    _wake_event.set()
+
+
+def _take_pending_config() -> dict | None:
+    global _pending_config
+    with _config_lock:
+        config = _pending_config
+        _pending_config = None
+    return config
+
+
+def _wait(timeout: float) -> None:
+    _wake_event.wait(timeout=timeout)
+    _wake_event.clear()
+
+
+def _read_scheduler_settings(config: dict) -> dict:
+    """watcher.json の scheduler 設定を読む（mode: sequential / parallel）"""
+    settings = config.get("scheduler") or {}
+    mode = settings.get("mode", "sequential")
+    if mode not in ("sequential", "parallel"):
+        mode = "sequential"
+    try:
+        max_workers = max(1, int(settings.get("max_workers", DEFAULT_MAX_WORKERS)))
+    except (TypeError, ValueError):
+        max_workers = DEFAULT_MAX_WORKERS
+    try:
+        lag_warning_seconds = float(settings.get("lag_warning_seconds", 0)) or None
+    except (TypeError, ValueError):
+        lag_warning_seconds = None
+    return {
+        "mode": mode,
+        "max_workers": max_workers,
+        "lag_warning_seconds": lag_warning_seconds,
+    }
+
+
+def _next_due_at(due_at: float, now: float, interval_seconds: int) -> float:
+    """予定時刻基準で次回を決める。1周期以上遅れていれば現在時刻から数え直す"""
+    next_due = due_at + interval_seconds
+    if next_due <= now:
+        next_due = now + interval_seconds
+    return next_due
+
+
+def _log_lag(
+    name: str, lag_seconds: float, interval_seconds: int, settings: dict
+) -> None:
+    threshold = settings["lag_warning_seconds"] or interval_seconds
+    if lag_seconds > threshold:
+        logger.warning("チェック開始が遅延: %s (%.1f秒)", name, lag_seconds)
+
+
+def _wait_in_flight(in_flight: dict[str, Future]) -> None:
+    for future in list(in_flight.values()):
+        try:
+            future.result()
+        except Exception:
+            pass
+    in_flight.clear()
 
 
 def _is_night_stopped(night_stop: dict) -> bool:
@@ -122,29 +254,37 @@ def _is_night_stopped(night_stop: dict) -> bool:
     return start_hour <= now.hour < end_hour
 
 
-def _check_target(target: dict, interval_seconds: int) -> None:
+def _check_target(
+    target: dict, interval_seconds: int, lag_seconds: float = 0.0
+) -> None:
     """単一ターゲットをチェックする"""
     name = target.get("name", "unknown")
     target_type = target.get("type", "generic")
 
     try:
         is_first = not snapshot_exists(name)
+        last_entry = get_target_entry(target)
+        conditional = _can_use_conditional(target, is_first, last_entry)
         alert_level = "none"
         if target_type == "train":
-            current_text, summary = check_train(target, interval_seconds)
+            current_text, summary = check_train(target, interval_seconds, conditional)
             alert_level = "alert" if summary else "none"
         elif target_type == "weather":
-            current_text, summary = check_weather(target, interval_seconds)
+            current_text, summary = check_weather(
+                target, interval_seconds, conditional
+            )
             alert_level = "alert" if summary else "none"
         elif target_type == "outage":
-            result = check_outage(target, interval_seconds)
+            result = check_outage(target, interval_seconds, conditional)
             if isinstance(result, tuple) and len(result) == 3:
                 current_text, summary, alert_level = result
             else:
                 current_text, summary = result
                 alert_level = "alert" if summary else "none"
         else:
-            current_text, summary = _check_generic(target, interval_seconds)
+            current_text, summary = _check_generic(
+                target, interval_seconds, conditional
+            )
             alert_level = "alert" if summary else "none"
 
         changed = detect_change(name, current_text, "text_change")
@@ -155,7 +295,6 @@ def _check_target(target: dict, interval_seconds: int) -> None:
             if summary_text
             else ""
         )
-        last_entry = get_target_entry(target)
         last_alert_hash = last_entry.get("last_alert_hash", "")
 
         repeat_alert = target.get("repeat_alert", False)
@@ -179,18 +318,65 @@ def _check_target(target: dict, interval_seconds: int) -> None:
             alert_summary=summary_text if alert_level == "alert" and summary_text else None,
             info_active=alert_level == "info" and bool(summary_text),
             info_summary=summary_text if alert_level == "info" and summary_text else None,
+            lag_seconds=lag_seconds,
         )
+        with _refresh_lock:
+            _force_refresh.discard(name)
+
+    except NotModified:
+        # 取得元が未更新のため解析・差分判定・スナップショット更新を省略する
+        logger.debug("未更新のため省略: %s", name)
+        touch_index(target, lag_seconds=lag_seconds)
 
     except Exception as e:
         logger.error("チェック失敗: %s - %s", name, e)
-        update_index(target, "error", False, alert_active=False)
+        with _refresh_lock:
+            _force_refresh.add(name)
+        update_index(
+            target, "error", False, alert_active=False, lag_seconds=lag_seconds
+        )
+
 
+def _can_use_conditional(target: dict, is_first: bool, last_entry: dict) -> bool:
+    """304 による省略を使ってよいか判定する。
 
-def _check_generic(target: dict, interval_seconds: int) -> tuple[str, str]:
+    初回・前回エラー後・ターゲット設定の変更後は前回の結果が使えないため全件取得する。
+    停電・電車は発生中だと一覧（全体の XML・運行情報一覧）が同じでも
+    個別の詳細が変わるため、発生していないときだけ使う。
+    repeat_alert のターゲットは警報中は毎回通知するため使わない。
+    """
+    name = target.get("name", "unknown")
+    signature = hashlib.sha256(
+        json.dumps(target, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    with _refresh_lock:
+        changed = _target_signatures.get(name) != signature
+        _target_signatures[name] = signature
+        forced = name in _force_refresh
+    if is_first or changed or forced or not last_entry:
+        return False
+    if target.get("type") in ("outage", "train") and (
+        last_entry.get("alert_active") or last_entry.get("info_active")
+    ):
+        return False
+    if target.get("repeat_alert") and last_entry.get("alert_active"):
+        return False
+    return True
+
+
+def _check_generic(
+    target: dict, interval_seconds: int, conditional: bool = False
+) -> tuple[str, str]:
     """汎用ターゲット（HTML CSSセレクタ方式）のチェック"""
     url = target.get("url", "")
     selector = target.get("selector", "")
-    text = fetch_content(url, selector, timeout=interval_seconds)
+    text = fetch_content(
+        url,
+        selector,
+        timeout=interval_seconds,
+        conditional=conditional,
+        cache_scope=target.get("name", ""),
+    )
     summary = "変更を検出しました" if text else ""
     return text, summary
 
@@ -219,21 +405,19 @@ def _should_refresh_target(old: dict, new: dict) -> bool:
 
 
 def _reset_watcher_state() -> None:
-    state_dir = get_state_dir() / "watcher"
-    snapshots_dir = state_dir / "snapshots"
-    events_dir = state_dir / "events"
-    for directory in (snapshots_dir, events_dir):
-        try:
-            if directory.exists():
-                for item in directory.iterdir():
-                    if item.is_file():
-                        item.unlink()
-        except Exception as e:
-            logger.warning("state削除失敗: %s - %s", directory, e)
+    snapshots_dir = get_state_dir() / "watcher" / "snapshots"
+    try:
+        if snapshots_dir.exists():
+            for item in snapshots_dir.iterdir():
+                if item.is_file():
+                    item.unlink()
+    except Exception as e:
+        logger.warning("state削除失敗: %s - %s", snapshots_dir, e)
+    try:
+        get_event_journal().clear()
+    except Exception as e:
+        logger.warning("イベント削除失敗: %s", e)
     try:
-        state_dir.mkdir(parents=True, exist_ok=True)
-        index_path = state_dir / "index.json"
-        with open(index_path, "w", encoding="utf-8") as f:
-            json.dump({"last_run": "", "targets": {}}, f, ensure_ascii=False, indent=2)
+        get_index_store().reset()
     except Exception as e:
         logger.warning("index初期化失敗: %s", e)
@@ -1,11 +1,12 @@
 import json
 import threading
-import time
 from datetime import datetime
 
 from flask import Flask, jsonify, request, Response, stream_with_context
 
-from src.common.paths import get_web_dir, get_data_dir, get_state_dir, get_config_dir, get_history_repo_dir
+from src.common.paths import get_web_dir, get_data_dir, get_history_repo_dir
+from src.common.activity import init_request_activity
+from src.common.compression import init_compression
 from src.common.config import load_config, save_config
 from src.common.heartbeat import (
     register_session,
@@ -13,11 +14,17 @@ from src.common.heartbeat import (
     close_session,
     get_active_session_count,
 )
+from src.common.http_cache import conditional_response, make_etag
+from src.common.pubsub import subscribe
 from src.common.shutdown import cleanup_and_exit
+from src.common.static_assets import NO_STORE_HEADERS, init_static_assets
 from src.wiki_app.services.repo_service import RepoService
 from src.wiki_app.services.page_service import PageService
 from src.wiki_app.services.comment_service import CommentService
 from src.wiki_app.services.search_service import SearchService
+from src.watcher.board import BOARD_CHANNEL, build_board, get_board_hub
+from src.watcher.event_writer import EVENT_CHANNEL
+from src.watcher.index_store import get_index_store
 from src.wiki_app.routes.pages import pages_bp, init_pages
 from src.wiki_app.routes.comments import comments_bp, init_comments
 from src.wiki_app.routes.history import history_bp, init_history
@@ -72,19 +79,27 @@ def create_app() -> Flask:
 
     @app.after_request
     def disable_cache(response):
-        # Ctrl+Rで即時反映できるよう、HTML/CSS/JS/JSONのキャッシュを無効化する。
+        # Ctrl+Rで即時反映できるよう、HTML/JSONのキャッシュを無効化する。
         cache_targets = {
             "text/html",
             "text/css",
             "application/javascript",
             "application/json",
         }
-        if request.path.startswith("/static/") or response.mimetype in cache_targets:
-            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
+        # /static/ は init_static_assets 側で制御する
+        if request.path.startswith("/static/"):
+            return response
+        # ETag 付きの応答は conditional_response が no-cache で再検証させる
+        if response.headers.get("ETag"):
+            return response
+        if response.mimetype in cache_targets:
+            response.headers.update(NO_STORE_HEADERS)
         return response
 
+    init_request_activity(app)
+    init_static_assets(app, load_config("app"))
+    init_compression(app, load_config("app"))
+
     @app.context_processor
     def inject_admin_url():
         try:
@@ -122,6 +137,8 @@ def create_app() -> Flask:
     init_comments(comment_service, page_service)
     init_history(repo_service, page_service)
     init_search(search_service)
+    # index の変更を /api/watcher/stream へ配信する
+    get_board_hub()
 
     app.register_blueprint(pages_bp)
     app.register_blueprint(comments_bp)
@@ -157,11 +174,10 @@ def create_app() -> Flask:
 
     @app.route("/api/watcher/status")
     def watcher_status():
-        index_path = get_state_dir() / "watcher" / "index.json"
+        store = get_index_store()
         try:
-            if index_path.exists():
-                with open(index_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+            if store.exists():
+                data = store.snapshot()
                 targets = data.get("targets", {})
                 config_targets = []
                 config_names: set[str] = set()
@@ -202,69 +218,18 @@ def create_app() -> Flask:
     @app.route("/api/watcher/board")
     def watcher_board():
         config = load_config("watcher")
-        targets_cfg = config.get("targets", [])
-        index_path = get_state_dir() / "watcher" / "index.json"
-        index = {"last_run": "", "targets": {}}
-        if index_path.exists():
-            try:
-                with open(index_path, "r", encoding="utf-8") as f:
-                    index = json.load(f)
-            except Exception:
-                index = {"last_run": "", "targets": {}}
-
-        index_by_name = {}
-        for t in index.get("targets", {}).values():
-            name = t.get("name")
-            if name:
-                index_by_name[name] = t
-
-        results = []
-        for t in targets_cfg:
-            name = t.get("name", "unknown")
-            entry = index_by_name.get(name, {})
-            results.append({
-                "name": name,
-                "type": t.get("type", "generic"),
-                "enabled": t.get("enabled", True),
-                "status": entry.get("status", "unknown"),
-                "alert_active": entry.get("alert_active", False),
-                "info_active": entry.get("info_active", False),
-                "last_checked": entry.get("last_checked", ""),
-                "last_changed": entry.get("last_changed", ""),
-                "last_alert_at": entry.get("last_alert_at", ""),
-                "last_alert_summary": entry.get("last_alert_summary", ""),
-                "last_info_summary": entry.get("last_info_summary", ""),
-                "site_url": t.get("site_url")
-                or t.get("url")
-                or t.get("warning_url")
-                or t.get("base_url")
-                or "",
-                "url": t.get("url")
-                or t.get("warning_url")
-                or t.get("base_url")
-                or "",
-                "selector": t.get("selector", ""),
-                "detect_mode": t.get("detect_mode", "text_change"),
-                "alert_statuses": t.get("alert_statuses", []),
-                "warning_codes": t.get("warning_codes", []),
-                "threshold": t.get("threshold", None),
-                "area_code": t.get("area_code", ""),
-                "timeout": t.get("timeout", None),
-            })
-
-        return jsonify({
-            "running": index_path.exists(),
-            "last_run": index.get("last_run", ""),
-            "night_stop": config.get("night_stop", {}),
-            "targets": results,
-        })
+        store = get_index_store()
+        # snapshot より先に版を取る（途中で更新されても次回の再検証で取り直せる）
+        etag = make_etag(store.version, store.exists(), config)
+        return conditional_response(
+            etag,
+            lambda: jsonify(build_board(config, store.snapshot(), store.exists())),
+        )
 
     @app.route("/api/watcher/night_stop", methods=["GET", "PUT"])
     def watcher_night_stop():
-        config_path = get_config_dir() / "watcher.json"
         try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
+            config = load_config("watcher")
         except Exception:
             config = {}
 
@@ -287,8 +252,7 @@ def create_app() -> Flask:
         }
         config["night_stop"] = night_stop
         try:
-            with open(config_path, "w", encoding="utf-8") as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            save_config("watcher", config)
         except Exception as e:
             return jsonify({"ok": False, "error": str(e)}), 500
 
@@ -296,10 +260,8 @@ def create_app() -> Flask:
 
     @app.route("/api/alert/config", methods=["GET", "PUT"])
     def alert_config():
-        config_path = get_config_dir() / "alert.json"
         try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
+            config = load_config("alert")
         except Exception:
             config = {}
 
@@ -311,8 +273,7 @@ def create_app() -> Flask:
             payload.get("window_enabled", config.get("window_enabled", True))
         )
         try:
-            with open(config_path, "w", encoding="utf-8") as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            save_config("alert", config)
         except Exception as e:
             return jsonify({"ok": False, "error": str(e)}), 500
 
@@ -354,30 +315,26 @@ def create_app() -> Flask:
 
     @app.route("/api/watcher/stream")
     def watcher_stream():
-        index_path = get_state_dir() / "watcher" / "index.json"
+        store = get_index_store()
 
         def _stream():
-            last_key = ""
-            last_ping = 0.0
-            while True:
-                try:
-                    if index_path.exists():
-                        stat = index_path.stat()
-                        key = f"{stat.st_mtime_ns}:{stat.st_size}"
-                    else:
-                        key = "missing"
-                    if key != last_key:
-                        last_key = key
-                        payload = json.dumps({"type": "index", "key": key})
-                        yield f"data: {payload}\n\n"
-                except Exception:
-                    pass
-
-                now = time.time()
-                if now - last_ping > 15:
-                    yield ": keepalive\n\n"
-                    last_ping = now
-                time.sleep(1)
+            # 接続時に現在の世代を伝え、以降はボード差分とイベントを届いた順に流す
+            subscription = subscribe(BOARD_CHANNEL, EVENT_CHANNEL)
+            try:
+                payload = json.dumps({"type": "hello", "version": store.version})
+                yield f"data: {payload}\n\n"
+                while True:
+                    item = subscription.get_with_channel(timeout=15)
+                    if item is None:
+                        yield ": keepalive\n\n"
+                        continue
+                    channel_name, message = item
+                    if channel_name == EVENT_CHANNEL:
+                        message = {"type": "event", "event": message["event"]}
+                    payload = json.dumps(message, ensure_ascii=False)
+                    yield f"data: {payload}\n\n"
+            finally:
+                subscription.close()
 
         return Response(
             stream_with_context(_stream()),
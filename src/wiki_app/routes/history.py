@@ -4,6 +4,7 @@ import re
 from flask import Blueprint, render_template, redirect, url_for, abort, jsonify
 
 from src.common.config import load_config
+from src.common.http_cache import conditional_response, make_etag
 from src.wiki_app.models.page import Page
 from src.wiki_app.services.repo_service import RepoService
 from src.wiki_app.services.page_service import PageService
@@ -215,6 +216,10 @@ def restore_page(slug, commit_id):
 @history_bp.route("/api/history")
 def global_history():
     """マニュアル全体のコミット履歴をJSONで返す"""
+    return conditional_response(make_etag(_repo_service.head_id()), _global_history)
+
+
+def _global_history():
     commits = _repo_service.log_all(max_count=30)
     commit_ids = {c.get("id", "") for c in commits if c.get("id")}
     commit_to_slug, slug_latest_commit, slug_prev_commit = _build_commit_slug_index(commit_ids)
@@ -2,22 +2,33 @@ import re
 import json
 import hashlib
 from datetime import datetime
+from pathlib import PurePosixPath
+from urllib.parse import unquote
 
 from flask import (
     Blueprint,
+    Response,
+    current_app,
     render_template,
+    stream_template,
     request,
     redirect,
     url_for,
     abort,
     jsonify,
+    send_file,
     send_from_directory,
 )
-import markdown as md
+from werkzeug.utils import safe_join
 
 from src.common.config import load_config
+from src.common.http_cache import conditional_response, directory_stamp, make_etag
 from src.common.paths import get_state_dir, get_data_dir
+from src.wiki_app.services.markdown_renderer import get_markdown_extensions, render_markdown
+from src.wiki_app.services.image_store import get_image_store
+from src.wiki_app.services.image_variants import get_image_variants
 from src.wiki_app.services.page_service import PageService
+from src.wiki_app.services.render_cache import get_render_cache
 
 pages_bp = Blueprint("pages", __name__)
 
@@ -29,6 +40,13 @@ def init_pages(page_service: PageService) -> None:
     _page_service = page_service
 
 
+# _render_md の変換手順を変えたら上げる（レンダリングキャッシュのキーに含まれる）
+_RENDERER_VERSION = 2
+# 本文画像の表示幅（.page-view の最大幅に合わせる）。srcset からの選択に使う
+_IMAGE_SIZES = "(max-width: 1180px) 100vw, 1180px"
+# 全ページ印刷をストリーミングで送るときの1回あたりの目安（文字数）
+_STREAM_CHUNK_SIZE = 8192
+
 _NOTE_MD_PATTERN = re.compile(
     r"^> \[!(NOTE|WARNING|IMPORTANT|TIP)\]\s*\n((?:> (?!\[!(?:NOTE|WARNING|IMPORTANT|TIP)\]).*\n?)*)",
     re.MULTILINE,
@@ -55,9 +73,7 @@ def _preprocess_notes(text: str) -> str:
         )
         note_type = _NOTE_TYPES[kind]
         label = _NOTE_LABELS[kind]
-        wiki_config = load_config("wiki")
-        extensions = wiki_config.get("markdown_extensions", [])
-        body_html = md.markdown(body, extensions=extensions)
+        body_html = render_markdown(body)
         return (
             f'<div class="note note-{note_type}" data-note-type="{note_type}">'
             f'<div class="note-title">{label}</div>'
@@ -73,6 +89,9 @@ _COMMENT_TAG_PATTERN = re.compile(
     re.DOTALL,
 )
 
+_IMG_TAG_PATTERN = re.compile(r"<img\b[^>]*>")
+_IMG_SRC_PATTERN = re.compile(r'\ssrc="(?P<url>/data/images/[^"?#]+)"')
+
 _TASK_ITEM_PATTERN = re.compile(
     r"<(?P<tag>p|li)>\s*\[(?P<mark>[ xX])\]\s*(?P<body>.*?)</(?P=tag)>",
     re.DOTALL,
@@ -89,7 +108,6 @@ _MIME_TO_EXT = {
     "image/bmp": ".bmp",
     "image/svg+xml": ".svg",
 }
-_INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
 
 
 def _postprocess_comment_tags(html: str) -> str:
@@ -101,6 +119,30 @@ def _postprocess_comment_tags(html: str) -> str:
     return _COMMENT_TAG_PATTERN.sub(_replace, html)
 
 
+def _postprocess_image_srcset(html: str) -> str:
+    """/data/images/ の <img> に縮小版の srcset / sizes を付ける。"""
+    variants = get_image_variants()
+    if not variants.available or not variants.widths():
+        return html
+
+    def _replace(m: re.Match) -> str:
+        tag = m.group(0)
+        src = _IMG_SRC_PATTERN.search(tag)
+        if not src or "srcset=" in tag:
+            return tag
+        filename = unquote(src.group("url")[len("/data/images/"):])
+        if ".." in PurePosixPath(filename).parts:
+            return tag
+        srcset = variants.srcset(filename, src.group("url"))
+        if not srcset:
+            return tag
+        return tag.replace(
+            src.group(0), f'{src.group(0)} srcset="{srcset}" sizes="{_IMAGE_SIZES}"', 1
+        )
+
+    return _IMG_TAG_PATTERN.sub(_replace, html)
+
+
 def _postprocess_task_items(html: str) -> str:
     """[ ] / [x] 形式の行をチェックボックス表示に変換する。"""
     counter = {"value": 0}
@@ -159,24 +201,57 @@ def _normalize_nested_list_indent(text: str) -> str:
 
 
 def _render_md(text: str) -> str:
-    wiki_config = load_config("wiki")
-    extensions = wiki_config.get("markdown_extensions", [])
+    """本文 Markdown を HTML に変換する。同一本文・同一設定の結果はキャッシュから返す。"""
+    cache = get_render_cache()
+    key = _render_cache_key(text)
+    html = cache.get(key)
+    if html is None:
+        html = _render_md_uncached(text)
+        cache.put(key, html)
+    return html
+
+
+def _render_cache_key(text: str) -> str:
+    return get_render_cache().make_key(
+        text,
+        get_markdown_extensions(),
+        f"{_RENDERER_VERSION}:{get_image_variants().signature()}",
+    )
+
+
+def _renderer_signature() -> str:
+    """本文以外で変換結果を左右するもの（拡張・変換手順・縮小版設定）を表す文字列"""
+    return json.dumps(
+        [get_markdown_extensions(), _RENDERER_VERSION, get_image_variants().signature()]
+    )
+
+
+def _render_md_uncached(text: str) -> str:
     text = _normalize_nested_list_indent(text)
     text = _preprocess_notes(text)
-    html = md.markdown(text, extensions=extensions)
+    html = render_markdown(text)
     html = _postprocess_task_items(html)
     html = _postprocess_comment_tags(html)
+    html = _postprocess_image_srcset(html)
     return html
 
 
-def _sanitize_upload_filename(name: str) -> str:
-    # ディレクトリ成分を除去し、OS非互換文字を置換
-    base = (name or "").strip().replace("\x00", "")
-    base = base.rsplit("/", 1)[-1].rsplit("\\", 1)[-1]
-    base = _INVALID_FILENAME_CHARS.sub("_", base).strip()
-    # Windows互換のため末尾ドット/空白を除去
-    base = base.rstrip(" .")
-    return base
+def _page_view_etag(page) -> str:
+    """ページ表示の ETag（本文・設定・テンプレート・静的ファイルのいずれかが変われば変わる）"""
+    admin_config = load_config("admin")
+    return make_etag(
+        page.slug,
+        page.title,
+        page.created,
+        page.updated,
+        hashlib.sha256(page.body.encode("utf-8")).hexdigest(),
+        _RENDERER_VERSION,
+        load_config("wiki"),
+        admin_config.get("host"),
+        admin_config.get("port"),
+        directory_stamp(current_app.template_folder),
+        directory_stamp(current_app.static_folder),
+    )
 
 
 def _checkbox_state_path(slug: str):
@@ -196,12 +271,14 @@ def index():
             "トップページへようこそ。\n\n[ページ一覧](/pages/list) から各ページにアクセスできます。",
         )
     page = _page_service.get_page(slug)
-    html_content = _render_md(page.body)
-    return render_template(
-        "page_view.html",
-        page=page,
-        html_content=html_content,
-        site_name=wiki_config.get("site_name", "Wiki"),
+    return conditional_response(
+        _page_view_etag(page),
+        lambda: render_template(
+            "page_view.html",
+            page=page,
+            html_content=_render_md(page.body),
+            site_name=wiki_config.get("site_name", "Wiki"),
+        ),
     )
 
 
@@ -219,26 +296,42 @@ def page_list():
 
 @pages_bp.route("/pages/print/all")
 def print_all_pages():
-    """全ページを印刷用にまとめて表示する"""
+    """全ページを印刷用にまとめて表示する（ツリー順に描画しながら送る）"""
     wiki_config = load_config("wiki")
-    pages = _page_service.list_pages()
-    rendered_pages = []
-    for page in pages:
-        html_content = _render_md(page.body)
-        rendered_pages.append({
-            "title": page.title,
-            "slug": page.slug,
-            "created": page.created,
-            "updated": page.updated,
-            "html": html_content,
-        })
     auto = request.args.get("autoprint") == "1"
-    return render_template(
+    stream = stream_template(
         "page_print_all.html",
-        pages=rendered_pages,
+        pages=_iter_print_pages(),
         site_name=wiki_config.get("site_name", "Wiki"),
         autoprint=auto,
     )
+    return Response(_coalesce_chunks(stream), mimetype="text/html")
+
+
+def _iter_print_pages():
+    for page in _page_service.iter_pages_in_tree_order():
+        yield {
+            "title": page.title,
+            "slug": page.slug,
+            "created": page.created,
+            "updated": page.updated,
+            "html": _render_md(page.body),
+        }
+
+
+def _coalesce_chunks(chunks, min_size: int = _STREAM_CHUNK_SIZE):
+    """テンプレートの細かい出力をまとめて送る"""
+    buffer: list[str] = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= min_size:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
 
 
 @pages_bp.route("/pages/new", methods=["GET", "POST"])
@@ -280,12 +373,14 @@ def view_page(slug):
     page = _page_service.get_page(slug)
     if not page:
         abort(404)
-    html_content = _render_md(page.body)
-    return render_template(
-        "page_view.html",
-        page=page,
-        html_content=html_content,
-        site_name=wiki_config.get("site_name", "Wiki"),
+    return conditional_response(
+        _page_view_etag(page),
+        lambda: render_template(
+            "page_view.html",
+            page=page,
+            html_content=_render_md(page.body),
+            site_name=wiki_config.get("site_name", "Wiki"),
+        ),
     )
 
 
@@ -365,40 +460,31 @@ def upload_image_api():
     if mimetype and not mimetype.startswith("image/"):
         return jsonify({"ok": False, "error": "画像ファイルではありません"}), 400
 
-    images_dir = get_data_dir() / "images"
-    images_dir.mkdir(parents=True, exist_ok=True)
-    raw_name = _sanitize_upload_filename(file.filename or "")
-    stem = raw_name
-    if "." in raw_name:
-        stem = raw_name.rsplit(".", 1)[0]
-    stem = stem or "image"
-    filename = stem + ext
-    dst = images_dir / filename
-    # 同名が既にある場合のみ連番を付与（基本は元ファイル名を維持）
-    counter = 2
-    while dst.exists():
-        filename = f"{stem}-{counter}{ext}"
-        dst = images_dir / filename
-        counter += 1
-    file.save(dst)
+    # 内容のハッシュで保存する（同じ画像の再アップロードは既存ファイルを返す）
+    filename = get_image_store().save(file.read(), ext)
+    get_image_variants().warm(filename)
     return jsonify({"ok": True, "url": url_for("pages.serve_image_file", filename=filename)})
 
 
 @pages_bp.route("/data/images/<path:filename>")
 def serve_image_file(filename):
     images_dir = get_data_dir() / "images"
+    # ?w=<幅> なら、その幅に収まる縮小版を返す（作れない場合は元画像）
+    width = request.args.get("w", type=int)
+    if width and safe_join(str(images_dir), filename):
+        variant = get_image_variants().variant_path(filename, width)
+        if variant is not None:
+            return send_file(variant)
     return send_from_directory(images_dir, filename)
 
 
 @pages_bp.route("/api/pages/tree")
 def page_tree():
     """ページ階層ツリーをJSONで返す"""
-    tree = _page_service.get_tree()
-    resp = jsonify(tree)
-    resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    resp.headers["Pragma"] = "no-cache"
-    resp.headers["Expires"] = "0"
-    return resp
+    return conditional_response(
+        make_etag(_page_service.tree_version()),
+        lambda: jsonify(_page_service.get_tree()),
+    )
 
 
 @pages_bp.route("/api/trash/pages", methods=["GET"])
@@ -0,0 +1,127 @@
+"""最新版バックアップの実行タイミング
+
+編集のたびに届く更新要求をまとめ、最後の要求から quiet_seconds 静かになった時点で
+1回だけ実行する。ただし最初の要求から max_delay_seconds を超えて遅らせない。
+実行の時点でリクエストを処理中なら、その間は（上限まで）後回しにする。
+"""
+import threading
+import time
+from typing import Callable
+
+from src.common.activity import get_request_activity
+from src.common.config import load_config
+from src.common.logger import get_logger
+
+logger = get_logger("wiki")
+
+DEFAULT_QUIET_SECONDS = 5.0
+DEFAULT_MAX_DELAY_SECONDS = 60.0
+# 終了時に予約中のバックアップを待つ上限
+DEFAULT_FLUSH_TIMEOUT_SECONDS = 30.0
+
+
+class BackupScheduler:
+    """更新要求をまとめて、専用スレッドで job を実行する"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._job: Callable[[], object] | None = None
+        self._first_requested: float | None = None
+        self._last_requested = 0.0
+        self._worker: threading.Thread | None = None
+        self._running = 0
+
+    def request(self, job: Callable[[], object]) -> None:
+        """job の実行を予約する（実行前の予約はまとめて1回になる）"""
+        now = time.monotonic()
+        with self._cond:
+            self._job = job
+            self._last_requested = now
+            if self._first_requested is None:
+                self._first_requested = now
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, daemon=True, name="backup-scheduler"
+                )
+                self._worker.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = DEFAULT_FLUSH_TIMEOUT_SECONDS) -> bool:
+        """予約中の job を待たずに実行し、実行中のものも含めて最大 timeout 秒待つ。
+
+        終了時に呼び、直前の編集をバックアップに反映させる。終われば True
+        """
+        with self._cond:
+            job = self._job
+            self._job = None
+            self._first_requested = None
+            if job is not None:
+                self._running += 1
+        if job is not None:
+            threading.Thread(
+                target=self._execute, args=(job, 0.0), daemon=True, name="backup-flush"
+            ).start()
+        with self._cond:
+            return self._cond.wait_for(lambda: self._running == 0, timeout)
+
+    def _run(self) -> None:
+        activity = get_request_activity()
+        while True:
+            with self._cond:
+                while self._first_requested is None:
+                    self._cond.wait()
+                quiet, max_delay = _load_timing()
+                now = time.monotonic()
+                deadline = self._first_requested + max_delay
+                due = min(self._last_requested + quiet, deadline)
+                if now < due:
+                    self._cond.wait(due - now)
+                    continue
+            # 画面操作の処理中は、上限時刻までは終わるのを待つ
+            if now < deadline:
+                activity.wait_idle(deadline - now)
+            with self._cond:
+                job = self._job
+                if job is None or self._first_requested is None:
+                    # flush が先に実行した
+                    continue
+                waited = time.monotonic() - self._first_requested
+                self._first_requested = None
+                self._job = None
+                self._running += 1
+            self._execute(job, waited)
+
+    def _execute(self, job: Callable[[], object], waited: float) -> None:
+        try:
+            job()
+        except Exception:
+            logger.exception("最新版バックアップの更新に失敗")
+        else:
+            logger.debug("バックアップ実行（初回要求から %.1f 秒）", waited)
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+
+def _load_timing() -> tuple[float, float]:
+    try:
+        settings = load_config("wiki").get("backup", {})
+    except Exception:
+        settings = {}
+    quiet = float(settings.get("quiet_seconds", DEFAULT_QUIET_SECONDS))
+    max_delay = float(settings.get("max_delay_seconds", DEFAULT_MAX_DELAY_SECONDS))
+    return quiet, max(quiet, max_delay)
+
+
+_shared_scheduler: BackupScheduler | None = None
+_shared_lock = threading.Lock()
+
+
+def get_backup_scheduler() -> BackupScheduler:
+    """プロセス共通のバックアップスケジューラを返す（wiki/admin で共有）。"""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = BackupScheduler()
+        return _shared_scheduler
@@ -1,8 +1,6 @@
-import base64
-import mimetypes
+import hashlib
+import json
 import os
-import posixpath
-import re
 import shutil
 import subprocess
 import textwrap
@@ -10,65 +8,52 @@ import tempfile
 import threading
 import time
 from datetime import datetime
-from html import escape
 from pathlib import Path, PurePosixPath
-from urllib.parse import unquote, urlsplit, urlunsplit
-
-import markdown as md
 
+from src.common.activity import get_request_activity
 from src.common.config import load_config
 from src.common.logger import get_logger
-from src.common.paths import get_base_dir, get_data_dir, get_state_dir, get_web_dir
+from src.common.paths import get_base_dir, get_data_dir, get_state_dir
 from src.common.process import hidden_subprocess_kwargs
+from src.wiki_app.services.backup_scheduler import get_backup_scheduler
+from src.wiki_app.services.export_engine import (
+    ExportEngine,
+    file_stamp,
+    renderer_signature,
+    write_entries,
+)
 
 logger = get_logger("wiki")
 
-_DEFAULT_UI_PATTERN = "latte_notebook"
 _DIR_MARKER = ".lfdir"
-_UI_PATTERN_CSS: dict[str, str] = {
-    "latte_notebook": "pattern-latte-notebook.css",
-    "city_pop_guide": "pattern-city-pop-guide.css",
-    "midnight_console": "pattern-midnight-console.css",
-    "robotic_slate": "pattern-robotic-slate.css",
-}
-_ATTR_URL_PATTERN = re.compile(r'(?P<attr>href|src)=("|\')(?P<url>[^"\']+)("|\')')
-_INVALID_FILE_PART = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+_MANIFEST_VERSION = 2
+_YIELD_TO_REQUESTS_SECONDS = 1.0
+# wiki/admin の PageService がそれぞれ BackupService を持つため、更新はプロセス内で直列化する
+_refresh_lock = threading.Lock()
 
 
 class BackupService:
     def __init__(self, page_service):
         self._page_service = page_service
-        self._state_lock = threading.Lock()
-        self._worker: threading.Thread | None = None
-        self._pending = False
 
     def schedule_refresh(self) -> None:
-        """重複要求をまとめてバックグラウンドで最新版バックアップを更新する。"""
-        with self._state_lock:
-            self._pending = True
-            if self._worker and self._worker.is_alive():
-                return
-            self._worker = threading.Thread(
-                target=self._run_refresh_loop,
-                daemon=True,
-                name="backup-refresh",
-            )
-            self._worker.start()
-
-    def _run_refresh_loop(self) -> None:
-        while True:
-            with self._state_lock:
-                if not self._pending:
-                    self._worker = None
-                    return
-                self._pending = False
-            try:
-                self.refresh_latest_backup()
-            except Exception:
-                logger.exception("最新版バックアップの更新に失敗")
+        """最新版バックアップの更新を予約する（連続した編集はまとめて1回にする）。"""
+        get_backup_scheduler().request(self.refresh_latest_backup)
 
     def refresh_latest_backup(self) -> Path:
-        """最新版のみのバックアップを日付ディレクトリに再生成する。"""
+        """最新版のみのバックアップを日付ディレクトリに反映する。
+
+        wiki.json の backup.mode が "incremental" なら変わったページだけを書き換え、
+        それ以外は全体を作り直す。
+        """
+        with _refresh_lock:
+            mode = load_config("wiki").get("backup", {}).get("mode", "full")
+            if mode == "incremental":
+                return self._refresh_incremental()
+            self._remove_path_with_retry(self._manifest_path())
+            return self._refresh_full()
+
+    def _refresh_full(self) -> Path:
         date_label = datetime.now().strftime("%Y-%m-%d")
         base_dir = get_base_dir()
         backup_dir = base_dir / f"バックアップ-{date_label}"
@@ -99,6 +84,220 @@ class BackupService:
         logger.info("最新版バックアップ更新: %s", backup_dir)
         return backup_dir
 
+    def _refresh_incremental(self) -> Path:
+        """前回の manifest と比べて、変わったページだけを書き換える。"""
+        date_label = datetime.now().strftime("%Y-%m-%d")
+        base_dir = get_base_dir()
+        backup_dir = base_dir / f"バックアップ-{date_label}"
+        md_dir = backup_dir / "md"
+        html_dir = backup_dir / "html"
+        docs_dir = backup_dir / "docs"
+        pdf_dir = backup_dir / "pdf"
+
+        manifest = self._load_manifest()
+        if manifest.get("backup_dir") != backup_dir.name or not html_dir.exists():
+            # 日付が変わった・出力が消えた場合は出力を空にして全ページを書く
+            manifest = {}
+            for directory in (md_dir, html_dir, docs_dir, pdf_dir):
+                self._remove_path_with_retry(directory)
+        for directory in (md_dir, html_dir / "pages", docs_dir, pdf_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self._cleanup_hidden_backup_dirs(base_dir)
+
+        source_dir = get_data_dir() / "pages"
+        images_dir = get_data_dir() / "images"
+        pages = self._page_service.list_pages()
+        engine = self._engine(pages)
+        slug_map = engine.slug_map
+        style_hash = _sha256(
+            engine.ui_pattern_class,
+            engine.style_css,
+            engine.pattern_css,
+            engine.image_mode,
+            renderer_signature(),
+        )
+
+        old_entries: dict[str, dict] = manifest.get("pages", {})
+        entries: dict[str, dict] = {}
+        signatures: dict[str, str] = {}
+        stale: list = []
+        for page in pages:
+            signature = _sha256(
+                page.title, page.created, page.updated, page.body, style_hash
+            )
+            prev = old_entries.get(page.slug)
+            if (
+                prev
+                and prev.get("signature") == signature
+                and prev.get("html") == slug_map[page.slug]
+                and self._deps_unchanged(prev, slug_map, images_dir)
+            ):
+                entries[page.slug] = prev
+                continue
+            signatures[page.slug] = signature
+            stale.append(page)
+
+        activity = get_request_activity()
+        changed: list[str] = []
+        for rendered in engine.render_pages(stale):
+            # 画面操作のリクエストがあれば、終わるまで少し譲る
+            activity.wait_idle(_YIELD_TO_REQUESTS_SECONDS)
+            page = rendered.page
+            _write_atomic(html_dir / "pages" / rendered.html_rel, rendered.html.encode("utf-8"))
+            md_source = source_dir / f"{page.slug}.md"
+            if md_source.exists():
+                _write_atomic(md_dir / f"{page.slug}.md", md_source.read_bytes())
+            entries[page.slug] = {
+                "signature": signatures[page.slug],
+                "html": rendered.html_rel,
+                "links": rendered.links,
+                "images": rendered.images,
+                "assets": rendered.assets,
+            }
+            changed.append(page.slug)
+
+        removed = 0
+        for slug, prev in old_entries.items():
+            current = entries.get(slug)
+            if current is not None and current.get("html") == prev.get("html"):
+                continue
+            removed += 1
+            if slug not in entries:
+                self._remove_output(md_dir, f"{slug}.md")
+            html_rel = prev.get("html", "")
+            if html_rel:
+                self._remove_output(html_dir / "pages", html_rel)
+                self._remove_output(docs_dir, str(PurePosixPath(html_rel).with_suffix(".docx")))
+                self._remove_output(pdf_dir, str(PurePosixPath(html_rel).with_suffix(".pdf")))
+        self._sync_md_directories(source_dir, md_dir)
+        self._sync_assets(html_dir / "assets", images_dir, entries)
+
+        _write_if_changed(html_dir / "index.html", engine.index_html())
+        _write_if_changed(html_dir / "html2docs.ps1", self._html_to_docs_script())
+
+        if changed and not self._convert_changed_pages(
+            html_dir, docs_dir, pdf_dir, [entries[slug] for slug in changed]
+        ):
+            # 変換に失敗したページは次回やり直す
+            for slug in changed:
+                entries[slug]["signature"] = ""
+
+        self._save_manifest({
+            "version": _MANIFEST_VERSION,
+            "backup_dir": backup_dir.name,
+            "pages": entries,
+        })
+        logger.info(
+            "最新版バックアップ差分更新: %s (更新=%d, 削除=%d, 全%d件)",
+            backup_dir,
+            len(changed),
+            removed,
+            len(entries),
+        )
+        return backup_dir
+
+    def _deps_unchanged(self, entry: dict, slug_map: dict[str, str], images_dir: Path) -> bool:
+        """前回描画時のリンク先・埋め込み画像が変わっていないか"""
+        for slug, target in entry.get("links", {}).items():
+            if slug_map.get(slug) != target:
+                return False
+        for rel, stamp in entry.get("images", {}).items():
+            path = images_dir.joinpath(*PurePosixPath(rel).parts)
+            if file_stamp(path) != stamp:
+                return False
+        return True
+
+    def _sync_assets(self, assets_dir: Path, images_dir: Path, entries: dict[str, dict]) -> None:
+        """html/assets を各ページが参照する画像だけにそろえる（同じ画像は1ファイル）"""
+        wanted: dict[str, str] = {}
+        for entry in entries.values():
+            wanted.update(entry.get("assets", {}))
+        for name, rel in wanted.items():
+            target = assets_dir / name
+            if target.exists():
+                continue
+            source = images_dir.joinpath(*PurePosixPath(rel).parts)
+            if source.is_file():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(source, target)
+        if assets_dir.exists():
+            for path in assets_dir.iterdir():
+                if path.name not in wanted:
+                    self._remove_path_with_retry(path)
+            if not any(assets_dir.iterdir()):
+                assets_dir.rmdir()
+
+    def _convert_changed_pages(
+        self, html_dir: Path, docs_dir: Path, pdf_dir: Path, changed_entries: list[dict]
+    ) -> bool:
+        """更新したページだけを docx/pdf に変換する。失敗したら False"""
+        if os.name != "nt" or not (shutil.which("powershell") or shutil.which("powershell.exe")):
+            self._export_docs_and_pdf(html_dir, docs_dir, pdf_dir)
+            return True
+        staging = Path(tempfile.mkdtemp(prefix="backup-docs-", dir=str(get_state_dir())))
+        try:
+            staging_pages = staging / "pages"
+            for entry in changed_entries:
+                rel = entry["html"]
+                target = staging_pages.joinpath(*PurePosixPath(rel).parts)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(html_dir / "pages" / rel, target)
+                # ページから相対参照する画像も同じ配置でコピーする
+                for name in entry.get("assets", {}):
+                    asset = html_dir / "assets" / name
+                    if asset.exists() and not (staging / "assets" / name).exists():
+                        (staging / "assets").mkdir(exist_ok=True)
+                        shutil.copy2(asset, staging / "assets" / name)
+            shutil.copy2(html_dir / "html2docs.ps1", staging / "html2docs.ps1")
+            for note in (docs_dir / "README.txt", pdf_dir / "README.txt"):
+                self._remove_path_with_retry(note)
+            self._export_docs_and_pdf(staging, docs_dir, pdf_dir)
+            return not (docs_dir / "README.txt").exists()
+        finally:
+            self._remove_path_with_retry(staging)
+
+    def _remove_output(self, root: Path, rel: str) -> None:
+        """出力ファイルを削除し、空になった親ディレクトリも片付ける"""
+        path = root.joinpath(*PurePosixPath(rel).parts)
+        self._remove_path_with_retry(path)
+        parent = path.parent
+        while parent != root and parent.is_dir() and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+
+    def _sync_md_directories(self, source_dir: Path, md_dir: Path) -> None:
+        """md 側のディレクトリ構成（空ディレクトリを含む）を data/pages に合わせる"""
+        if not source_dir.exists():
+            return
+        wanted = {
+            d.relative_to(source_dir) for d in source_dir.rglob("*") if d.is_dir()
+        }
+        for rel in wanted:
+            (md_dir / rel).mkdir(parents=True, exist_ok=True)
+        for directory in sorted(md_dir.rglob("*"), reverse=True):
+            if directory.is_dir() and directory.relative_to(md_dir) not in wanted:
+                if not any(directory.iterdir()):
+                    directory.rmdir()
+
+    def _manifest_path(self) -> Path:
+        return get_state_dir() / "backup" / "manifest.json"
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != _MANIFEST_VERSION:
+            return {}
+        return data
+
+    def _save_manifest(self, manifest: dict) -> None:
+        _write_atomic(
+            self._manifest_path(),
+            json.dumps(manifest, ensure_ascii=False).encode("utf-8"),
+        )
+
     def _replace_backup_contents(self, work_root: Path, backup_dir: Path) -> None:
         expected = ("md", "html", "docs", "pdf")
         for name in expected:
@@ -138,263 +337,18 @@ class BackupService:
                 marker.unlink()
 
     def _export_html(self, html_dir: Path) -> None:
-        pages_dir = html_dir / "pages"
-        pages_dir.mkdir(parents=True, exist_ok=True)
-
-        pages = self._page_service.list_pages()
-        slug_map = {page.slug: self._slug_to_filename(page.slug) for page in pages}
-        ui_pattern_class, style_css, pattern_css = self._resolve_style_context()
-        images_dir = get_data_dir() / "images"
-
-        for page in pages:
-            raw_html = self._render_markdown(page.body)
-            body_html = self._rewrite_html_links(
-                raw_html=raw_html,
-                current_slug=page.slug,
-                slug_map=slug_map,
-                images_dir=images_dir,
-            )
-            html_doc = self._build_page_html(
-                title=page.title,
-                slug=page.slug,
-                created=page.created,
-                updated=page.updated,
-                body_html=body_html,
-                ui_pattern_class=ui_pattern_class,
-                style_css=style_css,
-                pattern_css=pattern_css,
-            )
-            rel = PurePosixPath(slug_map[page.slug])
-            target = pages_dir.joinpath(*rel.parts)
-            target.parent.mkdir(parents=True, exist_ok=True)
-            target.write_text(html_doc, encoding="utf-8")
-
-        (html_dir / "index.html").write_text(
-            self._build_index_html(
-                pages=pages,
-                slug_map=slug_map,
-                ui_pattern_class=ui_pattern_class,
-                style_css=style_css,
-                pattern_css=pattern_css,
-            ),
-            encoding="utf-8",
+        (html_dir / "pages").mkdir(parents=True, exist_ok=True)
+        engine = self._engine(self._page_service.list_pages())
+        write_entries(engine.iter_entries(), html_dir)
+
+    def _engine(self, pages: list) -> ExportEngine:
+        return ExportEngine(
+            pages,
+            image_mode=_image_mode(),
+            index_title="バックアップHTML一覧",
+            index_heading="バックアップHTML一覧",
         )
 
-    def _resolve_style_context(self) -> tuple[str, str, str]:
-        wiki_config = load_config("wiki")
-        pattern_key = str(wiki_config.get("ui_pattern", _DEFAULT_UI_PATTERN))
-        if pattern_key not in _UI_PATTERN_CSS:
-            pattern_key = _DEFAULT_UI_PATTERN
-        pattern_name = _UI_PATTERN_CSS[pattern_key]
-
-        web_dir = get_web_dir()
-        style_path = web_dir / "static" / "css" / "style.css"
-        pattern_path = web_dir / "static" / "css" / pattern_name
-        style_css = style_path.read_text(encoding="utf-8") if style_path.exists() else ""
-        pattern_css = pattern_path.read_text(encoding="utf-8") if pattern_path.exists() else ""
-        return pattern_key.replace("_", "-"), style_css, pattern_css
-
-    def _render_markdown(self, text: str) -> str:
-        try:
-            # ページ閲覧時と同じレンダラーを優先利用
-            from src.wiki_app.routes.pages import _render_md  # noqa: PLC0415
-
-            return _render_md(text)
-        except Exception:
-            wiki_config = load_config("wiki")
-            extensions = wiki_config.get("markdown_extensions", [])
-            return md.markdown(text, extensions=extensions)
-
-    def _slug_to_filename(self, slug: str) -> str:
-        raw_parts = PurePosixPath(str(slug or "").strip("/")).parts
-        cleaned: list[str] = []
-        for part in raw_parts:
-            if not part or part in (".", ".."):
-                continue
-            p = _INVALID_FILE_PART.sub("_", part).rstrip(" .")
-            if p:
-                cleaned.append(p)
-        if not cleaned:
-            cleaned = ["untitled"]
-        return "/".join(cleaned) + ".html"
-
-    def _normalize_image_rel(self, raw: str) -> PurePosixPath | None:
-        decoded = unquote(raw or "")
-        path = PurePosixPath(decoded.lstrip("/"))
-        if not path.parts or ".." in path.parts:
-            return None
-        return path
-
-    def _image_data_uri(self, images_dir: Path, rel: PurePosixPath) -> str | None:
-        src = images_dir.joinpath(*rel.parts)
-        if not src.exists() or not src.is_file():
-            return None
-        try:
-            binary = src.read_bytes()
-        except OSError:
-            return None
-        mime, _ = mimetypes.guess_type(src.name)
-        if not mime:
-            mime = "application/octet-stream"
-        b64 = base64.b64encode(binary).decode("ascii")
-        return f"data:{mime};base64,{b64}"
-
-    def _rewrite_html_links(
-        self,
-        raw_html: str,
-        current_slug: str,
-        slug_map: dict[str, str],
-        images_dir: Path,
-    ) -> str:
-        current_rel = PurePosixPath(slug_map.get(current_slug, ""))
-        current_parent = str(current_rel.parent).strip(".")
-
-        def _replace(match: re.Match) -> str:
-            attr = match.group("attr")
-            url = match.group("url")
-            parsed = urlsplit(url)
-            new_url = url
-
-            if attr == "src" and parsed.path.startswith("/data/images/"):
-                rel = self._normalize_image_rel(parsed.path[len("/data/images/") :])
-                if rel is not None:
-                    data_uri = self._image_data_uri(images_dir, rel)
-                    if data_uri:
-                        new_url = data_uri
-            elif attr == "href" and parsed.path.startswith("/pages/"):
-                slug = unquote(parsed.path[len("/pages/") :].strip("/"))
-                target = slug_map.get(slug)
-                if target:
-                    base = current_parent or "."
-                    rel_path = posixpath.relpath(target, base)
-                    new_url = urlunsplit(("", "", rel_path, parsed.query, parsed.fragment))
-
-            quote_char = match.group(2)
-            return f'{attr}={quote_char}{new_url}{quote_char}'
-
-        return _ATTR_URL_PATTERN.sub(_replace, raw_html)
-
-    def _build_page_html(
-        self,
-        title: str,
-        slug: str,
-        created: str,
-        updated: str,
-        body_html: str,
-        ui_pattern_class: str,
-        style_css: str,
-        pattern_css: str,
-    ) -> str:
-        safe_title = escape(title)
-        safe_slug = escape(slug)
-        safe_created = escape(created or "")
-        safe_updated = escape(updated or "")
-        inline_css = (style_css + "\n" + pattern_css).replace("</style", "<\\/style")
-        return f"""<!DOCTYPE html>
-<html lang="ja">
-<head>
-  <meta charset="UTF-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <title>{safe_title}</title>
-  <style>{inline_css}</style>
-  <style>
-    body {{ margin: 0; padding: 18px 14px 24px; }}
-    .page-view {{ width: min(1180px, calc(100% - 16px)); margin: 0 auto; }}
-    .export-meta {{
-      margin-top: 12px;
-      font-size: 12px;
-      color: var(--text-secondary);
-      display: flex;
-      gap: 14px;
-      flex-wrap: wrap;
-    }}
-  </style>
-</head>
-<body class="ui-pattern ui-pattern-{ui_pattern_class}">
-  <article class="page-view">
-    <div class="page-header">
-      <h1>{safe_title}</h1>
-    </div>
-    <div class="page-body">{body_html}</div>
-    <div class="export-meta">
-      <span>Slug: {safe_slug}</span>
-      <span>作成: {safe_created}</span>
-      <span>更新: {safe_updated}</span>
-    </div>
-  </article>
-  <script>
-    (function () {{
-      document.querySelectorAll(".page-body table").forEach(function (table) {{
-        if (table.parentElement && table.parentElement.classList.contains("page-table-scroll")) return;
-        var wrap = document.createElement("div");
-        wrap.className = "page-table-scroll";
-        table.parentNode.insertBefore(wrap, table);
-        wrap.appendChild(table);
-      }});
-      document.querySelectorAll(".page-body").forEach(function (body) {{
-        var hrs = body.querySelectorAll("hr");
-        var total = hrs.length;
-        if (!total) return;
-        hrs.forEach(function (hr, idx) {{
-          var width;
-          if (total === 1 || idx === total - 1) {{
-            width = 100;
-          }} else {{
-            width = 22 + (78 * idx) / (total - 1);
-          }}
-          hr.style.setProperty("--hr-accent-width", width.toFixed(1) + "%");
-        }});
-      }});
-    }})();
-  </script>
-</body>
-</html>
-"""
-
-    def _build_index_html(
-        self,
-        pages: list,
-        slug_map: dict[str, str],
-        ui_pattern_class: str,
-        style_css: str,
-        pattern_css: str,
-    ) -> str:
-        list_items = []
-        for page in pages:
-            href = f"pages/{slug_map[page.slug]}"
-            list_items.append(
-                f'<li><a href="{href}">{escape(page.title)}</a>'
-                f'<span class="meta">/{escape(page.slug)}</span></li>'
-            )
-        inline_css = (style_css + "\n" + pattern_css).replace("</style", "<\\/style")
-        return f"""<!DOCTYPE html>
-<html lang="ja">
-<head>
-  <meta charset="UTF-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <title>バックアップHTML一覧</title>
-  <style>{inline_css}</style>
-  <style>
-    body {{ margin: 0; padding: 18px 14px 24px; }}
-    .page-view {{ width: min(980px, calc(100% - 16px)); margin: 0 auto; }}
-    .page-list {{ list-style: none; padding: 0; margin: 0; display: grid; gap: 8px; }}
-    .page-list li {{ padding: 8px 10px; border: 1px solid var(--glass-border); border-radius: 8px; background: var(--glass-bg); }}
-    .meta {{ margin-left: 8px; color: var(--text-secondary); font-size: 12px; }}
-  </style>
-</head>
-<body class="ui-pattern ui-pattern-{ui_pattern_class}">
-  <article class="page-view">
-    <div class="page-header"><h1>バックアップHTML一覧</h1></div>
-    <div class="page-body">
-      <ul class="page-list">
-        {"".join(list_items)}
-      </ul>
-    </div>
-  </article>
-</body>
-</html>
-"""
-
     def _export_docs_and_pdf(self, html_dir: Path, docs_dir: Path, pdf_dir: Path) -> None:
         if os.name != "nt":
             self._write_conversion_note(
@@ -479,6 +433,13 @@ class BackupService:
                 $doc = $null
                 try {
                   $doc = $word.Documents.Open($full, $false, $true)
+                  # assets/ を参照する画像はリンクのままにせず文書に取り込む
+                  foreach ($shape in $doc.InlineShapes) {
+                    if ($shape.LinkFormat -ne $null) {
+                      $shape.LinkFormat.SavePictureWithDocument = $true
+                      $shape.LinkFormat.BreakLink()
+                    }
+                  }
                   $doc.SaveAs2([ref] $docxPath, [ref] 16)
                   $doc.ExportAsFixedFormat($pdfPath, 17)
                 } finally {
@@ -498,3 +459,35 @@ class BackupService:
             }
             """
         ).strip() + "\n"
+
+
+def _image_mode() -> str:
+    """wiki.json の backup.images（"assets" なら画像を共有ファイルにする）"""
+    mode = load_config("wiki").get("backup", {}).get("images", "inline")
+    return "assets" if mode == "assets" else "inline"
+
+
+def _sha256(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """一時ファイルに書いてから置き換える（途中状態のファイルを残さない）"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _write_if_changed(path: Path, text: str) -> None:
+    data = text.encode("utf-8")
+    try:
+        if path.read_bytes() == data:
+            return
+    except OSError:
+        pass
+    _write_atomic(path, data)
@@ -0,0 +1,460 @@
+"""HTML エクスポート / 最新版バックアップ共通の描画エンジン
+
+ページの Markdown 変換は CPU を使うため、wiki.json の render_pool.workers に応じて
+プロセスプールで並列に行い、結果はページ順に返す。変換結果はページ閲覧と同じ
+レンダリングキャッシュに入れ、次回以降は再変換しない。
+出力は (パス, 内容) の列で、ZIP（stream_zip）にもディレクトリにも書き出せる。
+"""
+import base64
+import mimetypes
+import multiprocessing
+import os
+import posixpath
+import re
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from html import escape
+from pathlib import Path, PurePosixPath
+from typing import Iterable, Iterator
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+from src.common.config import load_config
+from src.common.logger import get_logger
+from src.common.paths import get_data_dir, get_web_dir
+from src.wiki_app.services.image_store import get_image_store
+from src.wiki_app.services.markdown_renderer import render_markdown
+from src.wiki_app.services.render_cache import get_render_cache
+
+logger = get_logger("wiki")
+
+DEFAULT_MIN_PAGES = 8
+_DEFAULT_UI_PATTERN = "latte_notebook"
+_UI_PATTERN_CSS: dict[str, str] = {
+    "latte_notebook": "pattern-latte-notebook.css",
+    "city_pop_guide": "pattern-city-pop-guide.css",
+    "midnight_console": "pattern-midnight-console.css",
+    "robotic_slate": "pattern-robotic-slate.css",
+}
+_ATTR_URL_PATTERN = re.compile(r'(?P<attr>href|src)=("|\')(?P<url>[^"\']+)("|\')')
+_INVALID_FILE_PART = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+# 画面表示用の縮小版（/data/images/...?w=）はバンドルに含めないため外す
+_SRCSET_ATTR_PATTERN = re.compile(r'\s(?:srcset|sizes)="[^"]*"')
+
+
+@dataclass
+class RenderedPage:
+    """1ページ分の描画結果と、描画時に参照したリンク先・画像"""
+    page: object
+    html_rel: str
+    html: str
+    links: dict[str, str | None] = field(default_factory=dict)
+    images: dict[str, list[int] | None] = field(default_factory=dict)
+    # 共有ファイル名 -> data/images からの相対パス
+    assets: dict[str, str] = field(default_factory=dict)
+
+
+class ExportEngine:
+    """ページ一覧を HTML バンドル（pages/・assets/・index.html）に変換する
+
+    image_mode が "assets" なら画像を assets/<ハッシュ>.<拡張子> として共有し、
+    "inline" なら各ページに data URI で埋め込む。
+    """
+
+    def __init__(
+        self,
+        pages: list,
+        image_mode: str = "inline",
+        index_title: str = "ページHTMLエクスポート",
+        index_heading: str = "HTML エクスポート一覧",
+    ):
+        self.pages = pages
+        self.slug_map = {page.slug: slug_to_filename(page.slug) for page in pages}
+        self.ui_pattern_class, self.style_css, self.pattern_css = resolve_style_context()
+        self.images_dir = get_data_dir() / "images"
+        self.image_mode = "assets" if image_mode == "assets" else "inline"
+        self._index_title = index_title
+        self._index_heading = index_heading
+
+    def render_pages(self, pages: list | None = None) -> Iterator[RenderedPage]:
+        """pages（省略時は全ページ）を順に描画する"""
+        pages = self.pages if pages is None else pages
+        bodies = render_bodies([page.body for page in pages])
+        for page, raw_html in zip(pages, bodies):
+            rendered = RenderedPage(page=page, html_rel=self.slug_map[page.slug], html="")
+            body_html = self.rewrite_links(raw_html, page.slug, rendered)
+            rendered.html = build_page_html(
+                title=page.title,
+                slug=page.slug,
+                created=page.created,
+                updated=page.updated,
+                body_html=body_html,
+                ui_pattern_class=self.ui_pattern_class,
+                style_css=self.style_css,
+                pattern_css=self.pattern_css,
+            )
+            yield rendered
+
+    def index_html(self) -> str:
+        return build_index_html(
+            pages=self.pages,
+            slug_map=self.slug_map,
+            ui_pattern_class=self.ui_pattern_class,
+            style_css=self.style_css,
+            pattern_css=self.pattern_css,
+            title=self._index_title,
+            heading=self._index_heading,
+        )
+
+    def iter_entries(self) -> Iterator[tuple[str, str | Path]]:
+        """バンドルの (パス, 内容) を順に返す。画像は最初に参照された直後に1回だけ返す"""
+        written: set[str] = set()
+        for rendered in self.render_pages():
+            yield f"pages/{rendered.html_rel}", rendered.html
+            for name, rel in rendered.assets.items():
+                if name not in written:
+                    written.add(name)
+                    yield f"assets/{name}", self.images_dir.joinpath(*PurePosixPath(rel).parts)
+        yield "index.html", self.index_html()
+
+    def rewrite_links(self, raw_html: str, current_slug: str, deps: RenderedPage) -> str:
+        """ページ間リンクと画像をバンドル内の相対パスに書き換え、参照先を deps に記録する"""
+        current_parent = str(PurePosixPath(self.slug_map.get(current_slug, "")).parent).strip(".")
+        page_dir = posixpath.join("pages", current_parent)
+
+        def _replace(match: re.Match) -> str:
+            attr = match.group("attr")
+            url = match.group("url")
+            parsed = urlsplit(url)
+            new_url = url
+
+            if attr == "src" and parsed.path.startswith("/data/images/"):
+                rel = normalize_image_rel(parsed.path[len("/data/images/") :])
+                if rel is not None:
+                    deps.images[str(rel)] = file_stamp(self.images_dir.joinpath(*rel.parts))
+                    if self.image_mode == "inline":
+                        data_uri = image_data_uri(self.images_dir, rel)
+                        if data_uri:
+                            new_url = data_uri
+                    else:
+                        name = get_image_store().asset_name(rel.as_posix())
+                        if name:
+                            deps.assets[name] = rel.as_posix()
+                            rel_path = posixpath.relpath(f"assets/{name}", page_dir)
+                            new_url = urlunsplit(("", "", rel_path, parsed.query, parsed.fragment))
+            elif attr == "href" and parsed.path.startswith("/pages/"):
+                slug = unquote(parsed.path[len("/pages/") :].strip("/"))
+                target = self.slug_map.get(slug)
+                deps.links[slug] = target
+                if target:
+                    rel_path = posixpath.relpath(target, current_parent or ".")
+                    new_url = urlunsplit(("", "", rel_path, parsed.query, parsed.fragment))
+
+            quote_char = match.group(2)
+            return f'{attr}={quote_char}{new_url}{quote_char}'
+
+        return _ATTR_URL_PATTERN.sub(_replace, _SRCSET_ATTR_PATTERN.sub("", raw_html))
+
+
+def write_entries(entries: Iterable[tuple[str, str | bytes | Path]], root: Path) -> None:
+    """iter_entries の出力をディレクトリに書き出す"""
+    for rel, source in entries:
+        target = root.joinpath(*PurePosixPath(rel).parts)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(source, Path):
+            shutil.copy2(source, target)
+        elif isinstance(source, str):
+            target.write_text(source, encoding="utf-8")
+        else:
+            target.write_bytes(source)
+
+
+def resolve_style_context() -> tuple[str, str, str]:
+    """(UI パターンのクラス名, style.css, パターン CSS) を返す"""
+    wiki_config = load_config("wiki")
+    pattern_key = str(wiki_config.get("ui_pattern", _DEFAULT_UI_PATTERN))
+    if pattern_key not in _UI_PATTERN_CSS:
+        pattern_key = _DEFAULT_UI_PATTERN
+    pattern_name = _UI_PATTERN_CSS[pattern_key]
+
+    web_dir = get_web_dir()
+    style_path = web_dir / "static" / "css" / "style.css"
+    pattern_path = web_dir / "static" / "css" / pattern_name
+    style_css = style_path.read_text(encoding="utf-8") if style_path.exists() else ""
+    pattern_css = pattern_path.read_text(encoding="utf-8") if pattern_path.exists() else ""
+    return pattern_key.replace("_", "-"), style_css, pattern_css
+
+
+def slug_to_filename(slug: str) -> str:
+    raw_parts = PurePosixPath(str(slug or "").strip("/")).parts
+    cleaned: list[str] = []
+    for part in raw_parts:
+        if not part or part in (".", ".."):
+            continue
+        p = _INVALID_FILE_PART.sub("_", part).rstrip(" .")
+        if p:
+            cleaned.append(p)
+    if not cleaned:
+        cleaned = ["untitled"]
+    return "/".join(cleaned) + ".html"
+
+
+def normalize_image_rel(raw: str) -> PurePosixPath | None:
+    decoded = unquote(raw or "")
+    path = PurePosixPath(decoded.lstrip("/"))
+    if not path.parts or ".." in path.parts:
+        return None
+    return path
+
+
+def image_data_uri(images_dir: Path, rel: PurePosixPath) -> str | None:
+    src = images_dir.joinpath(*rel.parts)
+    if not src.exists() or not src.is_file():
+        return None
+    try:
+        binary = src.read_bytes()
+    except OSError:
+        return None
+    mime, _ = mimetypes.guess_type(src.name)
+    if not mime:
+        mime = "application/octet-stream"
+    b64 = base64.b64encode(binary).decode("ascii")
+    return f"data:{mime};base64,{b64}"
+
+
+def file_stamp(path: Path) -> list[int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def render_bodies(texts: list[str]) -> Iterator[str]:
+    """本文を順に HTML にする。キャッシュにないものはプロセスプールで変換する"""
+    from src.wiki_app.routes.pages import _render_cache_key  # noqa: PLC0415
+
+    workers, min_pages = _pool_settings()
+    use_pool = workers > 1 and len(texts) >= min_pages
+    window = max(1, workers * 4)
+    cache = get_render_cache()
+    # (キャッシュキー, 本文, 変換済み HTML または Future)
+    pending: deque = deque()
+
+    def _finish(key: str, text: str, result) -> str:
+        if isinstance(result, str):
+            return result
+        try:
+            html = result.result()
+        except Exception as e:
+            # プールが使えなくなった場合などはこのプロセスで変換する
+            logger.warning("並列レンダリング失敗のため直列で変換: %s", e)
+            return _render_inline(text)
+        cache.put(key, html)
+        return html
+
+    for text in texts:
+        key = _render_cache_key(text)
+        result = cache.get(key)
+        if result is None:
+            if use_pool:
+                try:
+                    result = _get_pool(workers).submit(_render_in_worker, text)
+                except Exception as e:
+                    logger.warning("レンダリングプール利用不可: %s", e)
+                    use_pool = False
+            if result is None:
+                result = _render_inline(text)
+        pending.append((key, text, result))
+        while len(pending) >= window:
+            yield _finish(*pending.popleft())
+    while pending:
+        yield _finish(*pending.popleft())
+
+
+def renderer_signature() -> str:
+    """Markdown 変換の設定を表す文字列（本文が同じでもこれが変われば HTML が変わる）"""
+    from src.wiki_app.routes.pages import _renderer_signature  # noqa: PLC0415
+
+    return _renderer_signature()
+
+
+def _render_inline(text: str) -> str:
+    try:
+        # ページ閲覧時と同じレンダラーを優先利用
+        from src.wiki_app.routes.pages import _render_md  # noqa: PLC0415
+
+        return _render_md(text)
+    except Exception:
+        return render_markdown(text)
+
+
+def _render_in_worker(text: str) -> str:
+    """プロセスプール側で実行する（キャッシュへの書き込みは呼び出し元が行う）"""
+    from src.wiki_app.routes.pages import _render_md_uncached  # noqa: PLC0415
+
+    return _render_md_uncached(text)
+
+
+def _pool_settings() -> tuple[int, int]:
+    """wiki.json の render_pool（workers: 0 で CPU 数、1 で直列）"""
+    settings = load_config("wiki").get("render_pool", {})
+    workers = int(settings.get("workers", 1))
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers, int(settings.get("min_pages", DEFAULT_MIN_PAGES))
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """プロセス共通のレンダリングプールを返す（初回の変換時に起動する）"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_workers = workers
+            logger.info("レンダリングプール起動: workers=%d", workers)
+        return _pool
+
+
+def shutdown_render_pool() -> None:
+    """終了時にワーカープロセスを止める"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def build_page_html(
+    title: str,
+    slug: str,
+    created: str,
+    updated: str,
+    body_html: str,
+    ui_pattern_class: str,
+    style_css: str,
+    pattern_css: str,
+) -> str:
+    safe_title = escape(title)
+    safe_slug = escape(slug)
+    safe_created = escape(created or "")
+    safe_updated = escape(updated or "")
+    inline_css = (style_css + "\n" + pattern_css).replace("</style", "<\\/style")
+    return f"""<!DOCTYPE html>
+<html lang="ja">
+<head>
+  <meta charset="UTF-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>{safe_title}</title>
+  <style>{inline_css}</style>
+  <style>
+    body {{ margin: 0; padding: 18px 14px 24px; }}
+    .page-view {{ width: min(1180px, calc(100% - 16px)); margin: 0 auto; }}
+    .export-meta {{
+      margin-top: 12px;
+      font-size: 12px;
+      color: var(--text-secondary);
+      display: flex;
+      gap: 14px;
+      flex-wrap: wrap;
+    }}
+  </style>
+</head>
+<body class="ui-pattern ui-pattern-{ui_pattern_class}">
+  <article class="page-view">
+    <div class="page-header">
+      <h1>{safe_title}</h1>
+    </div>
+    <div class="page-body">{body_html}</div>
+    <div class="export-meta">
+      <span>Slug: {safe_slug}</span>
+      <span>作成: {safe_created}</span>
+      <span>更新: {safe_updated}</span>
+    </div>
+  </article>
+  <script>
+    (function () {{
+      document.querySelectorAll(".page-body table").forEach(function (table) {{
+        if (table.parentElement && table.parentElement.classList.contains("page-table-scroll")) return;
+        var wrap = document.createElement("div");
+        wrap.className = "page-table-scroll";
+        table.parentNode.insertBefore(wrap, table);
+        wrap.appendChild(table);
+      }});
+      document.querySelectorAll(".page-body").forEach(function (body) {{
+        var hrs = body.querySelectorAll("hr");
+        var total = hrs.length;
+        if (!total) return;
+        hrs.forEach(function (hr, idx) {{
+          var width;
+          if (total === 1 || idx === total - 1) {{
+            width = 100;
+          }} else {{
+            width = 22 + (78 * idx) / (total - 1);
+          }}
+          hr.style.setProperty("--hr-accent-width", width.toFixed(1) + "%");
+        }});
+      }});
+    }})();
+  </script>
+</body>
+</html>
+"""
+
+
+def build_index_html(
+    pages: list,
+    slug_map: dict[str, str],
+    ui_pattern_class: str,
+    style_css: str,
+    pattern_css: str,
+    title: str = "ページHTMLエクスポート",
+    heading: str = "HTML エクスポート一覧",
+) -> str:
+    list_items = []
+    for page in pages:
+        href = f"pages/{slug_map[page.slug]}"
+        list_items.append(
+            f'<li><a href="{href}">{escape(page.title)}</a>'
+            f'<span class="meta">/{escape(page.slug)}</span></li>'
+        )
+
+    inline_css = (style_css + "\n" + pattern_css).replace("</style", "<\\/style")
+    return f"""<!DOCTYPE html>
+<html lang="ja">
+<head>
+  <meta charset="UTF-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>{escape(title)}</title>
+  <style>{inline_css}</style>
+  <style>
+    body {{ margin: 0; padding: 18px 14px 24px; }}
+    .page-view {{ width: min(980px, calc(100% - 16px)); margin: 0 auto; }}
+    .page-list {{ list-style: none; padding: 0; margin: 0; display: grid; gap: 8px; }}
+    .page-list li {{ padding: 8px 10px; border: 1px solid var(--glass-border); border-radius: 8px; background: var(--glass-bg); }}
+    .meta {{ margin-left: 8px; color: var(--text-secondary); font-size: 12px; }}
+  </style>
+</head>
+<body class="ui-pattern ui-pattern-{ui_pattern_class}">
+  <article class="page-view">
+    <div class="page-header"><h1>{escape(heading)}</h1></div>
+    <div class="page-body">
+      <ul class="page-list">
+        {"".join(list_items)}
+      </ul>
+    </div>
+  </article>
+</body>
+</html>
+"""
@@ -0,0 +1,157 @@
+"""data/images の内容アドレス管理
+
+アップロード画像は内容の SHA-256 から名前を付けて保存し、同じ内容が既にあれば
+保存せずに既存のファイルを返す。エクスポートやバックアップでは、画像を
+assets/<ハッシュ>.<拡張子> として1回だけ書き出し、各ページから参照する。
+ハッシュは state/images/index.json に (更新日時, サイズ) と一緒に保存し、
+変わったファイルだけ計算し直す。
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from src.common.logger import get_logger
+from src.common.paths import get_data_dir, get_state_dir
+
+logger = get_logger("wiki")
+
+_HASH_LENGTH = 16
+_READ_SIZE = 64 * 1024
+
+
+class ImageStore:
+    """画像ファイル名 ⇔ 内容ハッシュ の対応を保持する"""
+
+    def __init__(self, images_dir: Path | None = None, index_path: Path | None = None):
+        self._images_dir = images_dir or get_data_dir() / "images"
+        self._index_path = index_path or get_state_dir() / "images" / "index.json"
+        self._lock = threading.Lock()
+        # ファイル名 -> [st_mtime_ns, st_size, sha256]
+        self._entries: dict[str, list] | None = None
+
+    @property
+    def images_dir(self) -> Path:
+        return self._images_dir
+
+    def save(self, data: bytes, ext: str) -> str:
+        """画像を保存してファイル名を返す。同じ内容があればそのファイル名を返す"""
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._refresh()
+            for name, entry in self._entries.items():
+                if entry[2] == digest and (self._images_dir / name).exists():
+                    return name
+            filename = f"{digest[:_HASH_LENGTH]}{ext}"
+            path = self._images_dir / filename
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{filename}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            st = path.stat()
+            self._entries[filename] = [st.st_mtime_ns, st.st_size, digest]
+            self._save_index()
+        return filename
+
+    def content_hash(self, filename: str) -> str | None:
+        """data/images 内のファイルの内容ハッシュを返す（なければ None）"""
+        path = self._images_dir / filename
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        if not path.is_file():
+            return None
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(filename)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                return entry[2]
+        digest = _hash_file(path)
+        if digest is None:
+            return None
+        with self._lock:
+            self._entries[filename] = [st.st_mtime_ns, st.st_size, digest]
+            self._save_index()
+        return digest
+
+    def asset_name(self, filename: str) -> str | None:
+        """エクスポート用の共有ファイル名（<ハッシュ>.<拡張子>）を返す"""
+        digest = self.content_hash(filename)
+        if digest is None:
+            return None
+        ext = os.path.splitext(filename)[1].lower()
+        return f"{digest[:_HASH_LENGTH]}{ext}"
+
+    def _load(self) -> dict[str, list]:
+        """ロック取得中に呼ぶ"""
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self._entries = data
+            except (OSError, json.JSONDecodeError):
+                pass
+        return self._entries
+
+    def _refresh(self) -> None:
+        """ロック取得中に呼ぶ。data/images を走査して変わったファイルを計算し直す"""
+        entries = self._load()
+        seen: set[str] = set()
+        changed = False
+        if self._images_dir.exists():
+            for path in self._images_dir.rglob("*"):
+                if not path.is_file() or path.name.startswith("."):
+                    continue
+                name = path.relative_to(self._images_dir).as_posix()
+                seen.add(name)
+                st = path.stat()
+                entry = entries.get(name)
+                if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                    continue
+                digest = _hash_file(path)
+                if digest is not None:
+                    entries[name] = [st.st_mtime_ns, st.st_size, digest]
+                    changed = True
+        for name in [n for n in entries if n not in seen]:
+            del entries[name]
+            changed = True
+        if changed:
+            self._save_index()
+
+    def _save_index(self) -> None:
+        """ロック取得中に呼ぶ"""
+        tmp_path = self._index_path.with_name(f"{self._index_path.name}.tmp")
+        try:
+            self._index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(self._entries, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self._index_path)
+        except OSError as e:
+            logger.warning("画像インデックス保存失敗: %s", e)
+
+
+def _hash_file(path: Path) -> str | None:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_READ_SIZE), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+_shared_store: ImageStore | None = None
+_shared_lock = threading.Lock()
+
+
+def get_image_store() -> ImageStore:
+    """プロセス共通の画像ストアを返す（wiki/admin で共有）。"""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = ImageStore()
+        return _shared_store
@@ -0,0 +1,173 @@
+"""画像の縮小版（幅ごとのバリエーション）の生成とキャッシュ
+
+wiki.json の images.variant_widths に並べた幅ごとに縮小版を作り、
+state/images/variants/<内容ハッシュ>-w<幅>.<拡張子> に保存する。
+アップロード時に裏で作り始め、まだなければ最初の要求時に作る。
+Pillow が入っていない環境や対象外の形式（GIF/SVG など）は元画像のまま扱う。
+"""
+import os
+import threading
+from pathlib import Path
+
+from src.common.config import load_config
+from src.common.logger import get_logger
+from src.common.paths import get_state_dir
+from src.wiki_app.services.image_store import get_image_store
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+logger = get_logger("wiki")
+
+DEFAULT_JPEG_QUALITY = 82
+# 縮小版を作る形式（アニメーション GIF や SVG はそのまま配信する）
+_RESIZABLE_EXTS = {".png", ".jpg", ".jpeg", ".webp"}
+# EXIF の向きが 90 度回転のもの（幅と高さが入れ替わる）
+_ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+class ImageVariants:
+    """data/images の画像から幅ごとの縮小版を作って返す"""
+
+    def __init__(self, cache_dir: Path | None = None):
+        self._cache_dir = cache_dir or get_state_dir() / "images" / "variants"
+        self._lock = threading.Lock()
+        self._building: dict[str, threading.Lock] = {}
+        # 内容ハッシュ -> 元画像の幅
+        self._widths: dict[str, int] = {}
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def widths(self) -> list[int]:
+        settings = load_config("wiki").get("images", {})
+        return sorted({int(w) for w in settings.get("variant_widths", []) if int(w) > 0})
+
+    def signature(self) -> str:
+        """縮小版の設定を表す文字列（レンダリングキャッシュのキーに含める）"""
+        if not self.available:
+            return "none"
+        return ",".join(str(w) for w in self.widths())
+
+    def variant_path(self, filename: str, width: int) -> Path | None:
+        """幅 width 以下に収まる縮小版のパスを返す。元画像で足りる場合は None"""
+        candidates = [w for w in self.widths() if w >= width]
+        if not candidates or not self._resizable(filename):
+            return None
+        target = candidates[0]
+        store = get_image_store()
+        digest = store.content_hash(filename)
+        source_width = self.source_width(filename)
+        if digest is None or source_width is None or source_width <= target:
+            return None
+        ext = os.path.splitext(filename)[1].lower()
+        path = self._cache_dir / f"{digest[:16]}-w{target}{ext}"
+        if path.exists():
+            return path
+        return self._build(store.images_dir / filename, path, target)
+
+    def source_width(self, filename: str) -> int | None:
+        """元画像の表示上の幅（EXIF の向きを反映）を返す"""
+        if not self._resizable(filename):
+            return None
+        store = get_image_store()
+        digest = store.content_hash(filename)
+        if digest is None:
+            return None
+        with self._lock:
+            width = self._widths.get(digest)
+        if width is not None:
+            return width
+        try:
+            with Image.open(store.images_dir / filename) as img:
+                width, height = img.size
+                if img.getexif().get(0x0112) in _ROTATED_ORIENTATIONS:
+                    width = height
+        except Exception as e:
+            logger.warning("画像サイズ取得失敗: %s (%s)", filename, e)
+            return None
+        with self._lock:
+            self._widths[digest] = width
+        return width
+
+    def srcset(self, filename: str, url: str) -> str | None:
+        """<img srcset> の値を返す。縮小版を使わない画像は None"""
+        source_width = self.source_width(filename)
+        if source_width is None:
+            return None
+        widths = [w for w in self.widths() if w < source_width]
+        if not widths:
+            return None
+        items = [f"{url}?w={w} {w}w" for w in widths]
+        items.append(f"{url} {source_width}w")
+        return ", ".join(items)
+
+    def warm(self, filename: str) -> None:
+        """アップロード直後に縮小版を裏で作っておく"""
+        if not self._resizable(filename):
+            return
+
+        def _run():
+            for width in self.widths():
+                self.variant_path(filename, width)
+
+        threading.Thread(target=_run, daemon=True, name="image-variants").start()
+
+    def _resizable(self, filename: str) -> bool:
+        ext = os.path.splitext(filename)[1].lower()
+        return self.available and ext in _RESIZABLE_EXTS
+
+    def _build(self, source: Path, path: Path, width: int) -> Path | None:
+        # 同じ縮小版を同時に作らない（後から来た要求は出来上がりを待つ）
+        with self._lock:
+            build_lock = self._building.setdefault(path.name, threading.Lock())
+        with build_lock:
+            if path.exists():
+                return path
+            tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+            try:
+                with Image.open(source) as img:
+                    img = ImageOps.exif_transpose(img)
+                    img.thumbnail((width, img.height), Image.LANCZOS)
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    self._save(img, tmp_path, path.suffix.lower())
+                os.replace(tmp_path, path)
+            except Exception as e:
+                logger.warning("縮小版作成失敗: %s (%s)", source.name, e)
+                try:
+                    tmp_path.unlink()
+                except OSError:
+                    pass
+                return None
+            finally:
+                with self._lock:
+                    self._building.pop(path.name, None)
+        return path
+
+    def _save(self, img, path: Path, ext: str) -> None:
+        quality = int(load_config("wiki").get("images", {}).get("jpeg_quality", DEFAULT_JPEG_QUALITY))
+        if ext in (".jpg", ".jpeg"):
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            img.save(path, "JPEG", quality=quality, optimize=True, progressive=True)
+        elif ext == ".webp":
+            img.save(path, "WEBP", quality=quality)
+        else:
+            img.save(path, "PNG", optimize=True)
+
+
+_shared_variants: ImageVariants | None = None
+_shared_lock = threading.Lock()
+
+
+def get_image_variants() -> ImageVariants:
+    """プロセス共通の縮小版キャッシュを返す（wiki/admin で共有）。"""
+    global _shared_variants
+    with _shared_lock:
+        if _shared_variants is None:
+            _shared_variants = ImageVariants()
+        return _shared_variants
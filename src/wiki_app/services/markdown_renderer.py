@@ -0,0 +1,65 @@
+import threading
+
+import markdown as md
+
+from src.common.config import load_config, subscribe_config
+
+_lock = threading.Lock()
+_extensions: list[str] | None = None
+_local = threading.local()
+
+
+def render_markdown(text: str) -> str:
+    """Markdown を HTML に変換する。
+
+    md.markdown() は呼び出しごとに Markdown インスタンスを作り拡張を読み込み直すため、
+    スレッドごとに設定済みインスタンスを1つ保持し、reset() して使い回す。
+    拡張の設定が変わったらインスタンスを作り直す。
+    """
+    extensions = get_markdown_extensions()
+    if getattr(_local, "busy", False):
+        # 変換中の再入（拡張からの呼び出しなど）は使い捨てインスタンスで処理する
+        return md.markdown(text, extensions=extensions)
+
+    renderer = getattr(_local, "renderer", None)
+    if renderer is None or _local.extensions != extensions:
+        renderer = md.Markdown(extensions=extensions)
+        _local.renderer = renderer
+        _local.extensions = extensions
+
+    _local.busy = True
+    try:
+        renderer.reset()
+        return renderer.convert(text)
+    finally:
+        _local.busy = False
+
+
+def get_markdown_extensions() -> list[str]:
+    """wiki.json の markdown_extensions を返す。
+
+    初回のみファイルを読み、以降は設定変更の通知で差し替える。
+    """
+    global _extensions
+    with _lock:
+        if _extensions is not None:
+            return list(_extensions)
+    extensions = _read_extensions(load_config("wiki"))
+    with _lock:
+        if _extensions is None:
+            _extensions = extensions
+            subscribe_config("wiki", _on_wiki_config_changed)
+        return list(_extensions)
+
+
+def _on_wiki_config_changed(config: dict) -> None:
+    global _extensions
+    with _lock:
+        _extensions = _read_extensions(config)
+
+
+def _read_extensions(config: dict) -> list[str]:
+    extensions = config.get("markdown_extensions", [])
+    if not isinstance(extensions, list):
+        return []
+    return [str(e) for e in extensions]
@@ -0,0 +1,137 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.common.paths import get_data_dir
+from src.wiki_app.models.page import Page
+
+
+@dataclass
+class CatalogEntry:
+    slug: str
+    title: str
+    created: str
+    updated: str
+    body: str
+    body_hash: str
+    size: int
+    mtime_ns: int
+
+    def to_page(self) -> Page:
+        return Page(
+            slug=self.slug,
+            title=self.title,
+            body=self.body,
+            created=self.created,
+            updated=self.updated,
+        )
+
+
+class PageCatalog:
+    """data/pages のメタ情報をメモリに保持し、stat が変わったファイルだけ再読込する。"""
+
+    def __init__(self, pages_dir: Path | None = None):
+        self._pages_dir = pages_dir or get_data_dir() / "pages"
+        self._lock = threading.Lock()
+        self._entries: dict[str, CatalogEntry] = {}
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """内容が変わるたびに増える世代番号"""
+        with self._lock:
+            return self._version
+
+    def entries(self) -> list[CatalogEntry]:
+        """ディレクトリを stat 走査して最新化した全エントリを返す。"""
+        self.refresh()
+        with self._lock:
+            return list(self._entries.values())
+
+    def count(self) -> int:
+        self.refresh()
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, slug: str) -> CatalogEntry | None:
+        """1ページ分のエントリを返す。ファイルが変わっていれば再読込する。"""
+        md_file = self._pages_dir / f"{slug}.md"
+        try:
+            stat = md_file.stat()
+        except OSError:
+            with self._lock:
+                if self._entries.pop(slug, None):
+                    self._version += 1
+            return None
+        with self._lock:
+            entry = self._entries.get(slug)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                return entry
+        return self._load_entry(slug, md_file, stat)
+
+    def refresh(self) -> None:
+        seen: set[str] = set()
+        stale: list[tuple[str, Path, object]] = []
+        for md_file in self._pages_dir.rglob("*.md"):
+            slug = "/".join(md_file.relative_to(self._pages_dir).with_suffix("").parts)
+            try:
+                stat = md_file.stat()
+            except OSError:
+                continue
+            seen.add(slug)
+            with self._lock:
+                entry = self._entries.get(slug)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                continue
+            stale.append((slug, md_file, stat))
+
+        for slug, md_file, stat in stale:
+            self._load_entry(slug, md_file, stat)
+
+        with self._lock:
+            removed = [slug for slug in self._entries if slug not in seen]
+            for slug in removed:
+                del self._entries[slug]
+            if removed:
+                self._version += 1
+
+    def invalidate(self, slug: str) -> None:
+        """書き込み直後など、次回アクセス時に必ず再読込させる。"""
+        with self._lock:
+            if self._entries.pop(slug, None):
+                self._version += 1
+
+    def _load_entry(self, slug: str, md_file: Path, stat) -> CatalogEntry | None:
+        try:
+            text = md_file.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        page = Page.from_markdown(slug, text)
+        entry = CatalogEntry(
+            slug=slug,
+            title=page.title,
+            created=page.created,
+            updated=page.updated,
+            body=page.body,
+            body_hash=hashlib.sha256(page.body.encode("utf-8")).hexdigest(),
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+        )
+        with self._lock:
+            self._entries[slug] = entry
+            self._version += 1
+        return entry
+
+
+_shared_catalog: PageCatalog | None = None
+_shared_lock = threading.Lock()
+
+
+def get_page_catalog() -> PageCatalog:
+    """プロセス共通のページカタログを返す（wiki/admin で共有）。"""
+    global _shared_catalog
+    with _shared_lock:
+        if _shared_catalog is None:
+            _shared_catalog = PageCatalog()
+        return _shared_catalog
@@ -2,6 +2,7 @@ import json
 import re
 import shutil
 from pathlib import Path
+from typing import Iterator
 from datetime import datetime
 from uuid import uuid4
 
@@ -9,7 +10,9 @@ from src.common.paths import get_data_dir
 from src.common.logger import get_logger
 from src.wiki_app.models.page import Page
 from src.wiki_app.services.backup_service import BackupService
+from src.wiki_app.services.page_catalog import get_page_catalog
 from src.wiki_app.services.repo_service import RepoService
+from src.wiki_app.services.search_index import get_search_index
 
 logger = get_logger("wiki")
 
@@ -26,6 +29,8 @@ class PageService:
         self._trash_index_file = get_data_dir() / "trash" / "trash_index.json"
         self._page_order_file = get_data_dir() / "page_order.json"
         self._backup = BackupService(self)
+        self._catalog = get_page_catalog()
+        self._search_index = get_search_index()
         try:
             if self._page_order_file.exists():
                 self._sync_page_order()
@@ -35,6 +40,20 @@ class PageService:
     def _refresh_backup(self) -> None:
         self._backup.schedule_refresh()
 
+    def _page_changed(self, slug: str) -> None:
+        self._catalog.invalidate(slug)
+        try:
+            self._search_index.update_page(slug)
+        except Exception:
+            logger.exception("検索インデックス更新に失敗: %s", slug)
+
+    def _page_removed(self, slug: str) -> None:
+        self._catalog.invalidate(slug)
+        try:
+            self._search_index.remove_page(slug)
+        except Exception:
+            logger.exception("検索インデックス削除に失敗: %s", slug)
+
     def _slug_from_path(self, md_file: Path) -> str:
         """mdファイルパスから階層slugを算出する（例: 日勤/手順書）"""
         rel = md_file.relative_to(self._pages_dir)
@@ -48,23 +67,21 @@ class PageService:
 
     def list_pages(self) -> list[Page]:
         """全ページを一覧で返す（更新日降順）"""
-        pages = []
-        for md_file in self._pages_dir.rglob("*.md"):
-            slug = self._slug_from_path(md_file)
-            text = md_file.read_text(encoding="utf-8")
-            page = Page.from_markdown(slug, text)
-            pages.append(page)
+        pages = [entry.to_page() for entry in self._catalog.entries()]
         pages.sort(key=lambda p: p.updated or p.created, reverse=True)
         return pages
 
+    def count_pages(self) -> int:
+        """ページ数を返す（本文は読まない）"""
+        return self._catalog.count()
+
     def get_page(self, slug: str) -> Page | None:
         """スラッグでページを取得する"""
         slug = self._normalize_path(slug)
-        md_file = self._pages_dir / f"{slug}.md"
-        if not md_file.exists():
+        if not slug:
             return None
-        text = md_file.read_text(encoding="utf-8")
-        return Page.from_markdown(slug, text)
+        entry = self._catalog.get(slug)
+        return entry.to_page() if entry else None
 
     def create_page(self, slug: str, title: str, body: str, run_backup: bool = True) -> Page:
         """ページを新規作成する"""
@@ -87,6 +104,7 @@ class PageService:
             md_text.encode("utf-8"),
             f"Create: {title}",
         )
+        self._page_changed(slug)
         self._sync_page_order()
         if run_backup:
             self._refresh_backup()
@@ -116,6 +134,7 @@ class PageService:
             md_text.encode("utf-8"),
             f"Edit: {title}",
         )
+        self._page_changed(slug)
         if run_backup:
             self._refresh_backup()
         logger.info("ページ更新: %s (%s)", slug, title)
@@ -185,6 +204,7 @@ class PageService:
         trash_file.write_text(text, encoding="utf-8")
         md_file.unlink()
         self._cleanup_empty_dirs(md_file.parent)
+        self._page_removed(slug)
 
         items = self._load_trash_index()
         items.append(
@@ -258,6 +278,7 @@ class PageService:
         target_file = self._pages_dir / f"{target_slug}.md"
         target_file.parent.mkdir(parents=True, exist_ok=True)
         target_file.write_text(text, encoding="utf-8")
+        self._page_changed(target_slug)
 
         # ゴミ箱から除去
         trash_file = self._trash_pages_dir / meta.get("file", "")
@@ -412,6 +433,37 @@ class PageService:
             return None
         return self.move_page(slug, new_slug, run_backup=True)
 
+    def iter_pages_in_tree_order(self) -> Iterator[Page]:
+        """ページ階層（並び順を反映）の順にページを1件ずつ返す"""
+
+        def walk(node: dict) -> Iterator[Page]:
+            for item in node.get("items", []):
+                if item.get("type") == "page":
+                    page = self.get_page(item.get("slug", ""))
+                    if page:
+                        yield page
+                elif item.get("type") == "dir":
+                    child = node.get("children", {}).get(item.get("name"))
+                    if child:
+                        yield from walk(child)
+
+        return walk(self.get_tree())
+
+    def tree_version(self) -> list:
+        """ページ階層の版（カタログの世代・ディレクトリ構成・page_order.json）を返す"""
+        self._catalog.refresh()
+        dirs = sorted(
+            "/".join(p.relative_to(self._pages_dir).parts)
+            for p in self._pages_dir.rglob("*")
+            if p.is_dir()
+        )
+        try:
+            stat = self._page_order_file.stat()
+            order = [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            order = None
+        return [self._catalog.version, dirs, order]
+
     def get_tree(self) -> dict:
         """ページ階層をネストdictで返す（API用）。"""
         fs_tree = self._build_fs_tree()
@@ -444,10 +496,8 @@ class PageService:
                 if part not in node["children"]:
                     node["children"][part] = {"name": part, "children": {}, "pages": []}
                 node = node["children"][part]
-        for md_file in self._pages_dir.rglob("*.md"):
-            slug = self._slug_from_path(md_file)
-            text = md_file.read_text(encoding="utf-8")
-            page = Page.from_markdown(slug, text)
+        for entry in sorted(self._catalog.entries(), key=lambda e: e.slug):
+            slug = entry.slug
             parts = slug.split("/")
 
             node = tree
@@ -455,7 +505,7 @@ class PageService:
                 if part not in node["children"]:
                     node["children"][part] = {"name": part, "children": {}, "pages": []}
                 node = node["children"][part]
-            node["pages"].append({"slug": slug, "title": page.title})
+            node["pages"].append({"slug": slug, "title": entry.title})
         return tree
 
     def _sanitize_str_list(self, values) -> list[str]:
@@ -945,6 +995,8 @@ class PageService:
         new_file.write_text(md_text, encoding="utf-8")
         old_file.unlink()
         self._cleanup_empty_dirs(old_file.parent)
+        self._page_removed(old_slug)
+        self._page_changed(target_slug)
 
         try:
             self._repo.delete(
@@ -1090,6 +1142,7 @@ class PageService:
                 tag = f'<comment id="{thread_id}">{selected_text}</comment>'
                 new_content = content[:start] + tag + content[end:]
                 md_file.write_text(new_content, encoding="utf-8")
+                self._page_changed(slug)
                 return True
 
         # フォールバック: 単純な文字列置換（最初の出現）
@@ -1097,6 +1150,7 @@ class PageService:
             tag = f'<comment id="{thread_id}">{selected_text}</comment>'
             new_content = content.replace(selected_text, tag, 1)
             md_file.write_text(new_content, encoding="utf-8")
+            self._page_changed(slug)
             return True
 
         return False
@@ -1115,6 +1169,7 @@ class PageService:
         if count == 0:
             return False
         md_file.write_text(new_content, encoding="utf-8")
+        self._page_changed(slug)
         return True
 
     def list_directories(self) -> list[str]:
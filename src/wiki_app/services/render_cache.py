@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from src.common.logger import get_logger
+from src.common.paths import get_state_dir
+
+logger = get_logger("wiki")
+
+
+class RenderCache:
+    """Markdown→HTML 変換結果のキャッシュ（メモリ LRU + state/render_cache）。
+
+    キーは本文の SHA-256・Markdown 拡張の一覧・レンダラーのバージョンから作るため、
+    本文や設定が変われば自然に別キーになる（明示的な無効化は不要）。
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        max_entries: int = 512,
+        max_disk_entries: int = 5000,
+    ):
+        self._cache_dir = cache_dir or get_state_dir() / "render_cache"
+        self._max_entries = max_entries
+        self._max_disk_entries = max_disk_entries
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._disk_writes = 0
+
+    @staticmethod
+    def make_key(body: str, extensions: list[str], renderer_version: int | str) -> str:
+        body_sha = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        raw = json.dumps([body_sha, list(extensions), str(renderer_version)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            html = self._memory.get(key)
+            if html is not None:
+                self._memory.move_to_end(key)
+                return html
+        path = self._disk_path(key)
+        try:
+            html = path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        self._remember(key, html)
+        return html
+
+    def put(self, key: str, html: str) -> None:
+        self._remember(key, html)
+        path = self._disk_path(key)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(html, encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("レンダリングキャッシュ書き込み失敗: %s", e)
+            return
+        with self._lock:
+            self._disk_writes += 1
+            should_prune = self._disk_writes % 200 == 0
+        if should_prune:
+            self._prune_disk()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if not self._cache_dir.exists():
+            return
+        for path in self._cache_dir.rglob("*.html"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _remember(self, key: str, html: str) -> None:
+        with self._lock:
+            self._memory[key] = html
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self._cache_dir / key[:2] / f"{key}.html"
+
+    def _prune_disk(self) -> None:
+        """ディスク上のエントリが上限を超えたら古いものから削除する。"""
+        try:
+            files = [(p.stat().st_mtime, p) for p in self._cache_dir.rglob("*.html")]
+        except OSError:
+            return
+        excess = len(files) - self._max_disk_entries
+        if excess <= 0:
+            return
+        files.sort(key=lambda item: item[0])
+        for _, path in files[:excess]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+_shared_cache: RenderCache | None = None
+_shared_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """プロセス共通のレンダリングキャッシュを返す。"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = RenderCache()
+        return _shared_cache
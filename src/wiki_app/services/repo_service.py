@@ -79,6 +79,13 @@ class RepoService:
         logger.info("コミット: %s - %s", commit_hex, message)
         return commit_hex
 
+    def head_id(self) -> str:
+        """HEAD のコミットIDを返す（コミットがなければ空文字）"""
+        try:
+            return self._repo.head().decode("ascii")
+        except KeyError:
+            return ""
+
     def log_all(self, max_count: int = 30) -> list[dict]:
         """全ファイルのコミット履歴を返す。"""
         results = []
@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+from src.common.logger import get_logger
+from src.common.paths import get_data_dir, get_state_dir
+from src.wiki_app.models.page import Page
+
+logger = get_logger("wiki")
+
+_INDEX_VERSION = 1
+
+
+def tokenize(text: str) -> set[str]:
+    """検索用トークン（文字 uni-gram / bi-gram）を返す。
+
+    日本語は分かち書きされないため、英数字・かな・漢字の連続を1つの塊とみなし、
+    塊の中を1文字・2文字単位で切り出す。部分一致検索の必要条件として使う。
+    """
+    tokens: set[str] = set()
+    for run in _word_runs(text.lower()):
+        tokens.update(run)
+        tokens.update(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def query_tokens(query: str) -> set[str]:
+    """検索語から、ヒット文書が必ず含むトークンを返す。"""
+    tokens: set[str] = set()
+    for run in _word_runs(query.lower()):
+        if len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _word_runs(text: str) -> list[str]:
+    runs: list[str] = []
+    current: list[str] = []
+    for ch in text:
+        if ch.isalnum() or ch in "ー々〆ヶ":
+            current.append(ch)
+        elif current:
+            runs.append("".join(current))
+            current = []
+    if current:
+        runs.append("".join(current))
+    return runs
+
+
+class SearchIndex:
+    """data/pages の転置インデックス。state/search_index.json に永続化する。"""
+
+    def __init__(self, pages_dir: Path | None = None, index_path: Path | None = None):
+        self._pages_dir = pages_dir or get_data_dir() / "pages"
+        self._index_path = index_path or get_state_dir() / "search_index.json"
+        self._lock = threading.RLock()
+        self._docs: dict[str, dict] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._loaded = False
+
+    def candidates(self, query: str) -> list[str] | None:
+        """検索語を含み得るページの slug を返す。絞り込めない場合は None。"""
+        self._ensure_loaded()
+        tokens = query_tokens(query)
+        with self._lock:
+            if not tokens:
+                return None
+            result: set[str] | None = None
+            # 出現文書の少ないトークンから積集合を取る
+            for token in sorted(tokens, key=lambda t: len(self._postings.get(t, ()))):
+                posting = self._postings.get(token)
+                if not posting:
+                    return []
+                result = set(posting) if result is None else result & posting
+                if not result:
+                    return []
+            return sorted(result or [])
+
+    def all_slugs(self) -> list[str]:
+        self._ensure_loaded()
+        with self._lock:
+            return sorted(self._docs)
+
+    def update_page(self, slug: str) -> None:
+        """1ページ分のインデックスを現在のファイル内容で更新する。"""
+        self._ensure_loaded()
+        with self._lock:
+            self._index_file(slug)
+            self._save()
+
+    def remove_page(self, slug: str) -> None:
+        """1ページ分のインデックスを削除する。"""
+        self._ensure_loaded()
+        with self._lock:
+            if self._drop(slug):
+                self._save()
+
+    def rebuild(self) -> None:
+        """インデックスを全ページから作り直す。"""
+        with self._lock:
+            self._docs = {}
+            self._postings = {}
+            for md_file in self._pages_dir.rglob("*.md"):
+                self._index_file(self._slug_from_path(md_file))
+            self._loaded = True
+            self._save()
+        logger.info("検索インデックス再構築: %d件", len(self._docs))
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if not self._load():
+                self.rebuild()
+                return
+            self._loaded = True
+            self._reconcile()
+
+    def _load(self) -> bool:
+        if not self._index_path.exists():
+            return False
+        try:
+            raw = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            logger.warning("検索インデックスの読み込みに失敗、再構築します")
+            return False
+        if not isinstance(raw, dict) or raw.get("version") != _INDEX_VERSION:
+            return False
+        docs = raw.get("docs")
+        if not isinstance(docs, dict):
+            return False
+        self._docs = {}
+        self._postings = {}
+        for slug, doc in docs.items():
+            if isinstance(doc, dict) and isinstance(doc.get("tokens"), list):
+                self._add(slug, doc)
+        return True
+
+    def _reconcile(self) -> None:
+        """アプリ外で編集されたファイルとの差分だけを取り込む。"""
+        changed = False
+        seen: set[str] = set()
+        for md_file in self._pages_dir.rglob("*.md"):
+            slug = self._slug_from_path(md_file)
+            seen.add(slug)
+            doc = self._docs.get(slug)
+            try:
+                stat = md_file.stat()
+            except OSError:
+                continue
+            if doc and doc.get("mtime_ns") == stat.st_mtime_ns and doc.get("size") == stat.st_size:
+                continue
+            self._index_file(slug)
+            changed = True
+        for slug in [s for s in self._docs if s not in seen]:
+            self._drop(slug)
+            changed = True
+        if changed:
+            self._save()
+
+    def _index_file(self, slug: str) -> None:
+        md_file = self._pages_dir / f"{slug}.md"
+        self._drop(slug)
+        try:
+            stat = md_file.stat()
+            text = md_file.read_text(encoding="utf-8")
+        except OSError:
+            return
+        page = Page.from_markdown(slug, text)
+        tokens = tokenize(str(page.title)) | tokenize(page.body)
+        self._add(
+            slug,
+            {
+                "title": str(page.title),
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "tokens": sorted(tokens),
+            },
+        )
+
+    def _add(self, slug: str, doc: dict) -> None:
+        self._docs[slug] = doc
+        for token in doc["tokens"]:
+            self._postings.setdefault(token, set()).add(slug)
+
+    def _drop(self, slug: str) -> bool:
+        doc = self._docs.pop(slug, None)
+        if not doc:
+            return False
+        for token in doc.get("tokens", []):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.discard(slug)
+            if not posting:
+                del self._postings[token]
+        return True
+
+    def _save(self) -> None:
+        self._index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._index_path.with_suffix(".json.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": _INDEX_VERSION, "docs": self._docs},
+                    f,
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                )
+            os.replace(tmp_path, self._index_path)
+        except OSError:
+            logger.exception("検索インデックスの保存に失敗")
+
+    def _slug_from_path(self, md_file: Path) -> str:
+        return "/".join(md_file.relative_to(self._pages_dir).with_suffix("").parts)
+
+
+_shared_index: SearchIndex | None = None
+_shared_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """プロセス共通の検索インデックスを返す（wiki/admin で共有）。"""
+    global _shared_index
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = SearchIndex()
+        return _shared_index
@@ -1,15 +1,18 @@
 import re
 
-import markdown as md
-
-from src.common.config import load_config
-from src.common.paths import get_data_dir
-from src.wiki_app.models.page import Page
+from src.wiki_app.services.markdown_renderer import render_markdown
+from src.wiki_app.services.page_catalog import PageCatalog, get_page_catalog
+from src.wiki_app.services.search_index import SearchIndex, get_search_index
 
 
 class SearchService:
-    def __init__(self):
-        self._pages_dir = get_data_dir() / "pages"
+    def __init__(
+        self,
+        search_index: SearchIndex | None = None,
+        catalog: PageCatalog | None = None,
+    ):
+        self._index = search_index or get_search_index()
+        self._catalog = catalog or get_page_catalog()
 
     def search(self, query: str) -> list[dict]:
         """全文検索を行い、マッチしたページ情報を返す"""
@@ -19,10 +22,15 @@ class SearchService:
         query_lower = query.lower()
         results = []
 
-        for md_file in self._pages_dir.rglob("*.md"):
-            text = md_file.read_text(encoding="utf-8")
-            slug = str(md_file.relative_to(self._pages_dir).with_suffix(""))
-            page = Page.from_markdown(slug, text)
+        # 転置インデックスで候補を絞り込み、候補ページだけ本文を照合する
+        slugs = self._index.candidates(query)
+        if slugs is None:
+            slugs = self._index.all_slugs()
+
+        for slug in slugs:
+            page = self._catalog.get(slug)
+            if page is None:
+                continue
 
             title_match = query_lower in page.title.lower()
             body_match = query_lower in page.body.lower()
@@ -95,8 +103,7 @@ class SearchService:
         if not snippet_md:
             return ""
         text = self._preprocess_notes(snippet_md)
-        wiki_config = load_config("wiki")
-        html = md.markdown(text, extensions=wiki_config.get("markdown_extensions", []))
+        html = render_markdown(text)
         return self._postprocess_task_items(html)
 
     _NOTE_MD_PATTERN = re.compile(
@@ -120,8 +127,7 @@ class SearchService:
             )
             note_type = self._NOTE_TYPES[kind]
             label = self._NOTE_LABELS[kind]
-            wiki_config = load_config("wiki")
-            body_html = md.markdown(body, extensions=wiki_config.get("markdown_extensions", []))
+            body_html = render_markdown(body)
             return (
                 f'<div class="note note-{note_type}" data-note-type="{note_type}">'
                 f'<div class="note-title">{label}</div>'
@@ -0,0 +1,24 @@
+from src.watcher.index_store import IndexStore
+
+
+def _set_status(status):
+    def _mutate(_index, entry):
+        entry["status"] = status
+    return _mutate
+
+
+def test_remove_targets_flushes_and_notifies(tmp_path):
+    index_path = tmp_path / "index.json"
+    store = IndexStore(index_path=index_path, flush_delay=60)
+    store.update_target("outage-a", _set_status("alert_active"))
+    store.update_target("train-b", _set_status("ok"))
+    store.flush()
+    notified = []
+    store.add_listener(lambda version, names: notified.append(names))
+
+    assert store.remove_targets(["outage-a", "missing"]) == 1
+
+    assert notified == [{"outage-a"}]
+    reloaded = IndexStore(index_path=index_path)
+    assert reloaded.get_target("outage-a") == {}
+    assert reloaded.get_target("train-b")["status"] == "ok"
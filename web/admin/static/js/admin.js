@@ -1,5 +1,24 @@
 document.addEventListener("DOMContentLoaded", () => {
   const DEFAULT_TARGET_INTERVAL = 30;
+  const WATCHER_FORM_TARGET_KEYS = new Set([
+    "name",
+    "type",
+    "enabled",
+    "interval_seconds",
+    "site_url",
+    "url",
+    "warning_url",
+    "area_url",
+    "base_url",
+    "detail_base_url",
+    "selector",
+    "detail_selector",
+    "area_code",
+    "auth_token",
+    "alert_statuses",
+    "warning_codes",
+    "threshold",
+  ]);
   const navLinks = document.querySelectorAll(".sidebar nav a");
   const sections = document.querySelectorAll(".section");
   const sectionTitle = document.getElementById("section-title");
@@ -100,6 +119,7 @@ document.addEventListener("DOMContentLoaded", () => {
         loadWatcherOverview();
         loadWatcherEvents();
         loadWatcherEventsHistory();
+        startWatcherEventStream();
         break;
       case "sec-state":
         loadWatcherState();
@@ -388,6 +408,12 @@ document.addEventListener("DOMContentLoaded", () => {
       nightStart: null,
       nightEnd: null,
       targets: [],
+      // フォームで扱わない最上位の設定（http など）は保存時にそのまま残す
+      extra: Object.fromEntries(
+        Object.entries(config).filter(
+          ([key]) => key !== "night_stop" && key !== "targets"
+        )
+      ),
     };
 
     const globals = document.createElement("div");
@@ -488,6 +514,10 @@ document.addEventListener("DOMContentLoaded", () => {
         ),
         area_code: maybeCreateTextField(grid, "area_code", t.area_code),
         auth_token: maybeCreateTextField(grid, "auth_token", t.auth_token),
+        // フォームで扱わない項目（fetch_concurrency など）は保存時にそのまま残す
+        extra: Object.fromEntries(
+          Object.entries(t).filter(([key]) => !WATCHER_FORM_TARGET_KEYS.has(key))
+        ),
       };
 
       targetState.name.parentElement.classList.add("config-field-wide");
@@ -523,6 +553,7 @@ document.addEventListener("DOMContentLoaded", () => {
         end_hour: numberValue(state.nightEnd, 4),
       },
       targets: [],
+      ...state.extra,
     };
 
     state.targets.forEach((t) => {
@@ -531,6 +562,7 @@ document.addEventListener("DOMContentLoaded", () => {
         type: t.type.value,
         enabled: t.enabled.checked,
       };
+      Object.assign(target, t.extra);
       const interval = numberValue(t.interval, DEFAULT_TARGET_INTERVAL);
       target.interval_seconds = interval;
 
@@ -1040,6 +1072,7 @@ document.addEventListener("DOMContentLoaded", () => {
               <span>状態: ${statusLabel}</span>
               <span>最終チェック: ${formatIso(t.last_checked) || "-"}</span>
               <span>最終変化: ${formatIso(t.last_changed) || "-"}</span>
+              <span>開始遅延: ${t.last_lag_seconds != null ? `${t.last_lag_seconds}秒` : "-"}</span>
             </div>
             <div class="target-url">${t.url || ""}</div>
           </div>
@@ -1074,6 +1107,24 @@ document.addEventListener("DOMContentLoaded", () => {
       });
   }
 
+  let watcherEventStream = null;
+
+  // 新しいイベントが配信されたら一覧・件数・状態を読み直す
+  function startWatcherEventStream() {
+    if (!window.EventSource || watcherEventStream) return;
+    watcherEventStream = new EventSource("/api/watcher/events/stream");
+    watcherEventStream.onmessage = () => {
+      loadWatcherEvents();
+      loadWatcherEventsHistory();
+      loadWatcherOverview();
+    };
+    watcherEventStream.onerror = () => {
+      watcherEventStream.close();
+      watcherEventStream = null;
+      setTimeout(startWatcherEventStream, 5000);
+    };
+  }
+
   function loadWatcherEventsHistory() {
     fetch("/api/watcher/events/history")
       .then((r) => r.json())
@@ -1102,7 +1153,7 @@ document.addEventListener("DOMContentLoaded", () => {
         document.getElementById("state-snapshots-size").textContent =
           formatBytes(data.snapshots.total_size_bytes);
         document.getElementById("state-events-count").textContent =
-          data.events.file_count;
+          data.events.event_count;
         document.getElementById("state-events-size").textContent = formatBytes(
           data.events.total_size_bytes
         );
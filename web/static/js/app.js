@@ -143,7 +143,7 @@ function initSidebar() {
   function loadTree() {
     var container = document.getElementById("sidebar-tree");
     var openDirs = captureOpenDirsFromDom(container);
-    fetch("/api/pages/tree", { cache: "no-store" })
+    fetch("/api/pages/tree", { cache: "no-cache" })
       .then(function (res) {
         return res.json();
       })
@@ -2858,12 +2858,52 @@ function initWatcherBoard() {
     }, 200);
   }
 
+  // 変更のあったターゲットだけを手元のボードに反映する
+  function applyBoardTargets(message) {
+    if (!lastBoardData) {
+      scheduleBoardReload();
+      return;
+    }
+    var next = JSON.parse(JSON.stringify(lastBoardData));
+    var positions = {};
+    (next.targets || []).forEach(function (t, i) {
+      positions[t.name] = i;
+    });
+    var unknown = false;
+    (message.targets || []).forEach(function (t) {
+      if (Object.prototype.hasOwnProperty.call(positions, t.name)) {
+        next.targets[positions[t.name]] = t;
+      } else {
+        unknown = true;
+      }
+    });
+    if (unknown) {
+      scheduleBoardReload();
+      return;
+    }
+    if (message.last_run) next.last_run = message.last_run;
+    next.running = true;
+    renderBoard(next);
+  }
+
   function startWatcherStream() {
     if (!window.EventSource) return;
     if (stream) return;
     stream = new EventSource("/api/watcher/stream");
-    stream.onmessage = function () {
-      scheduleBoardReload();
+    stream.onmessage = function (ev) {
+      var message = null;
+      try {
+        message = JSON.parse(ev.data);
+      } catch (_e) {}
+      if (!message) {
+        scheduleBoardReload();
+        return;
+      }
+      if (message.type === "targets") {
+        applyBoardTargets(message);
+      } else if (message.type === "hello" || message.type === "reset") {
+        scheduleBoardReload();
+      }
     };
     stream.onerror = function () {
       try {
@@ -16,6 +16,9 @@ a = Analysis(
         'frontmatter',
         'bs4',
         'requests',
+        'PIL',
+        'PIL.Image',
+        'PIL.ImageOps',
     ],
     hookspath=[],
     hooksconfig={},